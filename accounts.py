@@ -0,0 +1,157 @@
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+# customer_client fields kept in the registry, REST field name -> registry key
+_CUSTOMER_CLIENT_FIELDS = {
+    "manager": "manager",
+    "currencyCode": "currency_code",
+    "timeZone": "time_zone",
+    "descriptiveName": "descriptive_name",
+    "status": "status",
+}
+
+
+class AccountRegistry:
+    """
+    Persistent registry of account metadata: manager flag, currency, time zone and descriptive name.
+
+    It is filled from every customer_client query the server runs and stored as a small JSON file,
+    so tools can tell manager and client accounts apart without another API round trip, also after a restart.
+    Entries older than max_age seconds are treated as unknown.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_age: float = 7 * 24 * 3600):
+        self.path = path
+        self.max_age = max_age
+        self._accounts: Optional[Dict[str, Dict[str, Any]]] = None
+        self._load_lock = threading.Lock()
+        # changes happen on the event loop while save() may run in a thread
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        if self._accounts is not None:
+            return self._accounts
+
+        # the file may be loaded ahead of time by a warm-up thread while the event loop needs it
+        with self._load_lock:
+            if self._accounts is not None:
+                return self._accounts
+            accounts = {}
+            if self.path and os.path.exists(self.path):
+                try:
+                    with open(self.path, "r") as f:
+                        accounts = json.load(f)
+                except (OSError, ValueError) as e:
+                    logger.warning(f"Ignoring unreadable account registry {self.path}: {e}")
+            self._accounts = accounts
+        return self._accounts
+
+    def save(self) -> None:
+        """
+        Write the registry to disk, replacing the previous file atomically. Safe to call from a thread.
+        A failed write is logged, the registry keeps working in memory.
+        """
+        if not self.path or self._accounts is None:
+            return
+
+        with self._lock:
+            text = json.dumps(self._accounts, indent=2, sort_keys=True)
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with self._save_lock:
+                with open(tmp_path, "w") as f:
+                    f.write(text)
+                os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"Failed to save account registry {self.path}: {e}")
+
+    def load(self) -> None:
+        """
+        Read the file now rather than on first use, e.g. from a warm-up thread.
+        """
+        self._load()
+
+    def get(self, customer_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Return the metadata of an account, or None if it is unknown or stale.
+
+        Args:
+            customer_id: Formatted customer ID
+
+        Returns:
+            Optional[Dict[str, Any]]: Account metadata
+        """
+        account = self._load().get(customer_id)
+        if account is None or time.time() - account.get("updated_at", 0) > self.max_age:
+            return None
+        return account
+
+    def is_manager(self, customer_id: str) -> Optional[bool]:
+        """
+        Return whether an account is a manager account, or None if that is not known.
+        """
+        account = self.get(customer_id)
+        if account is None or "manager" not in account:
+            return None
+        return account["manager"]
+
+    def record(self, customer_id: str, save: bool = True, **fields: Any) -> None:
+        """
+        Add or update the metadata of an account.
+
+        Args:
+            customer_id: Formatted customer ID
+            save: Whether to write the registry to disk right away
+            fields: Metadata fields, e.g. manager=True, currency_code="USD"
+        """
+        accounts = self._load()
+        with self._lock:
+            account = accounts.setdefault(customer_id, {})
+            account.update(fields)
+            account["updated_at"] = time.time()
+        if save:
+            self.save()
+
+    def record_customer_clients(self, rows: Iterable[Dict[str, Any]], save: bool = True) -> int:
+        """
+        Record the accounts described by the rows of a customer_client GAQL query.
+
+        Args:
+            rows: Result rows with a "customerClient" element
+            save: Whether to write the registry to disk right away
+
+        Returns:
+            int: Number of recorded accounts
+        """
+        count = 0
+        for row in rows:
+            customer_client = row.get("customerClient") or {}
+            customer_id = customer_client.get("id")
+            if not customer_id:
+                continue
+            fields = {
+                key: customer_client[name]
+                for name, key in _CUSTOMER_CLIENT_FIELDS.items()
+                if name in customer_client
+            }
+            self.record(str(customer_id), save=False, **fields)
+            count += 1
+
+        if count and save:
+            self.save()
+        return count
+
+    def to_dict(self) -> Dict[str, Dict[str, Any]]:
+        accounts = self._load()
+        with self._lock:
+            return dict(accounts)
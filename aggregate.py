@@ -0,0 +1,191 @@
+import heapq
+import json
+import re
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from result_format import field_path, is_micros, lookup
+
+FUNCTIONS = ("sum", "avg", "min", "max", "count")
+
+# weighted ratios over a group: sum(numerator) / sum(denominator) * scale
+RATIOS = {
+    "ctr": ("metrics.clicks", "metrics.impressions", 1),
+    "cpc": ("metrics.cost_micros", "metrics.clicks", 1),
+    "cpm": ("metrics.cost_micros", "metrics.impressions", 1000),
+    "cpa": ("metrics.cost_micros", "metrics.conversions", 1),
+}
+
+_AGGREGATE = re.compile(r"^\s*(\w+)\s*\(\s*(\*|[a-z0-9_.]+)\s*\)\s*$")
+
+
+class Aggregate:
+    """
+    Aggregate column, e.g. "sum(metrics.cost_micros)", "count(*)" or the weighted ratio "ctr".
+    """
+
+    def __init__(self, spec: str):
+        spec = spec.strip().lower()
+        self.name = spec
+        if spec in RATIOS:
+            self.function = spec
+            self.fields = list(RATIOS[spec][:2])
+            return
+
+        match = _AGGREGATE.match(spec)
+        if not match or match.group(1) not in FUNCTIONS:
+            raise ValueError(
+                f"Invalid aggregate '{spec}', expected one of {', '.join(f + '(field)' for f in FUNCTIONS)} "
+                f"or {', '.join(RATIOS)}")
+        self.function, field = match.groups()
+        if field == "*" and self.function != "count":
+            raise ValueError(f"Invalid aggregate '{spec}', only count accepts *")
+        self.name = f"{self.function}({field})"
+        self.fields = [] if field == "*" else [field]
+
+    @property
+    def is_micros(self) -> bool:
+        return self.function in ("cpc", "cpm", "cpa") or (
+            self.function != "count" and any(is_micros(field) for field in self.fields))
+
+
+class _Accumulator:
+    __slots__ = ("total", "count", "minimum", "maximum")
+
+    def __init__(self):
+        self.total = 0.0
+        self.count = 0
+        self.minimum: Optional[float] = None
+        self.maximum: Optional[float] = None
+
+    def add(self, value: float) -> None:
+        self.total += value
+        self.count += 1
+        if self.minimum is None or value < self.minimum:
+            self.minimum = value
+        if self.maximum is None or value > self.maximum:
+            self.maximum = value
+
+
+def _group_value(value: Any) -> Any:
+    # repeated fields are lists, which cannot be dict keys
+    return json.dumps(value) if isinstance(value, (list, dict)) else value
+
+
+class GroupAggregator:
+    """
+    Group GAQL result rows and aggregate numeric fields as the rows stream in. Only one set of
+    running sums, counts, minimums and maximums is kept per group, so memory depends on the number
+    of groups and not on the number of rows.
+    """
+
+    def __init__(self, group_by: List[str], aggregates: List[str]):
+        if not aggregates:
+            raise ValueError("At least one aggregate is required")
+        self.group_by = [name.strip().lower() for name in group_by]
+        self.aggregates = [Aggregate(spec) for spec in aggregates]
+        self.fields = sorted({field for aggregate in self.aggregates for field in aggregate.fields})
+
+        self._group_paths = [field_path(name) for name in self.group_by]
+        self._field_paths = [field_path(name) for name in self.fields]
+        self._groups: Dict[Tuple[Any, ...], Tuple[List[_Accumulator], List[int]]] = {}
+        self.row_count = 0
+
+    def required_fields(self) -> List[str]:
+        """
+        Return the fields the query must select.
+        """
+        return self.group_by + [field for field in self.fields if field not in self.group_by]
+
+    def add(self, row: Dict[str, Any]) -> None:
+        key = tuple(_group_value(lookup(row, path)) for path in self._group_paths)
+        group = self._groups.get(key)
+        if group is None:
+            group = self._groups[key] = ([_Accumulator() for _ in self.fields], [0])
+        accumulators, rows = group
+        rows[0] += 1
+        for accumulator, path in zip(accumulators, self._field_paths):
+            value = lookup(row, path)
+            if value is not None:
+                # int64 values are strings in REST responses
+                accumulator.add(float(value))
+        self.row_count += 1
+
+    def extend(self, rows: Iterable[Dict[str, Any]]) -> None:
+        for row in rows:
+            self.add(row)
+
+    @property
+    def group_count(self) -> int:
+        return len(self._groups)
+
+    def _value(self, aggregate: Aggregate, accumulators: Dict[str, _Accumulator], rows: int) -> Optional[float]:
+        if aggregate.function == "count":
+            return accumulators[aggregate.fields[0]].count if aggregate.fields else rows
+        if aggregate.function in RATIOS:
+            numerator, denominator, scale = RATIOS[aggregate.function]
+            total = accumulators[denominator].total
+            return accumulators[numerator].total / total * scale if total else None
+
+        accumulator = accumulators[aggregate.fields[0]]
+        if accumulator.count == 0:
+            return None
+        if aggregate.function == "sum":
+            return accumulator.total
+        if aggregate.function == "avg":
+            return accumulator.total / accumulator.count
+        return accumulator.minimum if aggregate.function == "min" else accumulator.maximum
+
+    def results(
+        self,
+        order_by: Optional[str] = None,
+        ascending: bool = False,
+        limit: Optional[int] = None,
+        micros_to_currency: bool = False,
+    ) -> Tuple[List[str], List[List[Any]]]:
+        """
+        Return the aggregated table, sorted by an aggregate and cut to the top `limit` groups.
+
+        Args:
+            order_by: Aggregate to sort by, e.g. "sum(metrics.cost_micros)", defaults to the first aggregate
+            ascending: Whether to sort smallest first
+            limit: Number of groups to return, all if None
+            micros_to_currency: Whether to convert micros aggregates and cpc/cpm/cpa to currency units
+
+        Returns:
+            Tuple[List[str], List[List[Any]]]: Column names and rows
+        """
+        order_index = 0
+        if order_by is not None:
+            names = [aggregate.name for aggregate in self.aggregates]
+            order_name = Aggregate(order_by).name
+            if order_name not in names:
+                raise ValueError(f"order_by '{order_by}' is not one of the aggregates: {', '.join(names)}")
+            order_index = names.index(order_name)
+
+        table = []
+        for key, (accumulators, rows) in self._groups.items():
+            by_field = dict(zip(self.fields, accumulators))
+            values = []
+            for aggregate in self.aggregates:
+                value = self._value(aggregate, by_field, rows[0])
+                if micros_to_currency and aggregate.is_micros and value is not None:
+                    value /= 1_000_000
+                values.append(value)
+            table.append(list(key) + values)
+
+        # groups without a value go last in either direction
+        column = len(self.group_by) + order_index
+        if ascending:
+            sort_key = lambda row: (row[column] is None, row[column] or 0)
+            table = heapq.nsmallest(limit, table, key=sort_key) if limit else sorted(table, key=sort_key)
+        else:
+            sort_key = lambda row: (row[column] is not None, row[column] or 0)
+            table = heapq.nlargest(limit, table, key=sort_key) if limit else sorted(table, key=sort_key, reverse=True)
+
+        columns = list(self.group_by)
+        for aggregate in self.aggregates:
+            name = aggregate.name
+            if micros_to_currency and aggregate.is_micros:
+                name = name.replace("_micros", "")
+            columns.append(name)
+        return columns, table
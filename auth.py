@@ -0,0 +1,151 @@
+import asyncio
+import datetime
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+
+import utils
+
+logger = logging.getLogger(__name__)
+
+# refresh the token this long before it expires, in the background
+DEFAULT_REFRESH_AHEAD_SECONDS = 300
+# never hand out a token that expires sooner than this
+DEFAULT_MIN_VALIDITY_SECONDS = 30
+
+
+class CredentialManager:
+    """
+    Process-wide holder of the service account credentials and the request headers built from them.
+
+    The key file is loaded once, the access token is reused until shortly before it expires, and
+    the pre-built header dict is cached. When a token enters the refresh-ahead window, a single
+    background thread refreshes it while callers keep using the still valid token. Refreshes are
+    single-flight: concurrent callers never refresh the same token twice.
+    """
+
+    def __init__(
+        self,
+        credentials_path: str,
+        scopes: List[str],
+        developer_token: str,
+        login_customer_id: str,
+        refresh_ahead_seconds: int = DEFAULT_REFRESH_AHEAD_SECONDS,
+        min_validity_seconds: int = DEFAULT_MIN_VALIDITY_SECONDS,
+    ):
+        self.credentials_path = credentials_path
+        self.scopes = scopes
+        self.developer_token = developer_token
+        self.login_customer_id = login_customer_id
+        self.refresh_ahead_seconds = refresh_ahead_seconds
+        self.min_validity_seconds = min_validity_seconds
+
+        self._credentials = None
+        self._headers: Optional[Dict[str, str]] = None
+        self._lock = threading.Lock()
+        self._background_lock = threading.Lock()
+        self._background_refresh: Optional[threading.Thread] = None
+
+        self._hits = 0
+        self._refreshes = 0
+        self._background_refreshes = 0
+        self._refresh_failures = 0
+
+    def _seconds_until_expiry(self) -> float:
+        expiry = self._credentials.expiry if self._credentials else None
+        if self._headers is None or expiry is None:
+            return 0.0
+        # google-auth keeps the expiry as a naive UTC datetime
+        now = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+        return (expiry - now).total_seconds()
+
+    def _refresh_blocking(self, force: bool = False) -> Dict[str, str]:
+        """
+        Refresh the access token unless another caller already did it while we waited for the lock.
+        """
+        with self._lock:
+            if not force and self._seconds_until_expiry() > self.refresh_ahead_seconds:
+                return self._headers
+
+            if self._credentials is None:
+                self._credentials = utils.get_service_account_credentials(self.credentials_path, self.scopes)
+
+            try:
+                utils.refresh_credentials(self._credentials)
+            except Exception:
+                self._refresh_failures += 1
+                raise
+
+            self._headers = utils.build_request_headers(
+                self.developer_token, self.login_customer_id, self._credentials.token)
+            self._refreshes += 1
+            logger.info(f"Refreshed access token, expires at {self._credentials.expiry}")
+            return self._headers
+
+    def _background_refresh_target(self) -> None:
+        try:
+            self._refresh_blocking()
+            self._background_refreshes += 1
+        except Exception as e:
+            # the current token is still valid, the next caller will retry in the foreground if needed
+            logger.warning(f"Background token refresh failed: {e}")
+
+    def _start_background_refresh(self) -> None:
+        with self._background_lock:
+            if self._background_refresh is not None and self._background_refresh.is_alive():
+                return
+            self._background_refresh = threading.Thread(
+                target=self._background_refresh_target, name="google-ads-token-refresh", daemon=True)
+            self._background_refresh.start()
+
+    def get_headers_blocking(self) -> Dict[str, str]:
+        """
+        Return request headers with a valid access token, refreshing it in the calling thread if needed.
+
+        Returns:
+            Dict[str, str]: A copy of the cached request headers
+        """
+        remaining = self._seconds_until_expiry()
+        if remaining <= self.min_validity_seconds:
+            return dict(self._refresh_blocking())
+
+        self._hits += 1
+        if remaining <= self.refresh_ahead_seconds:
+            self._start_background_refresh()
+        return dict(self._headers)
+
+    async def get_headers(self) -> Dict[str, str]:
+        """
+        Return request headers with a valid access token.
+        A cached token is returned without touching the event loop, a refresh runs in a worker thread.
+
+        Returns:
+            Dict[str, str]: A copy of the cached request headers
+        """
+        remaining = self._seconds_until_expiry()
+        if remaining <= self.min_validity_seconds:
+            headers = await asyncio.to_thread(self._refresh_blocking)
+            return dict(headers)
+
+        return self.get_headers_blocking()
+
+    def invalidate(self) -> None:
+        """
+        Drop the cached token, e.g. after the API rejected it as unauthenticated.
+        The key file is not reloaded.
+        """
+        with self._lock:
+            self._headers = None
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Return cache hit and refresh counters.
+        """
+        return {
+            "hits": self._hits,
+            "refreshes": self._refreshes,
+            "background_refreshes": self._background_refreshes,
+            "refresh_failures": self._refresh_failures,
+            "token_expiry": self._credentials.expiry.isoformat() if self._credentials and self._credentials.expiry else None,
+            "seconds_until_expiry": round(self._seconds_until_expiry(), 1),
+        }
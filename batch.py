@@ -0,0 +1,137 @@
+from typing import Any, Dict, Iterable, List, Optional
+
+# the API accepts at most 10,000 operations per mutate request
+MAX_OPERATIONS_PER_REQUEST = 10000
+
+
+def estimate_size(value: Any) -> int:
+    """
+    Roughly estimate the JSON encoded size of a value without encoding it.
+    String lengths dominate, which matters for base64 image data.
+
+    Args:
+        value: JSON compatible value
+
+    Returns:
+        int: Estimated size in bytes
+    """
+    if isinstance(value, str):
+        return len(value) + 2
+    if isinstance(value, dict):
+        return sum(len(key) + 4 + estimate_size(item) for key, item in value.items()) + 2
+    if isinstance(value, (list, tuple)):
+        return sum(estimate_size(item) + 1 for item in value) + 2
+    return 8
+
+
+def chunk_operations(
+    operations: List[Dict[str, Any]],
+    max_operations: int = 1000,
+    max_bytes: int = 30 * 1024 * 1024,
+) -> List[List[int]]:
+    """
+    Split operations into as few chunks as the per-request operation count and size limits allow.
+    An operation larger than max_bytes gets a chunk of its own.
+
+    Args:
+        operations: Mutate operations
+        max_operations: Maximum number of operations per request
+        max_bytes: Maximum estimated request size in bytes
+
+    Returns:
+        List[List[int]]: Indexes of the operations in each chunk, in input order
+    """
+    return chunk_sizes([estimate_size(operation) for operation in operations], max_operations, max_bytes)
+
+
+def chunk_sizes(
+    sizes: Iterable[int],
+    max_operations: int = 1000,
+    max_bytes: int = 30 * 1024 * 1024,
+) -> List[List[int]]:
+    """
+    Same as chunk_operations, from the estimated size of each operation, so that operations can be
+    planned into requests before they are built, e.g. before images are encoded.
+    """
+    max_operations = max(1, min(max_operations, MAX_OPERATIONS_PER_REQUEST))
+    chunks: List[List[int]] = []
+    chunk: List[int] = []
+    chunk_bytes = 0
+    for index, size in enumerate(sizes):
+        if chunk and (len(chunk) >= max_operations or chunk_bytes + size > max_bytes):
+            chunks.append(chunk)
+            chunk, chunk_bytes = [], 0
+        chunk.append(index)
+        chunk_bytes += size
+    if chunk:
+        chunks.append(chunk)
+    return chunks
+
+
+def partial_failure_errors(response: Dict[str, Any]) -> Dict[int, List[Dict[str, Any]]]:
+    """
+    Map the errors of a partialFailure mutate response to the index of the failed operation.
+
+    Args:
+        response: Mutate response body
+
+    Returns:
+        Dict[int, List[Dict[str, Any]]]: Errors keyed by operation index within the request
+    """
+    errors: Dict[int, List[Dict[str, Any]]] = {}
+    partial_failure_error = response.get("partialFailureError")
+    if not partial_failure_error:
+        return errors
+
+    for detail in partial_failure_error.get("details", []):
+        for error in detail.get("errors", []):
+            index = _operation_index(error)
+            errors.setdefault(index, []).append({
+                "errorCode": error.get("errorCode"),
+                "message": error.get("message"),
+            })
+    return errors
+
+
+def _operation_index(error: Dict[str, Any]) -> Optional[int]:
+    for element in error.get("location", {}).get("fieldPathElements", []):
+        if element.get("fieldName") in ("operations", "mutate_operations", "mutateOperations"):
+            return int(element.get("index", 0))
+    return None
+
+
+def map_chunk_results(
+    indexes: List[int],
+    response: Optional[Dict[str, Any]] = None,
+    error: Optional[str] = None,
+    result_key: str = "results",
+) -> List[Dict[str, Any]]:
+    """
+    Turn the response of one mutate request into one result per operation, tagged with its input index.
+
+    Args:
+        indexes: Input indexes of the operations sent in the request
+        response: Mutate response body, None if the whole request failed
+        error: Error message of a request that failed as a whole
+        result_key: Key of the per-operation results in the response
+
+    Returns:
+        List[Dict[str, Any]]: {"index": ..., "resourceName": ...} or {"index": ..., "errors": [...]} per operation
+    """
+    if response is None:
+        return [{"index": index, "errors": [{"message": error}]} for index in indexes]
+
+    results = response.get(result_key) or []
+    errors = partial_failure_errors(response)
+    # an error without a location cannot be attributed to one operation
+    unattributed = errors.pop(None, None)
+    mapped = []
+    for position, index in enumerate(indexes):
+        result = results[position] if position < len(results) else {}
+        if position in errors:
+            mapped.append({"index": index, "errors": errors[position]})
+        elif result:
+            mapped.append({"index": index, **result})
+        else:
+            mapped.append({"index": index, "errors": unattributed or [{"message": "No result returned for operation"}]})
+    return mapped
@@ -0,0 +1,268 @@
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from fake_google_ads import FakeConfig, FakeGoogleAdsServer
+
+MANAGER_ID = "1000000000"
+CLIENT_ID = "2000000000"
+
+CAMPAIGN_QUERY = """
+SELECT campaign.id, campaign.name, campaign.status, segments.date, segments.device,
+       metrics.impressions, metrics.clicks, metrics.cost_micros, metrics.conversions, metrics.ctr
+FROM campaign
+WHERE segments.date DURING LAST_30_DAYS
+"""
+
+
+def _write_service_account_key(directory: str, token_uri: str) -> str:
+    """
+    Write a service account key file with a freshly generated RSA key, pointing the token exchange at the fake server.
+    The key is generated with the RSA library google-auth signs with: cryptography, or rsa for the releases without it.
+    """
+    try:
+        from cryptography.hazmat.primitives import serialization
+        from cryptography.hazmat.primitives.asymmetric import rsa as crypto_rsa
+
+        private_key = crypto_rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        pem = private_key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.PKCS8,
+            serialization.NoEncryption(),
+        ).decode()
+    except ImportError:
+        import rsa
+
+        _, private_key = rsa.newkeys(2048)
+        pem = private_key.save_pkcs1().decode()
+    path = os.path.join(directory, "service_account_key.json")
+    with open(path, "w") as f:
+        json.dump({
+            "type": "service_account",
+            "project_id": "benchmark",
+            "private_key_id": "benchmark",
+            "private_key": pem,
+            "client_email": "benchmark@benchmark.iam.gserviceaccount.com",
+            "client_id": "1",
+            "token_uri": token_uri,
+        }, f)
+    return path
+
+
+def scenarios(server: Any, ads_per_batch: int) -> Dict[str, Callable[[], Awaitable[Any]]]:
+    """
+    Return the benchmarked tool calls by name. Apart from run_gaql_cached, every call starts with an empty GAQL result cache.
+    """
+
+    def uncached(call: Callable[[], Awaitable[Any]]) -> Callable[[], Awaitable[Any]]:
+        def run() -> Awaitable[Any]:
+            server.query_cache.clear()
+            return call()
+        return run
+
+    ad = {
+        "adGroup": f"customers/{CLIENT_ID}/adGroups/1",
+        "status": "PAUSED",
+        "ad": {"finalUrls": ["https://example.com"], "name": "benchmark"},
+    }
+    return {
+        "run_gaql": lambda: server.run_gaql(CLIENT_ID, CAMPAIGN_QUERY, use_cache=False, page_size=0),
+        "run_gaql_columns": lambda: server.run_gaql(CLIENT_ID, CAMPAIGN_QUERY, use_cache=False, format="columns", page_size=0),
+        "run_gaql_cached": lambda: server.run_gaql(CLIENT_ID, CAMPAIGN_QUERY, page_size=0),
+        "aggregate_gaql": uncached(lambda: server.aggregate_gaql(
+            CLIENT_ID, CAMPAIGN_QUERY, ["segments.device"], ["sum(metrics.cost_micros)", "ctr", "cpc"])),
+        "run_gaql_across_clients": uncached(lambda: server.run_gaql_across_clients(MANAGER_ID, CAMPAIGN_QUERY)),
+        "list_campaigns": uncached(lambda: server.list_campaigns(CLIENT_ID)),
+        "list_ad_groups": uncached(lambda: server.list_ad_groups(CLIENT_ID)),
+        "list_ads": uncached(lambda: server.list_ads(CLIENT_ID)),
+        "create_campaign_budget": lambda: server.create_campaign_budget(
+            CLIENT_ID, {"name": f"benchmark {time.time()}", "amountMicros": "1000000"}),
+        "create_ads": lambda: server.create_ads(CLIENT_ID, [ad] * ads_per_batch),
+    }
+
+
+async def measure(call: Callable[[], Awaitable[Any]], iterations: int, concurrency: int) -> Dict[str, Any]:
+    """
+    Run a tool call `iterations` times, `concurrency` at a time, then once more alone under tracemalloc.
+
+    Returns:
+        Dict[str, Any]: Latency percentiles in ms, throughput in calls per second, peak memory in bytes, errors
+    """
+    # warm-up: token exchange, field catalog download, connection pool; injected errors may hit any call
+    try:
+        await call()
+    except Exception:
+        pass
+
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    errors: List[str] = []
+
+    async def timed() -> None:
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                await call()
+            except Exception as e:
+                errors.append(repr(e))
+                return
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*[timed() for _ in range(iterations)])
+    elapsed = time.perf_counter() - started
+
+    peak_memory = None
+    for _ in range(3):
+        tracemalloc.start()
+        try:
+            await call()
+            _, peak_memory = tracemalloc.get_traced_memory()
+            break
+        except Exception:
+            continue
+        finally:
+            tracemalloc.stop()
+
+    def percentile(value: float) -> Optional[float]:
+        if not latencies:
+            return None
+        ordered = sorted(latencies)
+        return round(ordered[min(len(ordered) - 1, int(len(ordered) * value / 100))] * 1000, 2)
+
+    return {
+        "iterations": iterations,
+        "concurrency": concurrency,
+        "p50_ms": percentile(50),
+        "p95_ms": percentile(95),
+        "p99_ms": percentile(99),
+        "mean_ms": round(statistics.mean(latencies) * 1000, 2) if latencies else None,
+        "throughput_per_s": round(len(latencies) / elapsed, 2) if elapsed else None,
+        "peak_memory_bytes": peak_memory,
+        "errors": len(errors),
+        "first_error": errors[0] if errors else None,
+    }
+
+
+def _commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(current: Dict[str, Any], previous: Dict[str, Any]) -> str:
+    """
+    Return a text table of the relative change of each metric against a previous results file.
+    """
+    lines = [f"{'scenario':<26} {'p50':>9} {'p95':>9} {'p99':>9} {'throughput':>11} {'memory':>9}"]
+
+    def delta(name: str, key: str) -> str:
+        new = current["results"].get(name, {}).get(key)
+        old = previous["results"].get(name, {}).get(key)
+        if not new or not old:
+            return "n/a"
+        return f"{(new - old) / old * 100:+.1f}%"
+
+    for name in current["results"]:
+        lines.append(f"{name:<26} {delta(name, 'p50_ms'):>9} {delta(name, 'p95_ms'):>9} {delta(name, 'p99_ms'):>9} "
+                     f"{delta(name, 'throughput_per_s'):>11} {delta(name, 'peak_memory_bytes'):>9}")
+    return "\n".join(lines)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the MCP tools against a local Google Ads API stand-in")
+    parser.add_argument("--scenarios", nargs="*", help="scenarios to run, all by default")
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--rows", type=int, default=5000, help="rows returned by each GAQL query")
+    parser.add_argument("--client-accounts", type=int, default=10)
+    parser.add_argument("--ads-per-batch", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.02, help="seconds before each API response")
+    parser.add_argument("--latency-jitter", type=float, default=0.01)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of API requests failing with 503")
+    parser.add_argument("--quota-error-rate", type=float, default=0.0, help="fraction of API requests failing with 429")
+    parser.add_argument("--output", help="results file, benchmark_results/<commit>.json by default")
+    parser.add_argument("--compare", help="previous results file to compare against")
+    args = parser.parse_args()
+
+    config = FakeConfig(
+        latency=args.latency,
+        latency_jitter=args.latency_jitter,
+        error_rate=args.error_rate,
+        quota_error_rate=args.quota_error_rate,
+        quota_retry_delay=0.1,
+        rows=args.rows,
+        client_accounts=args.client_accounts,
+        manager_ids={MANAGER_ID},
+    )
+
+    with FakeGoogleAdsServer(config) as fake, tempfile.TemporaryDirectory() as directory:
+        # the server reads its settings at import time
+        os.environ.update({
+            "GOOGLE_ADS_API_BASE_URL": fake.base_url,
+            "GOOGLE_ADS_CREDENTIALS_PATH": _write_service_account_key(directory, f"{fake.base_url}/token"),
+            "GOOGLE_ADS_DEVELOPER_TOKEN": "benchmark",
+            "GOOGLE_ADS_LOGIN_CUSTOMER_ID": MANAGER_ID,
+            "GOOGLE_ADS_CACHE_DIR": directory,
+        })
+        os.environ.setdefault("GOOGLE_ADS_RATE_LIMIT_QPS", "0")
+        os.environ.setdefault("GOOGLE_ADS_CUSTOMER_RATE_LIMIT_QPS", "0")
+        os.environ.setdefault("GOOGLE_ADS_RETRY_BASE_DELAY", "0.05")
+        import logging
+        import server
+        logging.getLogger().setLevel(logging.WARNING)
+
+        calls = scenarios(server, args.ads_per_batch)
+        names = args.scenarios or list(calls)
+        unknown = [name for name in names if name not in calls]
+        if unknown:
+            parser.error(f"unknown scenarios: {', '.join(unknown)}, expected some of {', '.join(calls)}")
+
+        async def run_all() -> Dict[str, Any]:
+            results = {}
+            for name in names:
+                results[name] = await measure(calls[name], args.iterations, args.concurrency)
+                print(f"{name:<26} p50 {results[name]['p50_ms']}ms  p95 {results[name]['p95_ms']}ms  "
+                      f"p99 {results[name]['p99_ms']}ms  {results[name]['throughput_per_s']}/s  "
+                      f"peak {(results[name]['peak_memory_bytes'] or 0) / 1024 / 1024:.1f}MiB  errors {results[name]['errors']}")
+            return results
+
+        results = asyncio.run(run_all())
+        request_counts = fake.request_counts()
+
+    commit = _commit()
+    report = {
+        "commit": commit,
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "settings": vars(args),
+        "api_requests": request_counts,
+        "results": results,
+    }
+    output = args.output or os.path.join("benchmark_results", f"{commit}.json")
+    if os.path.dirname(output):
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results saved to {output}")
+
+    if args.compare:
+        with open(args.compare, "r") as f:
+            print(compare(report, json.load(f)))
+
+
+if __name__ == "__main__":
+    main()
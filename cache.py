@@ -0,0 +1,265 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+import gaql
+
+logger = logging.getLogger(__name__)
+
+
+def parse_resource_ttls(value: Optional[str]) -> Dict[str, float]:
+    """
+    Parse per-resource TTLs from a string like "campaign=600,ad_group=300,customer_client=3600".
+
+    Args:
+        value: Comma separated resource=seconds pairs
+
+    Returns:
+        Dict[str, float]: TTL in seconds keyed by resource
+    """
+    ttls = {}
+    if not value:
+        return ttls
+    for item in value.split(","):
+        if not item.strip():
+            continue
+        resource, _, seconds = item.partition("=")
+        try:
+            ttls[resource.strip().lower()] = float(seconds)
+        except ValueError:
+            raise ValueError(f"Invalid cache TTL entry: {item}")
+    return ttls
+
+
+class QueryCache:
+    """
+    In-process LRU cache of GAQL results keyed by customer ID and normalized query.
+
+    Entries expire after a per-resource TTL, the total number of entries and of cached rows is bounded,
+    and all entries of a customer are dropped when that customer is mutated.
+
+    Each invalidation of a customer bumps its generation. A read takes the generation before querying the API
+    and passes it to put(), so rows read before a mutate finished are not cached after it.
+    """
+
+    def __init__(
+        self,
+        default_ttl: float = 300,
+        resource_ttls: Optional[Dict[str, float]] = None,
+        max_entries: int = 256,
+        max_rows: int = 200000,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.default_ttl = default_ttl
+        self.resource_ttls = resource_ttls or {}
+        self.max_entries = max_entries
+        self.max_rows = max_rows
+        self._clock = clock
+
+        # key -> (expires_at, rows)
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, List[Dict[str, Any]]]]" = OrderedDict()
+        self._rows = 0
+        # customer ID -> number of invalidations
+        self._generations: Dict[str, int] = {}
+
+        self._hits = 0
+        self._misses = 0
+        self._expirations = 0
+        self._evictions = 0
+        self._invalidations = 0
+        self._stale_writes = 0
+
+    def key(self, customer_id: str, query: str) -> Tuple[str, str]:
+        return customer_id, gaql.normalize_query(query)
+
+    def ttl_for(self, query: str) -> float:
+        """
+        Return the TTL for a query based on the resource it selects from.
+        """
+        return self.resource_ttls.get(gaql.get_resource(query), self.default_ttl)
+
+    def _remove(self, key: Tuple[str, str]) -> None:
+        _, rows = self._entries.pop(key)
+        self._rows -= len(rows)
+
+    def get(self, customer_id: str, query: str) -> Optional[List[Dict[str, Any]]]:
+        """
+        Return the cached rows for a query, or None on a miss.
+
+        Args:
+            customer_id: Formatted customer ID
+            query: GAQL query
+
+        Returns:
+            Optional[List[Dict[str, Any]]]: A new list holding the cached rows. The rows themselves are shared
+            and must not be modified.
+        """
+        key = self.key(customer_id, query)
+        entry = self._entries.get(key)
+        if entry is None:
+            self._misses += 1
+            return None
+
+        expires_at, rows = entry
+        if expires_at <= self._clock():
+            self._remove(key)
+            self._expirations += 1
+            self._misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self._hits += 1
+        return list(rows)
+
+    def generation(self, customer_id: str) -> int:
+        """
+        Return the number of times the results of a customer have been invalidated.
+        """
+        return self._generations.get(customer_id, 0)
+
+    def put(self, customer_id: str, query: str, rows: List[Dict[str, Any]], generation: Optional[int] = None) -> None:
+        """
+        Cache the rows of a query, evicting the least recently used entries when over the limits.
+
+        Args:
+            customer_id: Formatted customer ID
+            query: GAQL query
+            rows: Result rows
+            generation: Generation of the customer taken before the rows were read; the rows are dropped
+                if the customer has been invalidated since
+        """
+        if generation is not None and generation != self.generation(customer_id):
+            self._stale_writes += 1
+            return
+        ttl = self.ttl_for(query)
+        if ttl <= 0 or len(rows) > self.max_rows:
+            return
+
+        key = self.key(customer_id, query)
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (self._clock() + ttl, list(rows))
+        self._rows += len(rows)
+
+        while len(self._entries) > self.max_entries or self._rows > self.max_rows:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self._evictions += 1
+
+    def invalidate_customer(self, customer_id: str) -> int:
+        """
+        Drop all cached results of a customer.
+
+        Args:
+            customer_id: Formatted customer ID
+
+        Returns:
+            int: Number of dropped entries
+        """
+        self._generations[customer_id] = self.generation(customer_id) + 1
+        keys = [key for key in self._entries if key[0] == customer_id]
+        for key in keys:
+            self._remove(key)
+        if keys:
+            self._invalidations += 1
+            logger.info(f"Invalidated {len(keys)} cached GAQL results for customer {customer_id}")
+        return len(keys)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._rows = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Return hit/miss statistics and the current size of the cache.
+        """
+        lookups = self._hits + self._misses
+        return {
+            "hits": self._hits,
+            "misses": self._misses,
+            "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+            "expirations": self._expirations,
+            "evictions": self._evictions,
+            "invalidations": self._invalidations,
+            "stale_writes": self._stale_writes,
+            "entries": len(self._entries),
+            "rows": self._rows,
+            "max_entries": self.max_entries,
+            "max_rows": self.max_rows,
+            "default_ttl": self.default_ttl,
+            "resource_ttls": self.resource_ttls,
+        }
+
+
+class SingleFlight:
+    """
+    Coalesce identical concurrent calls: while a call for a key is running, callers asking for the same key
+    wait for its result instead of making their own call. All of them get the same result object, which
+    they must not modify.
+
+    The call runs in its own task, so a caller that is cancelled does not cancel it for the others.
+    """
+
+    def __init__(self) -> None:
+        # key -> (task, number of callers waiting for it besides the first)
+        self._flights: Dict[Hashable, List[Any]] = {}
+        self._calls = 0
+        self._coalesced = 0
+        self._max_waiters = 0
+
+    async def run(self, key: Hashable, call: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """
+        Return the result of call(), or of the call already running for this key.
+
+        Args:
+            key: Identity of the call, e.g. customer ID and normalized query
+            call: Makes the call
+
+        Returns:
+            Tuple[Any, bool]: The result, and whether it came from a call that was already running
+        """
+        loop = asyncio.get_running_loop()
+        flight = self._flights.get(key)
+        if flight is not None and flight[0].get_loop() is loop:
+            flight[1] += 1
+            self._coalesced += 1
+            self._max_waiters = max(self._max_waiters, flight[1])
+            return await asyncio.shield(flight[0]), True
+
+        task = loop.create_task(call())
+        flight = [task, 0]
+        self._flights[key] = flight
+        self._calls += 1
+
+        def done(task: "asyncio.Task[Any]") -> None:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+            # retrieved here in case every caller was cancelled
+            if not task.cancelled():
+                task.exception()
+
+        task.add_done_callback(done)
+        return await asyncio.shield(task), False
+
+    def forget(self, predicate: Callable[[Hashable], bool]) -> int:
+        """
+        Let later callers of the matching keys make a new call rather than wait for the running one,
+        e.g. because a mutate made its result outdated. Callers already waiting still get it.
+        """
+        keys = [key for key in self._flights if predicate(key)]
+        for key in keys:
+            del self._flights[key]
+        return len(keys)
+
+    def stats(self) -> Dict[str, Any]:
+        total = self._calls + self._coalesced
+        return {
+            "in_flight": len(self._flights),
+            "waiters": sum(flight[1] for flight in self._flights.values()),
+            "calls": self._calls,
+            "coalesced": self._coalesced,
+            "coalesced_rate": round(self._coalesced / total, 4) if total else 0.0,
+            "max_waiters": self._max_waiters,
+        }
@@ -0,0 +1,108 @@
+from typing import Any, Dict, List, Optional
+
+# googleAds:mutate operation and result keys of each resource type
+_OPERATION_KEYS = {
+    "campaignBudgets": ("campaignBudgetOperation", "campaignBudgetResult"),
+    "campaigns": ("campaignOperation", "campaignResult"),
+    "adGroups": ("adGroupOperation", "adGroupResult"),
+    "adGroupAds": ("adGroupAdOperation", "adGroupAdResult"),
+}
+
+
+class TemporaryIds:
+    """
+    Hand out temporary resource names with negative IDs. Entities created in the same
+    googleAds:mutate request can reference each other through them.
+    """
+
+    def __init__(self, customer_id: str):
+        self.customer_id = customer_id
+        self._next_id = -1
+
+    def resource_name(self, collection: str) -> str:
+        resource_name = f"customers/{self.customer_id}/{collection}/{self._next_id}"
+        self._next_id -= 1
+        return resource_name
+
+
+def _create_operation(collection: str, entity: Dict[str, Any]) -> Dict[str, Any]:
+    operation_key, _ = _OPERATION_KEYS[collection]
+    return {operation_key: {"create": entity}}
+
+
+def build_campaign_tree_operations(
+    customer_id: str,
+    campaign: Dict[str, Any],
+    campaign_budget: Optional[Dict[str, Any]] = None,
+    ad_groups: Optional[List[Dict[str, Any]]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Build the googleAds:mutate operations creating a campaign budget, a campaign, its ad groups and their ads,
+    linked through temporary resource names. The input dicts are not modified.
+
+    Args:
+        customer_id: Formatted customer ID
+        campaign: Campaign, without campaignBudget unless an existing budget is used
+        campaign_budget: Campaign budget to create, None if the campaign already references a budget
+        ad_groups: Ad groups, each optionally with an "ads" list of ad group ads without adGroup
+
+    Returns:
+        List[Dict[str, Any]]: Mutate operations, parents before children
+    """
+    temporary_ids = TemporaryIds(customer_id)
+    operations = []
+
+    campaign = dict(campaign)
+    if campaign_budget is not None:
+        campaign_budget = dict(campaign_budget)
+        campaign_budget["resourceName"] = temporary_ids.resource_name("campaignBudgets")
+        campaign["campaignBudget"] = campaign_budget["resourceName"]
+        operations.append(_create_operation("campaignBudgets", campaign_budget))
+
+    campaign["resourceName"] = temporary_ids.resource_name("campaigns")
+    operations.append(_create_operation("campaigns", campaign))
+
+    for ad_group in ad_groups or []:
+        ad_group = dict(ad_group)
+        ads = ad_group.pop("ads", [])
+        ad_group["resourceName"] = temporary_ids.resource_name("adGroups")
+        ad_group["campaign"] = campaign["resourceName"]
+        operations.append(_create_operation("adGroups", ad_group))
+        for ad in ads:
+            ad = dict(ad)
+            ad["adGroup"] = ad_group["resourceName"]
+            operations.append(_create_operation("adGroupAds", ad))
+
+    return operations
+
+
+def summarize_campaign_tree_response(response: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Turn a googleAds:mutate response for operations from build_campaign_tree_operations into a tree of resource names.
+
+    Example:
+    {
+        "campaignBudget": "customers/1234567890/campaignBudgets/111",
+        "campaign": "customers/1234567890/campaigns/222",
+        "adGroups": [
+            {"resourceName": "customers/1234567890/adGroups/333", "ads": ["customers/1234567890/adGroupAds/333~444"]}
+        ]
+    }
+
+    Args:
+        response: googleAds:mutate response body
+
+    Returns:
+        Dict[str, Any]: Resource names of the created entities
+    """
+    tree: Dict[str, Any] = {"campaignBudget": None, "campaign": None, "adGroups": []}
+    for operation_response in response.get("mutateOperationResponses", []):
+        if "campaignBudgetResult" in operation_response:
+            tree["campaignBudget"] = operation_response["campaignBudgetResult"].get("resourceName")
+        elif "campaignResult" in operation_response:
+            tree["campaign"] = operation_response["campaignResult"].get("resourceName")
+        elif "adGroupResult" in operation_response:
+            tree["adGroups"].append({"resourceName": operation_response["adGroupResult"].get("resourceName"), "ads": []})
+        elif "adGroupAdResult" in operation_response and tree["adGroups"]:
+            tree["adGroups"][-1]["ads"].append(operation_response["adGroupAdResult"].get("resourceName"))
+    return tree
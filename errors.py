@@ -0,0 +1,178 @@
+import json
+import re
+from typing import Any, Dict, List, Optional
+
+# gRPC status codes of failures that are worth retrying
+TRANSIENT_STATUSES = {"INTERNAL", "UNAVAILABLE", "DEADLINE_EXCEEDED", "ABORTED"}
+TRANSIENT_HTTP_CODES = {500, 502, 503, 504}
+# Google Ads error codes of failures that are worth retrying
+TRANSIENT_ERROR_CODES = {
+    "internalError.INTERNAL_ERROR",
+    "internalError.TRANSIENT_ERROR",
+    "internalError.DEADLINE_EXCEEDED",
+    "databaseError.CONCURRENT_MODIFICATION",
+}
+
+_RETRY_DELAY = re.compile(r"^\s*([0-9.]+)s\s*$")
+
+
+class GoogleAdsApiError(Exception):
+    """
+    Error response of the Google Ads API.
+
+    Attributes:
+        status_code: HTTP status code
+        status: gRPC status, e.g. "INVALID_ARGUMENT"
+        message: Top level error message
+        errors: Google Ads errors, each with "errorCode" (e.g. {"queryError": "UNRECOGNIZED_FIELD"}) and "message"
+        request_id: Request ID to quote to Google Ads API support
+        retry_delay: Retry delay in seconds suggested by the API, if any
+        body: Raw response body
+    """
+
+    retryable = False
+
+    def __init__(
+        self,
+        context: str,
+        status_code: int,
+        status: Optional[str] = None,
+        message: Optional[str] = None,
+        errors: Optional[List[Dict[str, Any]]] = None,
+        request_id: Optional[str] = None,
+        retry_delay: Optional[float] = None,
+        rate_scope: Optional[str] = None,
+        body: str = "",
+    ):
+        self.context = context
+        self.status_code = status_code
+        self.status = status
+        self.message = message
+        self.errors = errors or []
+        self.request_id = request_id
+        self.retry_delay = retry_delay
+        self.rate_scope = rate_scope
+        self.body = body
+        super().__init__(self._describe())
+
+    def error_codes(self) -> List[str]:
+        """
+        Return the error codes as "category.CODE" strings, e.g. "queryError.UNRECOGNIZED_FIELD".
+        """
+        codes = []
+        for error in self.errors:
+            for category, code in (error.get("errorCode") or {}).items():
+                codes.append(f"{category}.{code}")
+        return codes
+
+    def _describe(self) -> str:
+        description = f"{self.context}: HTTP {self.status_code}"
+        if self.status:
+            description += f" {self.status}"
+        messages = [error.get("message") for error in self.errors if error.get("message")]
+        if messages:
+            description += f": {'; '.join(messages)}"
+        elif self.message:
+            description += f": {self.message}"
+        elif self.body:
+            description += f": {self.body[:1000]}"
+        codes = self.error_codes()
+        if codes:
+            description += f" ({', '.join(codes)})"
+        if self.request_id:
+            description += f" [request ID {self.request_id}]"
+        return description
+
+
+class TransientApiError(GoogleAdsApiError):
+    """
+    Failure on the API side that usually goes away when the request is sent again.
+    """
+
+    retryable = True
+
+
+class QuotaExceededError(TransientApiError):
+    """
+    RESOURCE_EXHAUSTED: the request was rejected before execution because a rate limit was hit.
+    """
+
+
+class AuthenticationApiError(GoogleAdsApiError):
+    """
+    UNAUTHENTICATED: the access token was rejected, e.g. because it expired early.
+    """
+
+
+def parse_api_error(context: str, status_code: int, body: str) -> GoogleAdsApiError:
+    """
+    Parse an error response body into a typed error.
+
+    Example body:
+    {
+        "error": {
+            "code": 400,
+            "message": "Request contains an invalid argument.",
+            "status": "INVALID_ARGUMENT",
+            "details": [
+                {
+                    "@type": "type.googleapis.com/google.ads.googleads.v21.errors.GoogleAdsFailure",
+                    "errors": [{"errorCode": {"queryError": "UNRECOGNIZED_FIELD"}, "message": "Unrecognized field in the query: 'campaign.nme'."}],
+                    "requestId": "abc123"
+                }
+            ]
+        }
+    }
+
+    Args:
+        context: What was being done, used as message prefix, e.g. "Error running GAQL"
+        status_code: HTTP status code
+        body: Response body
+
+    Returns:
+        GoogleAdsApiError: Typed error
+    """
+    try:
+        payload = json.loads(body) if body else {}
+    except ValueError:
+        payload = {}
+    # searchStream wraps the error in an array
+    if isinstance(payload, list):
+        payload = payload[0] if payload else {}
+    error = payload.get("error", {}) if isinstance(payload, dict) else {}
+
+    status = error.get("status")
+    errors, request_id, retry_delay, rate_scope = [], None, None, None
+    for detail in error.get("details", []):
+        request_id = detail.get("requestId", request_id)
+        for failure in detail.get("errors", []):
+            errors.append({"errorCode": failure.get("errorCode"), "message": failure.get("message")})
+            quota_details = (failure.get("details") or {}).get("quotaErrorDetails") or {}
+            rate_scope = quota_details.get("rateScope", rate_scope)
+            match = _RETRY_DELAY.match(str(quota_details.get("retryDelay", "")))
+            if match:
+                retry_delay = float(match.group(1))
+
+    kwargs = dict(
+        status=status,
+        message=error.get("message"),
+        errors=errors,
+        request_id=request_id,
+        retry_delay=retry_delay,
+        rate_scope=rate_scope,
+        body=body,
+    )
+
+    if status_code == 429 or status == "RESOURCE_EXHAUSTED":
+        return QuotaExceededError(context, status_code, **kwargs)
+    if status_code == 401 or status == "UNAUTHENTICATED":
+        return AuthenticationApiError(context, status_code, **kwargs)
+
+    api_error = GoogleAdsApiError(context, status_code, **kwargs)
+    if (
+        status_code in TRANSIENT_HTTP_CODES
+        or status in TRANSIENT_STATUSES
+        or any(code in TRANSIENT_ERROR_CODES for code in api_error.error_codes())
+    ):
+        return TransientApiError(context, status_code, **kwargs)
+    return api_error
@@ -0,0 +1,419 @@
+import argparse
+import asyncio
+import dataclasses
+import datetime
+import json
+import multiprocessing
+import random
+import socket
+import time
+import urllib.request
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+import gaql
+from result_format import field_path
+
+DEVICES = ["MOBILE", "DESKTOP", "TABLET", "CONNECTED_TV"]
+FIRST_DATE = datetime.date(2025, 1, 1)
+
+
+@dataclasses.dataclass
+class FakeConfig:
+    """
+    Attributes:
+        latency: Seconds before each API response starts
+        latency_jitter: Random extra seconds added to the latency, up to this value
+        error_rate: Fraction of API requests answered with 503 UNAVAILABLE
+        quota_error_rate: Fraction of API requests answered with 429 RESOURCE_EXHAUSTED
+        quota_retry_delay: Retry delay in seconds returned with quota errors
+        rows: Rows returned by a GAQL query, unless LIMIT asks for fewer
+        page_size: Rows per googleAds:search page and per googleAds:searchStream batch
+        client_accounts: Client accounts below each manager account
+        manager_ids: Customer IDs of manager accounts
+        seed: Seed of the synthetic data
+    """
+    latency: float = 0.0
+    latency_jitter: float = 0.0
+    error_rate: float = 0.0
+    quota_error_rate: float = 0.0
+    quota_retry_delay: float = 1.0
+    rows: int = 1000
+    page_size: int = 10000
+    client_accounts: int = 10
+    manager_ids: Set[str] = dataclasses.field(default_factory=lambda: {"1000000000"})
+    seed: int = 0
+
+
+def _camel(name: str) -> str:
+    return field_path(name)[0]
+
+
+def _client_ids(config: FakeConfig, manager_id: str) -> List[str]:
+    return [str(int(manager_id) + index) for index in range(1, config.client_accounts + 1)]
+
+
+def _value(name: str, index: int, rng: random.Random) -> Any:
+    """
+    Return a synthetic value of a GAQL field, in the REST encoding: int64 as strings, doubles as numbers.
+    """
+    last = name.rsplit(".", 1)[-1]
+    if name == "segments.date":
+        return (FIRST_DATE + datetime.timedelta(days=index % 365)).isoformat()
+    if name == "segments.device":
+        return DEVICES[index % len(DEVICES)]
+    if last == "id":
+        return str(1000 + index)
+    if last in ("name", "descriptive_name"):
+        return f"{name.split('.', 1)[0].replace('_', ' ').title()} {index}"
+    if last == "status":
+        return "ENABLED"
+    if last == "currency_code":
+        return "EUR"
+    if last == "time_zone":
+        return "Europe/Berlin"
+    if last.endswith("_date_time"):
+        return f"{FIRST_DATE + datetime.timedelta(days=index % 28)} 12:00:00.000000"
+    if last.endswith("_date"):
+        return (FIRST_DATE + datetime.timedelta(days=index % 28)).isoformat()
+    if last.endswith("_micros"):
+        return str(rng.randrange(0, 50_000_000, 10_000))
+    if name.startswith("metrics."):
+        if last in ("ctr", "conversions", "conversions_value") or last.startswith("average_") or last.endswith("_rate"):
+            return round(rng.random() * 10, 4)
+        return str(rng.randrange(0, 10_000))
+    if last.endswith("_type"):
+        return "UNKNOWN"
+    return f"{last}_{index}"
+
+
+def _set(row: Dict[str, Any], path: List[str], value: Any) -> None:
+    *parents, last = path
+    for key in parents:
+        row = row.setdefault(key, {})
+    row[last] = value
+
+
+class FakeGoogleAdsApi:
+    """
+    Local stand-in for the Google Ads REST API and the OAuth token endpoint, for benchmarks and offline tests.
+
+    It answers googleAds:search (paginated), googleAds:searchStream, googleAds:mutate, every {resource}:mutate,
+    googleAdsFields:search and the service account token exchange with synthetic data, with configurable
+    latency and injected errors. Point the server at it with GOOGLE_ADS_API_BASE_URL and a service account
+    key file whose token_uri is {base_url}/token.
+
+    Run standalone:
+        python fake_google_ads.py --port 8765 --rows 50000 --latency 0.05
+    """
+
+    def __init__(self, config: Optional[FakeConfig] = None):
+        self.config = config or FakeConfig()
+        self.request_counts: Dict[str, int] = {}
+        self._rng = random.Random(self.config.seed)
+        self._next_id = 10_000
+        self._datasets: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+        self.app = Starlette(routes=[
+            Route("/token", self.token, methods=["POST"]),
+            Route("/stats", self.stats, methods=["GET"]),
+            Route("/{version}/customers/{customer_id}/{operation}", self.customer_operation, methods=["POST"]),
+            Route("/{version}/{operation}", self.global_operation, methods=["POST"]),
+        ])
+
+    def _count(self, endpoint: str) -> None:
+        self.request_counts[endpoint] = self.request_counts.get(endpoint, 0) + 1
+
+    async def _delay(self) -> None:
+        delay = self.config.latency + self._rng.random() * self.config.latency_jitter
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def _injected_error(self) -> Optional[Response]:
+        roll = self._rng.random()
+        if roll < self.config.quota_error_rate:
+            return JSONResponse(status_code=429, content={"error": {
+                "code": 429, "message": "Resource has been exhausted.", "status": "RESOURCE_EXHAUSTED",
+                "details": [{
+                    "@type": "type.googleapis.com/google.ads.googleads.v21.errors.GoogleAdsFailure",
+                    "errors": [{
+                        "errorCode": {"quotaError": "RESOURCE_EXHAUSTED"},
+                        "message": "Too many requests.",
+                        "details": {"quotaErrorDetails": {
+                            "rateScope": "ACCOUNT", "retryDelay": f"{self.config.quota_retry_delay}s"}},
+                    }],
+                    "requestId": "fake-quota",
+                }],
+            }})
+        if roll < self.config.quota_error_rate + self.config.error_rate:
+            return JSONResponse(status_code=503, content={"error": {
+                "code": 503, "message": "The service is currently unavailable.", "status": "UNAVAILABLE"}})
+        return None
+
+    async def token(self, request: Request) -> Response:
+        self._count("token")
+        await request.body()
+        return JSONResponse({"access_token": f"fake-token-{time.time()}", "expires_in": 3600, "token_type": "Bearer"})
+
+    async def stats(self, request: Request) -> Response:
+        return JSONResponse({"request_counts": self.request_counts})
+
+    async def global_operation(self, request: Request) -> Response:
+        operation = request.path_params["operation"]
+        self._count(operation)
+        await self._delay()
+        if operation == "googleAdsFields:search":
+            # an empty catalog: the server only checks query syntax
+            return JSONResponse({"results": [], "totalResultsCount": "0"})
+        return JSONResponse(status_code=404, content={"error": {"code": 404, "status": "NOT_FOUND", "message": operation}})
+
+    async def customer_operation(self, request: Request) -> Response:
+        operation = request.path_params["operation"]
+        customer_id = request.path_params["customer_id"]
+        self._count(operation)
+        body = json.loads(await request.body() or b"{}")
+
+        await self._delay()
+        error = self._injected_error()
+        if error is not None:
+            return error
+
+        if operation in ("googleAds:search", "googleAds:searchStream"):
+            try:
+                query = gaql.parse(body.get("query", ""))
+            except gaql.GaqlSyntaxError as e:
+                return JSONResponse(status_code=400, content={"error": {
+                    "code": 400, "status": "INVALID_ARGUMENT", "message": str(e),
+                    "details": [{"errors": [{"errorCode": {"queryError": "BAD_VALUE"}, "message": str(e)}]}]}})
+            if operation == "googleAds:search":
+                return self._search(customer_id, query, body)
+            return self._search_stream(customer_id, query)
+
+        if operation.endswith(":mutate"):
+            return JSONResponse(self._mutate(customer_id, operation, body))
+
+        return JSONResponse(status_code=404, content={"error": {"code": 404, "status": "NOT_FOUND", "message": operation}})
+
+    def _rows(self, customer_id: str, query: gaql.Query) -> List[Dict[str, Any]]:
+        """
+        Return the synthetic result rows of a query. Generated datasets are kept for the next requests,
+        so that serving them costs about as little as on the real API.
+        """
+        key = (customer_id, repr(query))
+        rows = self._datasets.get(key)
+        if rows is None:
+            rows = list(self._generate_rows(customer_id, query))
+            if len(self._datasets) >= 16:
+                self._datasets.pop(next(iter(self._datasets)))
+        else:
+            del self._datasets[key]
+        self._datasets[key] = rows
+        return rows
+
+    def _generate_rows(self, customer_id: str, query: gaql.Query) -> Iterator[Dict[str, Any]]:
+        """
+        Yield the synthetic result rows of a query, applying "=" filters and LIMIT.
+        """
+        rng = random.Random(f"{self.config.seed}:{customer_id}:{query.resource}")
+        if query.resource == "customer_client":
+            if customer_id in self.config.manager_ids:
+                ids = [customer_id] + _client_ids(self.config, customer_id)
+            else:
+                ids = [customer_id]
+            count = len(ids)
+        elif query.resource == "customer":
+            ids, count = [customer_id], 1
+        elif query.resource == "customer_client_link":
+            # every link is active, and listed by customer_client
+            ids, count = None, 0
+        else:
+            ids, count = None, self.config.rows
+        if query.limit is not None:
+            count = min(count, query.limit)
+
+        filters = [
+            (condition.field, condition.values[0].strip("'\"").lower())
+            for condition in query.conditions if condition.operator == "="
+        ]
+        resource_key = _camel(query.resource)
+        paths = [field_path(name) for name in query.fields]
+        emitted = 0
+        index = 0
+        while emitted < count and index < (len(ids) if ids else count):
+            row: Dict[str, Any] = {}
+            for name, path in zip(query.fields, paths):
+                if ids is not None and name.endswith(".id"):
+                    value: Any = ids[index]
+                elif name.endswith(".manager"):
+                    value = ids is not None and ids[index] in self.config.manager_ids
+                elif name == "customer_client.level":
+                    value = "0" if index == 0 else "1"
+                else:
+                    value = _value(name, index, rng)
+                _set(row, path, value)
+            row.setdefault(resource_key, {})["resourceName"] = (
+                f"customers/{customer_id}/{resource_key}s/{ids[index] if ids else 1000 + index}")
+            index += 1
+
+            if all(str(self._lookup(row, name)).lower() == value for name, value in filters):
+                emitted += 1
+                yield row
+
+    @staticmethod
+    def _lookup(row: Dict[str, Any], name: str) -> Any:
+        value: Any = row
+        for key in field_path(name):
+            value = value.get(key) if isinstance(value, dict) else None
+        return value
+
+    def _field_mask(self, query: gaql.Query) -> str:
+        return ",".join(".".join(field_path(name)) for name in query.fields)
+
+    def _search(self, customer_id: str, query: gaql.Query, body: Dict[str, Any]) -> Response:
+        offset = int(body.get("pageToken") or 0)
+        page_size = int(body.get("pageSize") or self.config.page_size)
+        rows = self._rows(customer_id, query)
+        page = rows[offset:offset + page_size]
+        next_page_token = str(offset + page_size) if offset + page_size < len(rows) else None
+
+        response: Dict[str, Any] = {"results": page, "fieldMask": self._field_mask(query), "requestId": "fake-search"}
+        if next_page_token:
+            response["nextPageToken"] = next_page_token
+        return JSONResponse(response)
+
+    def _search_stream(self, customer_id: str, query: gaql.Query) -> Response:
+        field_mask = self._field_mask(query)
+        page_size = self.config.page_size
+
+        rows = self._rows(customer_id, query)
+
+        def batches() -> Iterator[bytes]:
+            yield b"["
+            for start in range(0, max(len(rows), 1), page_size):
+                batch = {"results": rows[start:start + page_size], "fieldMask": field_mask}
+                if start + page_size >= len(rows):
+                    batch["requestId"] = "fake-stream"
+                yield (b"," if start else b"") + json.dumps(batch).encode()
+            yield b"]"
+
+        return StreamingResponse(batches(), media_type="application/json")
+
+    def _resource_name(self, customer_id: str, collection: str) -> str:
+        self._next_id += 1
+        return f"customers/{customer_id}/{collection}/{self._next_id}"
+
+    def _mutate(self, customer_id: str, operation: str, body: Dict[str, Any]) -> Dict[str, Any]:
+        if body.get("validateOnly"):
+            return {}
+
+        if operation == "googleAds:mutate":
+            responses = []
+            for mutate_operation in body.get("mutateOperations", []):
+                for key, change in mutate_operation.items():
+                    entity_type = key[:-len("Operation")]
+                    if "create" in change:
+                        resource_name = self._resource_name(customer_id, entity_type + "s")
+                    else:
+                        resource_name = (change.get("update") or {}).get("resourceName") or change.get("remove")
+                    responses.append({entity_type + "Result": {"resourceName": resource_name}})
+            return {"mutateOperationResponses": responses}
+
+        collection = operation.split(":", 1)[0]
+        return {"results": [{"resourceName": self._resource_name(customer_id, collection)}
+                            for _ in body.get("operations", [])]}
+
+
+def _serve(config: FakeConfig, host: str, port: int) -> None:
+    uvicorn.run(FakeGoogleAdsApi(config).app, host=host, port=port, log_level="warning", lifespan="off")
+
+
+class FakeGoogleAdsServer:
+    """
+    Serve a FakeGoogleAdsApi with uvicorn in a child process, so that generating synthetic data does not
+    compete with the code under test for the GIL.
+
+    Example:
+        with FakeGoogleAdsServer(FakeConfig(rows=50000)) as fake:
+            os.environ["GOOGLE_ADS_API_BASE_URL"] = fake.base_url
+    """
+
+    def __init__(self, config: Optional[FakeConfig] = None, host: str = "127.0.0.1", port: int = 0):
+        self.config = config or FakeConfig()
+        self.host = host
+        self.port = port
+        self._process: Optional[multiprocessing.process.BaseProcess] = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def start(self, timeout: float = 30) -> "FakeGoogleAdsServer":
+        if not self.port:
+            with socket.socket() as sock:
+                sock.bind((self.host, 0))
+                self.port = sock.getsockname()[1]
+
+        self._process = multiprocessing.get_context("spawn").Process(
+            target=_serve, args=(self.config, self.host, self.port), name="fake-google-ads", daemon=True)
+        self._process.start()
+
+        deadline = time.monotonic() + timeout
+        while True:
+            if not self._process.is_alive():
+                raise RuntimeError("Fake Google Ads server failed to start")
+            try:
+                with socket.create_connection((self.host, self.port), timeout=1):
+                    return self
+            except OSError:
+                if time.monotonic() > deadline:
+                    self.stop()
+                    raise RuntimeError(f"Fake Google Ads server did not start within {timeout}s")
+                time.sleep(0.05)
+
+    def request_counts(self) -> Dict[str, int]:
+        """
+        Return the number of requests the fake server received per endpoint.
+        """
+        with urllib.request.urlopen(f"{self.base_url}/stats", timeout=10) as response:
+            return json.load(response)["request_counts"]
+
+    def stop(self) -> None:
+        if self._process is not None:
+            self._process.terminate()
+            self._process.join(timeout=10)
+            self._process = None
+
+    def __enter__(self) -> "FakeGoogleAdsServer":
+        return self.start()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local stand-in for the Google Ads REST API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--rows", type=int, default=1000, help="rows returned by each GAQL query")
+    parser.add_argument("--page-size", type=int, default=10000)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds before each response")
+    parser.add_argument("--latency-jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests failing with 503")
+    parser.add_argument("--quota-error-rate", type=float, default=0.0, help="fraction of requests failing with 429")
+    parser.add_argument("--client-accounts", type=int, default=10)
+    args = parser.parse_args()
+
+    fake = FakeGoogleAdsApi(FakeConfig(
+        latency=args.latency,
+        latency_jitter=args.latency_jitter,
+        error_rate=args.error_rate,
+        quota_error_rate=args.quota_error_rate,
+        rows=args.rows,
+        page_size=args.page_size,
+        client_accounts=args.client_accounts,
+    ))
+    uvicorn.run(fake.app, host=args.host, port=args.port)
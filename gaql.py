@@ -0,0 +1,470 @@
+import dataclasses
+import re
+from typing import Dict, List, Optional
+
+# string literals, brackets and commas, comparison operators, and everything else up to whitespace
+_TOKEN = re.compile(r"""'(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*"|[(),\[\]]|!=|>=|<=|=|<|>|[^\s(),\[\]'"=<>!]+""")
+
+CLAUSE_ORDER = ["select", "from", "where", "order by", "limit", "parameters"]
+
+
+def tokenize(query: str) -> List[str]:
+    """
+    Split a GAQL query into tokens. Keywords and field names are lowercased, string literals are kept as is.
+
+    Args:
+        query: GAQL query
+
+    Returns:
+        List[str]: Tokens
+    """
+    tokens = []
+    for token in _TOKEN.findall(query):
+        if token[0] in "'\"":
+            tokens.append(token)
+        else:
+            tokens.append(token.lower())
+    return tokens
+
+
+def split_clauses(query: str) -> Dict[str, List[str]]:
+    """
+    Split a GAQL query into its clauses.
+
+    Args:
+        query: GAQL query
+
+    Returns:
+        Dict[str, List[str]]: Tokens of each clause keyed by the clause keyword, e.g. "select", "order by"
+    """
+    clauses: Dict[str, List[str]] = {}
+    current = None
+    tokens = tokenize(query)
+    i = 0
+    while i < len(tokens):
+        token = tokens[i]
+        if token == "order" and i + 1 < len(tokens) and tokens[i + 1] == "by":
+            current = "order by"
+            clauses[current] = []
+            i += 2
+            continue
+        if token in ("select", "from", "where", "limit", "parameters"):
+            current = token
+            clauses[current] = []
+        elif current is not None:
+            clauses[current].append(token)
+        i += 1
+    return clauses
+
+
+def _split_list(tokens: List[str]) -> List[str]:
+    """
+    Split comma separated tokens into items, commas inside brackets do not split.
+    """
+    items, item, depth = [], [], 0
+    for token in tokens:
+        if token in ("(", "["):
+            depth += 1
+        elif token in (")", "]"):
+            depth -= 1
+        if token == "," and depth == 0:
+            items.append(" ".join(item))
+            item = []
+        else:
+            item.append(token)
+    if item:
+        items.append(" ".join(item))
+    return items
+
+
+def _split_conditions(tokens: List[str]) -> List[str]:
+    """
+    Split WHERE tokens on AND, GAQL has no OR. The AND of a BETWEEN belongs to the condition.
+    """
+    conditions, condition, in_between = [], [], False
+    for token in tokens:
+        if token == "and" and not in_between:
+            conditions.append(" ".join(condition))
+            condition = []
+            continue
+        if token == "between":
+            in_between = True
+        elif token == "and":
+            in_between = False
+        condition.append(token)
+    if condition:
+        conditions.append(" ".join(condition))
+    return conditions
+
+
+def normalize_query(query: str) -> str:
+    """
+    Normalize a GAQL query so that equivalent queries compare equal: whitespace and case are
+    collapsed, clauses are put in canonical order, selected fields and WHERE conditions are sorted.
+    String literals and the ORDER BY sequence are kept as written.
+
+    Args:
+        query: GAQL query
+
+    Returns:
+        str: Normalized query
+    """
+    clauses = split_clauses(query)
+    parts = []
+    for name in CLAUSE_ORDER:
+        if name not in clauses:
+            continue
+        tokens = clauses[name]
+        if name in ("select", "parameters"):
+            body = ", ".join(sorted(set(_split_list(tokens))))
+        elif name == "where":
+            body = " and ".join(sorted(_split_conditions(tokens)))
+        elif name == "order by":
+            body = ", ".join(_split_list(tokens))
+        else:
+            body = " ".join(tokens)
+        parts.append(f"{name} {body}")
+    return " ".join(parts)
+
+
+def get_resource(query: str) -> str:
+    """
+    Return the resource in the FROM clause of a GAQL query, e.g. "campaign".
+
+    Args:
+        query: GAQL query
+
+    Returns:
+        str: Resource name, or an empty string if there is no FROM clause
+    """
+    tokens = split_clauses(query).get("from")
+    return tokens[0] if tokens else ""
+
+
+############## Parser ##############
+
+# like _TOKEN, but any other character becomes a token of its own so that it can be reported
+_PARSER_TOKEN = re.compile(_TOKEN.pattern + r"|\S")
+_FIELD_NAME = re.compile(r"^[a-z_][a-z0-9_]*(\.[a-z0-9_]+)*$")
+_IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+_NUMBER = re.compile(r"^-?\d+(\.\d+)?$")
+
+DATE_RANGES = {
+    "TODAY", "YESTERDAY", "LAST_7_DAYS", "LAST_BUSINESS_WEEK", "THIS_MONTH", "LAST_MONTH",
+    "LAST_14_DAYS", "LAST_30_DAYS", "THIS_WEEK_SUN_TODAY", "THIS_WEEK_MON_TODAY",
+    "LAST_WEEK_SUN_SAT", "LAST_WEEK_MON_SUN",
+}
+CORE_DATE_SEGMENTS = {"segments.date", "segments.week", "segments.month", "segments.quarter", "segments.year"}
+_COMPARISONS = {"=", "!=", ">", ">=", "<", "<="}
+
+
+class GaqlSyntaxError(ValueError):
+    """
+    The query is not valid GAQL. The message points at the offending token.
+    """
+
+    def __init__(self, message: str, query: str, position: int):
+        self.position = position
+        snippet = query[max(0, position - 20):position + 20].replace("\n", " ")
+        super().__init__(f"Invalid GAQL: {message} at position {position} (near '{snippet.strip()}')")
+
+
+class GaqlValidationError(ValueError):
+    """
+    The query is syntactically valid GAQL but would be rejected by the API, e.g. because of an unknown field.
+    """
+
+    def __init__(self, problems: List[str]):
+        self.problems = problems
+        super().__init__("Invalid GAQL: " + "; ".join(problems))
+
+
+@dataclasses.dataclass
+class Condition:
+    """
+    WHERE condition, e.g. field="campaign.status", operator="IN", values=["'ENABLED'", "'PAUSED'"].
+    Values are kept as written, string literals with their quotes.
+    """
+    field: str
+    operator: str
+    values: List[str] = dataclasses.field(default_factory=list)
+
+
+@dataclasses.dataclass
+class Ordering:
+    field: str
+    descending: bool = False
+
+
+@dataclasses.dataclass
+class Query:
+    """
+    Parsed GAQL query.
+    """
+    fields: List[str]
+    resource: str
+    conditions: List[Condition] = dataclasses.field(default_factory=list)
+    ordering: List[Ordering] = dataclasses.field(default_factory=list)
+    limit: Optional[int] = None
+    parameters: Dict[str, str] = dataclasses.field(default_factory=dict)
+
+    def all_fields(self) -> List[str]:
+        """
+        Return the fields used anywhere in the query, selected fields first, without duplicates.
+        """
+        fields = list(self.fields)
+        for name in [condition.field for condition in self.conditions] + [ordering.field for ordering in self.ordering]:
+            if name not in fields:
+                fields.append(name)
+        return fields
+
+
+class _Parser:
+    def __init__(self, query: str):
+        self.query = query
+        self.tokens = [(match.group(), match.start()) for match in _PARSER_TOKEN.finditer(query)]
+        self.index = 0
+
+    def error(self, message: str) -> GaqlSyntaxError:
+        position = self.tokens[self.index][1] if self.index < len(self.tokens) else len(self.query)
+        return GaqlSyntaxError(message, self.query, position)
+
+    def peek(self, offset: int = 0) -> Optional[str]:
+        index = self.index + offset
+        return self.tokens[index][0] if index < len(self.tokens) else None
+
+    def peek_keyword(self, offset: int = 0) -> Optional[str]:
+        token = self.peek(offset)
+        return token.upper() if token is not None and token[0] not in "'\"" else None
+
+    def next(self, expected: str) -> str:
+        token = self.peek()
+        if token is None:
+            raise self.error(f"expected {expected} but the query ended")
+        self.index += 1
+        return token
+
+    def expect_keyword(self, keyword: str) -> None:
+        if self.peek_keyword() != keyword:
+            found = self.peek()
+            raise self.error(f"expected {keyword}" + (f" but found '{found}'" if found else " but the query ended"))
+        self.index += 1
+
+    def field_name(self) -> str:
+        token = self.next("a field name")
+        if not _FIELD_NAME.match(token.lower()):
+            self.index -= 1
+            raise self.error(f"expected a field name but found '{token}'")
+        return token.lower()
+
+    def value(self) -> str:
+        token = self.next("a value")
+        if token[0] in "'\"" or _NUMBER.match(token) or _IDENTIFIER.match(token):
+            return token
+        self.index -= 1
+        raise self.error(f"expected a value but found '{token}'")
+
+    def value_list(self) -> List[str]:
+        if self.peek() != "(":
+            raise self.error("expected a list of values in parentheses")
+        self.index += 1
+        values = [self.value()]
+        while self.peek() == ",":
+            self.index += 1
+            values.append(self.value())
+        if self.peek() != ")":
+            raise self.error("expected ',' or ')' in the list of values")
+        self.index += 1
+        return values
+
+    def condition(self) -> Condition:
+        name = self.field_name()
+        operator = self.peek_keyword()
+        if operator is None:
+            raise self.error(f"expected an operator after '{name}'")
+
+        if operator in _COMPARISONS:
+            self.index += 1
+            return Condition(name, operator, [self.value()])
+        if operator in ("LIKE", "REGEXP_MATCH"):
+            self.index += 1
+            return Condition(name, operator, [self.value()])
+        if operator == "IN":
+            self.index += 1
+            return Condition(name, operator, self.value_list())
+        if operator == "NOT":
+            self.index += 1
+            negated = self.peek_keyword()
+            if negated == "IN":
+                self.index += 1
+                return Condition(name, "NOT IN", self.value_list())
+            if negated in ("LIKE", "REGEXP_MATCH"):
+                self.index += 1
+                return Condition(name, f"NOT {negated}", [self.value()])
+            raise self.error("expected IN, LIKE or REGEXP_MATCH after NOT")
+        if operator == "CONTAINS":
+            self.index += 1
+            quantifier = self.peek_keyword()
+            if quantifier not in ("ANY", "ALL", "NONE"):
+                raise self.error("expected ANY, ALL or NONE after CONTAINS")
+            self.index += 1
+            return Condition(name, f"CONTAINS {quantifier}", self.value_list())
+        if operator == "IS":
+            self.index += 1
+            if self.peek_keyword() == "NOT":
+                self.index += 1
+                self.expect_keyword("NULL")
+                return Condition(name, "IS NOT NULL")
+            self.expect_keyword("NULL")
+            return Condition(name, "IS NULL")
+        if operator == "DURING":
+            self.index += 1
+            date_range = self.peek_keyword()
+            if date_range not in DATE_RANGES:
+                raise self.error(f"expected one of {', '.join(sorted(DATE_RANGES))} after DURING")
+            self.index += 1
+            return Condition(name, operator, [date_range])
+        if operator == "BETWEEN":
+            self.index += 1
+            low = self.value()
+            self.expect_keyword("AND")
+            return Condition(name, operator, [low, self.value()])
+        raise self.error(f"unknown operator '{self.peek()}'")
+
+    def parse(self) -> Query:
+        self.expect_keyword("SELECT")
+        fields = [self.field_name()]
+        while self.peek() == ",":
+            self.index += 1
+            fields.append(self.field_name())
+
+        self.expect_keyword("FROM")
+        resource = self.field_name()
+        if "." in resource:
+            self.index -= 1
+            raise self.error(f"expected a resource name after FROM but found '{resource}'")
+        query = Query(fields, resource)
+
+        if self.peek_keyword() == "WHERE":
+            self.index += 1
+            query.conditions.append(self.condition())
+            while self.peek_keyword() == "AND":
+                self.index += 1
+                query.conditions.append(self.condition())
+
+        if self.peek_keyword() == "ORDER":
+            self.index += 1
+            self.expect_keyword("BY")
+            while True:
+                ordering = Ordering(self.field_name())
+                if self.peek_keyword() in ("ASC", "DESC"):
+                    ordering.descending = self.peek_keyword() == "DESC"
+                    self.index += 1
+                query.ordering.append(ordering)
+                if self.peek() != ",":
+                    break
+                self.index += 1
+
+        if self.peek_keyword() == "LIMIT":
+            self.index += 1
+            token = self.next("a number")
+            if not token.isdigit() or int(token) <= 0:
+                self.index -= 1
+                raise self.error(f"expected a positive number after LIMIT but found '{token}'")
+            query.limit = int(token)
+
+        if self.peek_keyword() == "PARAMETERS":
+            self.index += 1
+            while True:
+                name = self.next("a parameter name")
+                if self.peek() != "=":
+                    raise self.error(f"expected '=' after parameter '{name}'")
+                self.index += 1
+                query.parameters[name.lower()] = self.value()
+                if self.peek() != ",":
+                    break
+                self.index += 1
+
+        if self.peek() is not None:
+            raise self.error(f"unexpected '{self.peek()}'")
+        return query
+
+
+def parse(query: str) -> Query:
+    """
+    Parse a GAQL query.
+
+    Args:
+        query: GAQL query
+
+    Returns:
+        Query: Parsed query
+
+    Raises:
+        GaqlSyntaxError: The query is not valid GAQL
+    """
+    return _Parser(query).parse()
+
+
+def format_condition(condition: Condition) -> str:
+    """
+    Return the GAQL text of a WHERE condition.
+    """
+    if condition.operator in ("IN", "NOT IN") or condition.operator.startswith("CONTAINS"):
+        return f"{condition.field} {condition.operator} ({', '.join(condition.values)})"
+    if condition.operator == "BETWEEN":
+        return f"{condition.field} BETWEEN {condition.values[0]} AND {condition.values[1]}"
+    return " ".join([condition.field, condition.operator] + condition.values)
+
+
+def format_query(query: Query) -> str:
+    """
+    Return the GAQL text of a parsed query, e.g. after changing its conditions.
+    """
+    text = f"SELECT {', '.join(query.fields)} FROM {query.resource}"
+    if query.conditions:
+        text += " WHERE " + " AND ".join(format_condition(condition) for condition in query.conditions)
+    if query.ordering:
+        text += " ORDER BY " + ", ".join(
+            f"{ordering.field} {'DESC' if ordering.descending else 'ASC'}" for ordering in query.ordering)
+    if query.limit is not None:
+        text += f" LIMIT {query.limit}"
+    if query.parameters:
+        text += " PARAMETERS " + ", ".join(f"{name} = {value}" for name, value in query.parameters.items())
+    return text
+
+
+def check_query(query: Query, is_manager: Optional[bool] = None) -> List[str]:
+    """
+    Check the rules that do not need the field catalog.
+
+    Args:
+        query: Parsed query
+        is_manager: Whether the query runs against a manager account, None if unknown
+
+    Returns:
+        List[str]: Problems found, empty if none
+    """
+    problems = []
+
+    duplicates = sorted({name for name in query.fields if query.fields.count(name) > 1})
+    if duplicates:
+        problems.append(f"fields selected more than once: {', '.join(duplicates)}")
+
+    selected_date_segments = CORE_DATE_SEGMENTS.intersection(query.fields)
+    if selected_date_segments:
+        operators = {condition.operator for condition in query.conditions if condition.field in CORE_DATE_SEGMENTS}
+        finite = (
+            operators & {"DURING", "BETWEEN", "=", "IN"}
+            or (operators & {">", ">="} and operators & {"<", "<="})
+        )
+        if not finite:
+            problems.append(
+                f"selecting {', '.join(sorted(selected_date_segments))} requires a finite date range filter in WHERE, "
+                f"e.g. segments.date DURING LAST_30_DAYS")
+
+    metrics = [name for name in query.all_fields() if name.startswith("metrics.")]
+    if is_manager and metrics:
+        problems.append(f"metrics cannot be requested for a manager account: {', '.join(metrics)}")
+
+    return problems
@@ -0,0 +1,264 @@
+import difflib
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from gaql import CORE_DATE_SEGMENTS, Query
+
+logger = logging.getLogger(__name__)
+
+# googleAdsFields:search query fetching everything the validator needs
+FIELDS_QUERY = (
+    "SELECT name, category, data_type, selectable, filterable, sortable, selectable_with, is_repeated, enum_values"
+)
+
+# googleAdsFields:search REST field name -> catalog key
+_FIELD_KEYS = {
+    "category": "category",
+    "dataType": "data_type",
+    "selectable": "selectable",
+    "filterable": "filterable",
+    "sortable": "sortable",
+    "selectableWith": "selectable_with",
+    "isRepeated": "is_repeated",
+    "enumValues": "enum_values",
+}
+
+
+def _field_resource(name: str) -> str:
+    """
+    Return the resource an attribute belongs to, e.g. "ad_group_ad" for "ad_group_ad.ad.id".
+    """
+    return name.split(".", 1)[0]
+
+
+class FieldCatalog:
+    """
+    Metadata of every GAQL field (category, data type, selectable/filterable/sortable, compatible fields),
+    downloaded once with googleAdsFields:search and kept as a JSON file per API version.
+
+    The catalog lets run_gaql reject queries the API would reject, without a round trip. A catalog older than
+    max_age seconds is still used while a fresh copy is downloaded.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        max_age: float = 7 * 24 * 3600,
+        retry_interval: float = 300,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.path = path
+        self.max_age = max_age
+        self.retry_interval = retry_interval
+        self._clock = clock
+        self._fields: Optional[Dict[str, Dict[str, Any]]] = None
+        self._fetched_at = 0.0
+        self._refresh_started_at: Optional[float] = None
+        self._load_lock = threading.Lock()
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        if self._fields is not None:
+            return self._fields
+
+        # the file may be loaded ahead of time by a warm-up thread while the event loop needs it
+        with self._load_lock:
+            if self._fields is not None:
+                return self._fields
+            fields = {}
+            if self.path and os.path.exists(self.path):
+                try:
+                    with open(self.path, "r") as f:
+                        payload = json.load(f)
+                    fields = payload.get("fields", {})
+                    self._fetched_at = payload.get("fetched_at", 0.0)
+                except (OSError, ValueError, AttributeError) as e:
+                    logger.warning(f"Ignoring unreadable GAQL field catalog {self.path}: {e}")
+                    fields = {}
+            self._fields = fields
+        return self._fields
+
+    def save(self) -> None:
+        """
+        Write the catalog to disk, replacing the previous file atomically.
+        A failed write is logged, the catalog keeps working in memory.
+        """
+        if not self.path or self._fields is None:
+            return
+
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump({"fetched_at": self._fetched_at, "fields": self._fields}, f, sort_keys=True)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"Failed to save GAQL field catalog {self.path}: {e}")
+
+    def load(self) -> None:
+        """
+        Read the file now rather than on first use, e.g. from a warm-up thread.
+        """
+        self._load()
+
+    def is_loaded(self) -> bool:
+        return bool(self._load())
+
+    def needs_refresh(self) -> bool:
+        """
+        Return whether the catalog is missing or stale, and no download was attempted in the last retry_interval seconds.
+        """
+        now = self._clock()
+        if self._refresh_started_at is not None and now - self._refresh_started_at < self.retry_interval:
+            return False
+        return not self.is_loaded() or now - self._fetched_at > self.max_age
+
+    def refresh_started(self) -> None:
+        self._refresh_started_at = self._clock()
+
+    def replace(self, rows: Iterable[Dict[str, Any]]) -> None:
+        """
+        Replace the catalog with googleAdsFields:search result rows and save it.
+
+        Args:
+            rows: Result rows, e.g. {"name": "campaign.id", "category": "ATTRIBUTE", "dataType": "INT64", ...}
+        """
+        fields = {}
+        for row in rows:
+            if not row.get("name"):
+                continue
+            fields[row["name"]] = {key: row[rest_key] for rest_key, key in _FIELD_KEYS.items() if rest_key in row}
+        self._fields = fields
+        self._fetched_at = self._clock()
+        self.save()
+
+    def get(self, name: str) -> Optional[Dict[str, Any]]:
+        return self._load().get(name)
+
+    def data_types(self, names: Iterable[str]) -> Dict[str, str]:
+        """
+        Return the data type of each known field, e.g. {"metrics.clicks": "INT64"}.
+        """
+        fields = self._load()
+        return {name: fields[name]["data_type"] for name in names if "data_type" in fields.get(name, {})}
+
+    def resources(self) -> List[str]:
+        return sorted(name for name, field in self._load().items() if field.get("category") == "RESOURCE")
+
+    def _unknown(self, name: str, kind: str) -> str:
+        problem = f"unknown {kind} '{name}'"
+        matches = difflib.get_close_matches(name, self._load().keys(), n=1)
+        if matches:
+            problem += f", did you mean '{matches[0]}'?"
+        return problem
+
+    def validate(self, query: Query) -> List[str]:
+        """
+        Check a parsed query against the catalog. Without a catalog nothing can be checked.
+
+        Args:
+            query: Parsed query
+
+        Returns:
+            List[str]: Problems found, empty if none
+        """
+        if not self.is_loaded():
+            return []
+
+        resource = self.get(query.resource)
+        if resource is None or resource.get("category") != "RESOURCE":
+            return [self._unknown(query.resource, "resource")]
+        compatible = set(resource.get("selectable_with", []))
+
+        problems = []
+        known = {}
+        for name in query.all_fields():
+            field = self.get(name)
+            if field is None or field.get("category") == "RESOURCE":
+                problems.append(self._unknown(name, "field"))
+                continue
+            known[name] = field
+
+            category = field.get("category")
+            if category == "ATTRIBUTE":
+                owner = _field_resource(name)
+                if owner != query.resource and owner not in compatible:
+                    problems.append(f"'{name}' cannot be used with FROM {query.resource}")
+            elif name not in compatible:
+                problems.append(f"{category.lower() if category else 'field'} '{name}' cannot be used with FROM {query.resource}")
+
+        for name in query.fields:
+            if name in known and not known[name].get("selectable"):
+                problems.append(f"'{name}' cannot be selected")
+        for condition in query.conditions:
+            if condition.field in known and not known[condition.field].get("filterable"):
+                problems.append(f"'{condition.field}' cannot be used in WHERE")
+        for ordering in query.ordering:
+            if ordering.field in known and not known[ordering.field].get("sortable"):
+                problems.append(f"'{ordering.field}' cannot be used in ORDER BY")
+
+        # a metric lists the segments it can be broken down by
+        metrics = [name for name in query.fields if known.get(name, {}).get("category") == "METRIC"]
+        segments = [name for name in query.fields if known.get(name, {}).get("category") == "SEGMENT"]
+        for metric in metrics:
+            metric_compatible = set(known[metric].get("selectable_with", []))
+            if not metric_compatible:
+                continue
+            for segment in segments:
+                if segment not in metric_compatible and segment not in CORE_DATE_SEGMENTS:
+                    problems.append(f"metric '{metric}' cannot be segmented by '{segment}'")
+
+        return problems
+
+    def describe_resource(self, resource: str) -> str:
+        """
+        Return a markdown list of the fields that can be used with FROM `resource`.
+        """
+        info = self.get(resource)
+        if info is None or info.get("category") != "RESOURCE":
+            return self._unknown(resource, "resource")
+
+        compatible = set(info.get("selectable_with", []))
+        sections = {"Attributes": [], "Attributed resources": [], "Segments": [], "Metrics": []}
+        for name, field in sorted(self._load().items()):
+            category = field.get("category")
+            if category == "ATTRIBUTE" and _field_resource(name) == resource:
+                sections["Attributes"].append(self._describe_field(name, field))
+            elif category == "RESOURCE" and name in compatible:
+                sections["Attributed resources"].append(f"- {name}")
+            elif category == "SEGMENT" and name in compatible:
+                sections["Segments"].append(self._describe_field(name, field))
+            elif category == "METRIC" and name in compatible:
+                sections["Metrics"].append(self._describe_field(name, field))
+
+        lines = [f"# FROM {resource}"]
+        for title, entries in sections.items():
+            if entries:
+                lines += ["", f"## {title}"] + entries
+        return "\n".join(lines)
+
+    @staticmethod
+    def _describe_field(name: str, field: Dict[str, Any]) -> str:
+        flags = [flag for flag in ("selectable", "filterable", "sortable") if field.get(flag)]
+        line = f"- {name} ({field.get('data_type', 'UNKNOWN')}{', repeated' if field.get('is_repeated') else ''}"
+        line += f"; {', '.join(flags)})" if flags else ")"
+        if field.get("enum_values"):
+            line += f": {', '.join(field['enum_values'])}"
+        return line
+
+    def stats(self) -> Dict[str, Any]:
+        fields = self._load()
+        categories: Dict[str, int] = {}
+        for field in fields.values():
+            category = field.get("category", "UNKNOWN")
+            categories[category] = categories.get(category, 0) + 1
+        return {
+            "fields": len(fields),
+            "categories": categories,
+            "age_seconds": round(self._clock() - self._fetched_at) if fields else None,
+        }
@@ -0,0 +1,252 @@
+import asyncio
+import dataclasses
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# the manager itself (level 0) and its direct client accounts (level 1)
+CLIENTS_QUERY = """
+SELECT
+    customer_client.id,
+    customer_client.descriptive_name,
+    customer_client.manager,
+    customer_client.status,
+    customer_client.currency_code,
+    customer_client.time_zone,
+    customer_client.level,
+    customer_client.hidden,
+    customer_client.test_account
+FROM customer_client
+WHERE customer_client.level <= 1
+"""
+
+# customer_client only lists active links
+LINKS_QUERY = """
+SELECT
+    customer_client_link.client_customer,
+    customer_client_link.status,
+    customer_client_link.hidden
+FROM customer_client_link
+WHERE customer_client_link.status IN ('PENDING', 'REFUSED', 'CANCELED', 'INACTIVE')
+"""
+
+Fetch = Callable[[str, str], Awaitable[List[Dict[str, Any]]]]
+
+
+@dataclasses.dataclass
+class AccountNode:
+    """
+    An account of a manager account hierarchy.
+
+    Attributes:
+        customer_id: Customer ID
+        name: Descriptive name, None for accounts only known from a link that is not active
+        manager: Whether the account is a manager account
+        status: Account status, e.g. ENABLED or CLOSED
+        link_status: Status of the link to its first manager, ACTIVE, PENDING, REFUSED, CANCELED or INACTIVE,
+                     None for the root
+        depth: Number of links from the root, 0 for the root
+        hidden: Whether the link to its first manager is hidden
+        test_account: Whether the account is a test account
+        currency_code: Currency code
+        time_zone: Time zone
+    """
+    customer_id: str
+    name: Optional[str] = None
+    manager: bool = False
+    status: Optional[str] = None
+    link_status: Optional[str] = None
+    depth: int = 0
+    hidden: bool = False
+    test_account: bool = False
+    currency_code: Optional[str] = None
+    time_zone: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dataclasses.asdict(self)
+
+
+def _client_customer_id(resource_name: str) -> Optional[str]:
+    # customers/1234567890
+    _, _, customer_id = (resource_name or "").rpartition("/")
+    return customer_id or None
+
+
+class AccountTree:
+    """
+    The accounts below a root account, with parent and child indexes for instant lookups.
+
+    An account linked to several managers of the hierarchy is a child of each of them; its first parent is the
+    one closest to the root, and the one used for its path and depth. Managers whose accounts could not be
+    listed are kept in `errors`, their accounts are missing.
+    """
+
+    def __init__(self, root_id: str, built_at: Optional[float] = None):
+        self.root_id = root_id
+        self.built_at = time.time() if built_at is None else built_at
+        self.nodes: Dict[str, AccountNode] = {root_id: AccountNode(root_id)}
+        self.children: Dict[str, List[str]] = {}
+        self.parents: Dict[str, List[str]] = {}
+        self.errors: Dict[str, str] = {}
+
+    def add_clients(self, manager_id: str, client_rows: Iterable[Dict[str, Any]],
+                    link_rows: Iterable[Dict[str, Any]] = ()) -> List[str]:
+        """
+        Add the accounts of the customer_client and customer_client_link rows of a manager.
+        Returns the manager accounts among them seen for the first time, to be walked next.
+        """
+        manager = self.nodes[manager_id]
+        new_managers = []
+        for row in client_rows:
+            client = row.get("customerClient") or {}
+            customer_id = str(client.get("id") or "")
+            if not customer_id:
+                continue
+            fields = {
+                "name": client.get("descriptiveName"),
+                "manager": bool(client.get("manager")),
+                "status": client.get("status"),
+                "test_account": bool(client.get("testAccount")),
+                "currency_code": client.get("currencyCode"),
+                "time_zone": client.get("timeZone"),
+            }
+            if customer_id == manager_id:
+                # the level 0 row describes the manager itself
+                for name, value in fields.items():
+                    setattr(manager, name, value)
+                continue
+            if self._link(manager, customer_id, "ACTIVE", bool(client.get("hidden")), fields) and fields["manager"]:
+                new_managers.append(customer_id)
+
+        for row in link_rows:
+            link = row.get("customerClientLink") or {}
+            customer_id = _client_customer_id(link.get("clientCustomer"))
+            if customer_id and customer_id != manager_id:
+                self._link(manager, customer_id, link.get("status"), bool(link.get("hidden")), {})
+        return new_managers
+
+    def _link(self, manager: AccountNode, customer_id: str, link_status: Optional[str], hidden: bool,
+              fields: Dict[str, Any]) -> bool:
+        # returns whether the account is new to the tree
+        children = self.children.setdefault(manager.customer_id, [])
+        if customer_id not in children:
+            children.append(customer_id)
+            self.parents.setdefault(customer_id, []).append(manager.customer_id)
+        node = self.nodes.get(customer_id)
+        if node is not None:
+            if node.link_status == "ACTIVE" or link_status != "ACTIVE":
+                return False
+            # only known from an inactive link so far, this manager becomes its first parent
+            self.parents[customer_id].remove(manager.customer_id)
+            self.parents[customer_id].insert(0, manager.customer_id)
+        self.nodes[customer_id] = AccountNode(customer_id, link_status=link_status, depth=manager.depth + 1,
+                                              hidden=hidden, **fields)
+        return True
+
+    def node(self, customer_id: str) -> AccountNode:
+        """
+        Return an account of the tree, raising ValueError if it is not in it.
+        """
+        node = self.nodes.get(customer_id)
+        if node is None:
+            raise ValueError(f"Account {customer_id} is not in the hierarchy of {self.root_id}")
+        return node
+
+    def descendants(self, customer_id: str) -> List[AccountNode]:
+        """
+        Return every account below an account, each once, in breadth-first order.
+        """
+        self.node(customer_id)
+        seen = {customer_id}
+        queue = [customer_id]
+        result = []
+        for current in queue:
+            for child in self.children.get(current, []):
+                if child not in seen:
+                    seen.add(child)
+                    queue.append(child)
+                    result.append(self.nodes[child])
+        return result
+
+    def leaves(self, customer_id: Optional[str] = None) -> List[AccountNode]:
+        """
+        Return the client (non-manager) accounts below an account, the root by default,
+        through active links only.
+        """
+        return [node for node in self.descendants(customer_id or self.root_id)
+                if not node.manager and node.link_status == "ACTIVE"]
+
+    def path(self, customer_id: str) -> List[AccountNode]:
+        """
+        Return the accounts from the root down to an account, following first parents.
+        """
+        path = [self.node(customer_id)]
+        while path[-1].customer_id != self.root_id:
+            path.append(self.nodes[self.parents[path[-1].customer_id][0]])
+        return path[::-1]
+
+    def to_dict(self, customer_id: Optional[str] = None, max_depth: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Return the tree below an account, the root by default, as nested dicts with a "children" list.
+        """
+
+        def subtree(node_id: str, depth: int, ancestors: Tuple[str, ...]) -> Dict[str, Any]:
+            result = self.nodes[node_id].to_dict()
+            children = [child for child in self.children.get(node_id, []) if child not in ancestors]
+            if max_depth is not None and depth >= max_depth:
+                result["children"] = []
+                result["child_count"] = len(children)
+            else:
+                result["children"] = [subtree(child, depth + 1, ancestors + (node_id,)) for child in children]
+            return result
+
+        return subtree(self.node(customer_id or self.root_id).customer_id, 0, ())
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Account counts, depth, build time and errors of the tree.
+        """
+        nodes = list(self.nodes.values())
+        return {
+            "root": self.root_id,
+            "accounts": len(nodes),
+            "managers": sum(1 for node in nodes if node.manager),
+            "clients": len(self.leaves()),
+            "inactive_links": sum(1 for node in nodes if node.link_status not in (None, "ACTIVE")),
+            "depth": max(node.depth for node in nodes),
+            "built_at": self.built_at,
+            "age_seconds": round(time.time() - self.built_at, 1),
+            "errors": dict(self.errors),
+        }
+
+
+async def build_tree(root_id: str, fetch: Fetch, concurrency: int = 10) -> AccountTree:
+    """
+    Walk the hierarchy below a root account one level at a time, listing the accounts of all the managers
+    of a level at the same time, at most `concurrency` at once. fetch(customer_id, gaql) runs a GAQL query.
+    A manager that fails is recorded in the tree's errors, unless it is the root.
+    """
+    tree = AccountTree(root_id)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def walk(manager_id: str) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        async with semaphore:
+            clients, links = await asyncio.gather(fetch(manager_id, CLIENTS_QUERY), fetch(manager_id, LINKS_QUERY))
+        return clients, links
+
+    level = [root_id]
+    while level:
+        results = await asyncio.gather(*[walk(manager_id) for manager_id in level], return_exceptions=True)
+        next_level = []
+        for manager_id, result in zip(level, results):
+            if isinstance(result, BaseException):
+                if manager_id == root_id:
+                    raise result
+                logger.warning(f"Failed to list the accounts of manager {manager_id}: {result!r}")
+                tree.errors[manager_id] = str(result) or repr(result)
+                continue
+            next_level.extend(tree.add_clients(manager_id, *result))
+        level = next_level
+    return tree
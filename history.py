@@ -0,0 +1,189 @@
+import dataclasses
+import datetime
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zoneinfo
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import gaql as gaql_parser
+from shards import DATE_FIELD, date_window
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS queries (
+    query_key TEXT PRIMARY KEY,
+    resource TEXT NOT NULL,
+    query TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS days (
+    customer_id TEXT NOT NULL,
+    query_key TEXT NOT NULL,
+    day TEXT NOT NULL,
+    row_count INTEGER NOT NULL,
+    rows TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    PRIMARY KEY (customer_id, query_key, day)
+) WITHOUT ROWID;
+"""
+
+
+@dataclasses.dataclass
+class HistoryPlan:
+    """
+    How a date-segmented query is split between stored days and days fetched from the API.
+
+    Attributes:
+        query: Parsed query
+        key: Hash of the query without its date window and LIMIT, the same for every window
+        base_query: GAQL text the key is computed from
+        days: Every day of the window, in order
+        settled_end: Last day whose metrics no longer change; days up to it are stored, later days always fetched
+    """
+    query: gaql_parser.Query
+    key: str
+    base_query: str
+    days: List[datetime.date]
+    settled_end: datetime.date
+
+
+def account_today(time_zone: Optional[str] = None) -> datetime.date:
+    """
+    Return today's date in the time zone of an account, in UTC if it is unknown.
+    """
+    try:
+        tz = zoneinfo.ZoneInfo(time_zone) if time_zone else datetime.timezone.utc
+    except (zoneinfo.ZoneInfoNotFoundError, ValueError):
+        tz = datetime.timezone.utc
+    return datetime.datetime.now(tz).date()
+
+
+def plan_history(gaql: str, today: datetime.date, mutable_days: int) -> Optional[HistoryPlan]:
+    """
+    Plan a query for the history store, or return None if the store cannot serve it: the query must select
+    segments.date, restrict it to a window of literal dates, have no LIMIT and cover at least one settled day,
+    i.e. one more than mutable_days before today.
+    """
+    try:
+        query = gaql_parser.parse(gaql)
+    except gaql_parser.GaqlSyntaxError:
+        return None
+    if DATE_FIELD not in query.fields or query.limit is not None:
+        return None
+    window = date_window(query)
+    settled_end = today - datetime.timedelta(days=mutable_days + 1)
+    if window is None or window[0] > settled_end:
+        return None
+
+    base = dataclasses.replace(query, conditions=[c for c in query.conditions if c.field != DATE_FIELD])
+    base_query = gaql_parser.format_query(base)
+    key = hashlib.sha256(base_query.encode("utf-8")).hexdigest()[:32]
+    days = [window[0] + datetime.timedelta(days=offset) for offset in range((window[1] - window[0]).days + 1)]
+    return HistoryPlan(query, key, base_query, days, settled_end)
+
+
+def contiguous_ranges(days: Iterable[datetime.date]) -> List[Tuple[datetime.date, datetime.date]]:
+    """
+    Group days into the fewest [start, end] ranges of consecutive days.
+    """
+    ranges: List[Tuple[datetime.date, datetime.date]] = []
+    for day in sorted(set(days)):
+        if ranges and day == ranges[-1][1] + datetime.timedelta(days=1):
+            ranges[-1] = (ranges[-1][0], day)
+        else:
+            ranges.append((day, day))
+    return ranges
+
+
+def rows_by_day(rows: Iterable[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Group result rows by their segments.date, keeping their order within each day.
+    """
+    days: Dict[str, List[Dict[str, Any]]] = {}
+    for row in rows:
+        days.setdefault(row.get("segments", {}).get("date"), []).append(row)
+    return days
+
+
+class HistoryStore:
+    """
+    On-disk store of the rows of date-segmented GAQL queries, one entry per account, query and day.
+
+    Metrics of days older than the conversion lag window do not change any more, so a report over a long
+    window only needs the days it has not stored yet and the recent, still changing days from the API.
+    Days are keyed by a hash of the query without its date window, so that any window of the same query
+    shares them, and clustered by that key and date so a window is read with one index range scan.
+    Days without rows are stored too, as empty lists.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._connection: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.executescript(_SCHEMA)
+            self._connection = connection
+        return self._connection
+
+    def close(self) -> None:
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    def get(self, customer_id: str, key: str, start: datetime.date, end: datetime.date) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Return the stored days of a query between start and end, ISO date -> rows.
+        """
+        with self._lock:
+            stored = self._connect().execute(
+                "SELECT day, rows FROM days WHERE customer_id = ? AND query_key = ? AND day BETWEEN ? AND ?",
+                (customer_id, key, start.isoformat(), end.isoformat()),
+            ).fetchall()
+        return {day: json.loads(rows) for day, rows in stored}
+
+    def put(self, customer_id: str, plan: HistoryPlan, days: Dict[str, List[Dict[str, Any]]],
+            fetched_at: Optional[float] = None) -> int:
+        """
+        Store the rows of settled days of a planned query, ISO date -> rows, in one transaction.
+        """
+        fetched_at = time.time() if fetched_at is None else fetched_at
+        values = [(customer_id, plan.key, day, len(rows), json.dumps(rows, separators=(",", ":")), fetched_at)
+                  for day, rows in days.items()]
+        with self._lock, self._connect() as connection:
+            connection.execute("INSERT OR IGNORE INTO queries VALUES (?, ?, ?)",
+                               (plan.key, plan.query.resource, plan.base_query))
+            connection.executemany("INSERT OR REPLACE INTO days VALUES (?, ?, ?, ?, ?, ?)", values)
+        return len(values)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Stored queries, days and rows per account and resource, with the stored date range.
+        """
+        with self._lock:
+            counts = self._connect().execute(
+                "SELECT days.customer_id, queries.resource, COUNT(DISTINCT days.query_key), COUNT(*), "
+                "SUM(days.row_count), MIN(days.day), MAX(days.day) "
+                "FROM days JOIN queries ON queries.query_key = days.query_key "
+                "GROUP BY days.customer_id, queries.resource"
+            ).fetchall()
+
+        result: Dict[str, Any] = {}
+        for customer_id, resource, queries, days, rows, first, last in counts:
+            result.setdefault(customer_id, {})[resource] = {
+                "queries": queries, "days": days, "rows": rows, "first_day": first, "last_day": last,
+            }
+        return result
@@ -0,0 +1,70 @@
+import asyncio
+import logging
+from typing import Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+
+def http2_available() -> bool:
+    """
+    HTTP/2 needs the optional h2 package, httpx falls back to HTTP/1.1 without it.
+    """
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class HttpClientPool:
+    """
+    One shared httpx.AsyncClient with a keep-alive connection pool for all Google Ads API calls.
+
+    An AsyncClient is bound to the event loop it first ran on. The MCP server runs a single loop,
+    but scripts calling tools through repeated asyncio.run() get a fresh client for each new loop.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 60.0,
+        timeout: float = 60.0,
+        connect_timeout: float = 10.0,
+        http2: Optional[bool] = None,
+    ):
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self.http2 = http2_available() if http2 is None else http2
+
+        self._client: Optional[httpx.AsyncClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def get_client(self) -> httpx.AsyncClient:
+        """
+        Return the pooled client for the running event loop, creating it on first use.
+
+        Returns:
+            httpx.AsyncClient: Shared client
+        """
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client.is_closed or self._loop is not loop:
+            self._client = httpx.AsyncClient(limits=self.limits, timeout=self.timeout, http2=self.http2)
+            self._loop = loop
+            logger.debug(f"Created HTTP client (http2={self.http2}, limits={self.limits})")
+        return self._client
+
+    async def aclose(self) -> None:
+        """
+        Close the pooled connections. The next request opens a new client.
+        """
+        if self._client is not None and self._loop is asyncio.get_running_loop():
+            await self._client.aclose()
+        self._client = None
+        self._loop = None
@@ -0,0 +1,242 @@
+import binascii
+import hashlib
+import json
+import logging
+import mmap
+import os
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# formats accepted by image assets
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".gif")
+
+# existing image assets of an account; the API exposes no content hash, so images whose size matches a local file are downloaded and hashed
+SEED_QUERY = """
+SELECT asset.resource_name, asset.name, asset.image_asset.file_size, asset.image_asset.full_size.url
+FROM asset
+WHERE asset.type = 'IMAGE'
+"""
+
+# multiple of 3 bytes, so that the base64 of consecutive chunks concatenates without padding in between
+_CHUNK_SIZE = 3 * 1024 * 1024
+
+
+def find_images(path: str, recursive: bool = False) -> List[str]:
+    """
+    Return the image files at a path: the file itself, or the images in a directory sorted by path.
+
+    Args:
+        path: Image file or directory
+        recursive: Whether to include the images in subdirectories
+
+    Returns:
+        List[str]: Absolute paths of the images
+    """
+    path = os.path.abspath(os.path.expanduser(path))
+    if os.path.isfile(path):
+        if not path.lower().endswith(IMAGE_EXTENSIONS):
+            raise ValueError(f"{path} is not an image, expected one of {', '.join(IMAGE_EXTENSIONS)}")
+        return [path]
+    if not os.path.isdir(path):
+        raise ValueError(f"No such file or directory: {path}")
+
+    images = []
+    for directory, subdirectories, files in os.walk(path):
+        subdirectories.sort()
+        images.extend(os.path.join(directory, name) for name in sorted(files) if name.lower().endswith(IMAGE_EXTENSIONS))
+        if not recursive:
+            break
+    if not images:
+        raise ValueError(f"No images ({', '.join(IMAGE_EXTENSIONS)}) in {path}")
+    return images
+
+
+def _mapped(f: Any) -> Any:
+    # mmap refuses empty files
+    if os.fstat(f.fileno()).st_size == 0:
+        return memoryview(b"")
+    return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def file_digest(path: str) -> str:
+    """
+    Return the SHA-256 of a file, hashed from a memory map without reading the file into memory.
+    """
+    with open(path, "rb") as f:
+        data = _mapped(f)
+        try:
+            return hashlib.sha256(data).hexdigest()
+        finally:
+            data.release() if isinstance(data, memoryview) else data.close()
+
+
+def encode_base64(path: str) -> str:
+    """
+    Return the base64 encoding of a file, encoded chunk by chunk from a memory map, so that
+    the raw file is never held in memory next to its encoding.
+    """
+    with open(path, "rb") as f:
+        data = _mapped(f)
+        try:
+            parts = [binascii.b2a_base64(data[start:start + _CHUNK_SIZE], newline=False)
+                     for start in range(0, len(data), _CHUNK_SIZE)]
+        finally:
+            data.release() if isinstance(data, memoryview) else data.close()
+    return b"".join(parts).decode("ascii")
+
+
+def encoded_size(file_size: int) -> int:
+    """
+    Return the length of the base64 encoding of a file of file_size bytes.
+    """
+    return 4 * ((file_size + 2) // 3)
+
+
+def asset_name(path: str) -> str:
+    """
+    Return the asset name of an image file, its file name.
+    """
+    return os.path.basename(path)
+
+
+class ImageAssetIndex:
+    """
+    Persistent index of the image assets of each account by content hash, so that an image is uploaded only once.
+
+    Uploaded images are recorded with their SHA-256. Assets that existed before are seeded from a GAQL query
+    with their file size and URL, and only hashed when a local image of the same size is looked up.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_age: float = 7 * 24 * 3600):
+        self.path = path
+        self.max_age = max_age
+        self._customers: Optional[Dict[str, Dict[str, Any]]] = None
+        self._load_lock = threading.Lock()
+        # changes happen on the event loop while save() may run in a thread
+        self._lock = threading.RLock()
+        self._save_lock = threading.Lock()
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        if self._customers is not None:
+            return self._customers
+
+        with self._load_lock:
+            if self._customers is not None:
+                return self._customers
+            customers = {}
+            if self.path and os.path.exists(self.path):
+                try:
+                    with open(self.path, "r") as f:
+                        customers = json.load(f)
+                except (OSError, ValueError) as e:
+                    logger.warning(f"Ignoring unreadable image asset index {self.path}: {e}")
+            self._customers = customers
+        return self._customers
+
+    def save(self) -> None:
+        """
+        Write the index to disk, replacing the previous file atomically. Safe to call from a thread.
+        A failed write is logged, the index keeps working in memory.
+        """
+        if not self.path or self._customers is None:
+            return
+
+        with self._lock:
+            text = json.dumps(self._customers, indent=2, sort_keys=True)
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with self._save_lock:
+                with open(tmp_path, "w") as f:
+                    f.write(text)
+                os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"Failed to save image asset index {self.path}: {e}")
+
+    def _customer(self, customer_id: str) -> Dict[str, Any]:
+        customers = self._load()
+        with self._lock:
+            return customers.setdefault(customer_id, {"images": {}, "unhashed": {}, "seeded_at": 0})
+
+    def is_seeded(self, customer_id: str) -> bool:
+        """
+        Return whether the existing assets of the account were listed less than max_age seconds ago.
+        """
+        customer = self._load().get(customer_id)
+        return customer is not None and time.time() - customer.get("seeded_at", 0) <= self.max_age
+
+    def seed(self, customer_id: str, rows: Iterable[Dict[str, Any]], save: bool = True) -> int:
+        """
+        Record the existing image assets of an account from the rows of SEED_QUERY.
+
+        Returns:
+            int: Number of assets whose content hash is not known yet
+        """
+        customer = self._customer(customer_id)
+        hashed = {image["resource_name"] for image in customer["images"].values()}
+        unhashed = {}
+        for row in rows:
+            asset = row.get("asset") or {}
+            resource_name = asset.get("resourceName")
+            if not resource_name or resource_name in hashed:
+                continue
+            image_asset = asset.get("imageAsset") or {}
+            unhashed[resource_name] = {
+                "name": asset.get("name"),
+                "file_size": int(image_asset["fileSize"]) if image_asset.get("fileSize") is not None else None,
+                "url": (image_asset.get("fullSize") or {}).get("url"),
+            }
+        with self._lock:
+            customer["unhashed"] = unhashed
+            customer["seeded_at"] = time.time()
+        if save:
+            self.save()
+        return len(unhashed)
+
+    def find(self, customer_id: str, digest: str) -> Optional[str]:
+        """
+        Return the resource name of the account's image asset with this content hash, if known.
+        """
+        image = self._customer(customer_id)["images"].get(digest)
+        return image["resource_name"] if image else None
+
+    def candidates(self, customer_id: str, file_size: int) -> List[Dict[str, Any]]:
+        """
+        Return the existing assets of this file size whose content hash is not known yet, with their URL.
+        """
+        return [
+            {"resource_name": resource_name, **asset}
+            for resource_name, asset in self._customer(customer_id)["unhashed"].items()
+            if asset.get("file_size") == file_size and asset.get("url")
+        ]
+
+    def record(
+        self,
+        customer_id: str,
+        digest: str,
+        resource_name: str,
+        name: Optional[str] = None,
+        file_size: Optional[int] = None,
+        save: bool = True,
+    ) -> None:
+        """
+        Record the content hash of an image asset.
+        """
+        with self._lock:
+            customer = self._customer(customer_id)
+            customer["unhashed"].pop(resource_name, None)
+            customer["images"][digest] = {"resource_name": resource_name, "name": name, "file_size": file_size}
+        if save:
+            self.save()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            customer_id: {"hashed": len(customer["images"]), "unhashed": len(customer["unhashed"]),
+                          "seeded_at": customer.get("seeded_at")}
+            for customer_id, customer in self._load().items()
+        }
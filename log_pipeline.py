@@ -0,0 +1,241 @@
+import atexit
+import datetime
+import hashlib
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import re
+import sys
+from typing import Any, Dict, List, Optional, TextIO
+
+FORMATS = ("json", "text")
+
+# payload keys holding binary data as base64, e.g. imageAsset.data, always hashed rather than truncated
+BLOB_KEYS = frozenset({"data", "imageData", "fileData"})
+
+_BASE64 = re.compile(r"[A-Za-z0-9+/=_-]+")
+
+# attributes every LogRecord has, the others were passed with extra={...}
+_RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "taskName"}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def _digest(value: str) -> str:
+    return f"<{len(value)} chars sha256:{hashlib.sha256(value.encode()).hexdigest()[:16]}>"
+
+
+def redact(value: Any, max_string: int = 256, max_items: int = 50, key: Optional[str] = None) -> Any:
+    """
+    Return a copy of a JSON payload that is safe to log: blobs and long base64 strings are replaced by their
+    length and hash, other long strings are truncated and long lists are cut.
+
+    Example:
+        redact({"imageAsset": {"data": "iVBORw0KGgo..."}}) == {"imageAsset": {"data": "<2832 chars sha256:5f1c0a9e3b7d2c41>"}}
+
+    Args:
+        value: Payload, e.g. a request body
+        max_string: Strings longer than this many characters are hashed or truncated
+        max_items: Lists longer than this many items are cut to this many
+        key: Key of the value in its parent dict
+
+    Returns:
+        Any: The redacted copy
+    """
+    if isinstance(value, str):
+        if len(value) <= max_string:
+            return value
+        if key in BLOB_KEYS or _BASE64.fullmatch(value):
+            return _digest(value)
+        return f"{value[:max_string]}...<{len(value) - max_string} more chars>"
+    if isinstance(value, dict):
+        return {k: redact(v, max_string, max_items, k) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        items = [redact(item, max_string, max_items, key) for item in value[:max_items]]
+        if len(value) > max_items:
+            items.append(f"<{len(value) - max_items} more items>")
+        return items
+    if isinstance(value, (bytes, bytearray)):
+        return f"<{len(value)} bytes sha256:{hashlib.sha256(value).hexdigest()[:16]}>"
+    return value
+
+
+def _extras(record: logging.LogRecord) -> Dict[str, Any]:
+    return {key: value for key, value in vars(record).items() if key not in _RECORD_ATTRIBUTES}
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per line with the time, level, logger, message, extra fields and exception.
+    Extra fields are redacted unless `redact_payloads` is False.
+    """
+
+    def __init__(self, redact_payloads: bool = True, max_string: int = 256, max_items: int = 50):
+        super().__init__()
+        self.redact_payloads = redact_payloads
+        self.max_string = max_string
+        self.max_items = max_items
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in _extras(record).items():
+            entry[key] = redact(value, self.max_string, self.max_items, key) if self.redact_payloads else value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """
+    The classic "time - level - message" line, followed by the redacted extra fields as compact JSON.
+    """
+
+    def __init__(self, max_string: int = 256, max_items: int = 50):
+        super().__init__("%(asctime)s - %(levelname)s - %(message)s")
+        self.max_string = max_string
+        self.max_items = max_items
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        extras = _extras(record)
+        if extras:
+            line += " " + json.dumps(redact(extras, self.max_string, self.max_items), default=str)
+        return line
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keep only a fraction of the INFO and DEBUG records of some loggers, e.g. {"google_ads.gaql": 0.1}.
+    Warnings and errors are always kept. A rate applies to the logger and its children.
+    """
+
+    def __init__(self, rates: Dict[str, float], random_source: Any = random.random):
+        super().__init__()
+        # most specific logger name first
+        self.rates = sorted(rates.items(), key=lambda item: -len(item[0]))
+        self._random = random_source
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        for name, rate in self.rates:
+            if record.name == name or record.name.startswith(name + "."):
+                return rate >= 1 or self._random() < rate
+        return True
+
+
+class _PayloadFilter(logging.Filter):
+    def filter(self, record: logging.LogRecord) -> bool:
+        return "payload" in vars(record)
+
+
+class _QueueListener(logging.handlers.QueueListener):
+    def stop(self) -> None:
+        # stopped when logging is configured again and at exit
+        if self._thread is not None:
+            super().stop()
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # formatting, redaction and serialization happen on the listener thread, not on the event loop;
+        # the record stays in this process, so it does not need to be made picklable
+        return record
+
+
+def parse_sampling(spec: str) -> Dict[str, float]:
+    """
+    Parse "logger=rate,logger=rate", e.g. "google_ads.gaql=0.1,httpx=0.05".
+    """
+    rates = {}
+    for entry in spec.split(","):
+        if not entry.strip():
+            continue
+        name, _, rate = entry.partition("=")
+        try:
+            rates[name.strip()] = float(rate)
+        except ValueError:
+            raise ValueError(f"Invalid log sampling entry '{entry}', expected logger=rate, e.g. httpx=0.1")
+    return rates
+
+
+def configure_logging(
+    level: int = logging.INFO,
+    format: str = "json",
+    stream: Optional[TextIO] = None,
+    sampling: Optional[Dict[str, float]] = None,
+    payload_path: Optional[str] = None,
+    payload_max_bytes: int = 50 * 1024 * 1024,
+    payload_backups: int = 3,
+    max_string: int = 256,
+    max_items: int = 50,
+) -> logging.handlers.QueueListener:
+    """
+    Route all log records through a queue to a background thread, which formats and writes them.
+    Logging then costs the caller little more than a queue put, whatever the size of the payload.
+
+    Pass payloads with extra={"payload": ...}: they are redacted in the log, and written in full to
+    a rotating file when `payload_path` is set, for debugging.
+
+    Args:
+        level: Level of the root logger
+        format: "json" for JSON lines or "text"
+        stream: Log destination, stderr by default (stdout carries the MCP stdio transport)
+        sampling: Fraction of INFO and DEBUG records kept per logger, see SamplingFilter
+        payload_path: File receiving the full payloads, disabled if None
+        payload_max_bytes: Size at which the payload file is rotated
+        payload_backups: Number of rotated payload files kept
+        max_string: Longer strings in logged payloads are hashed or truncated
+        max_items: Longer lists in logged payloads are cut
+
+    Returns:
+        logging.handlers.QueueListener: The running listener, stopped and flushed at exit
+    """
+    global _listener
+    if format not in FORMATS:
+        raise ValueError(f"Invalid log format '{format}', expected one of {', '.join(FORMATS)}")
+    if _listener is not None:
+        _listener.stop()
+
+    output = logging.StreamHandler(stream or sys.stderr)
+    if format == "json":
+        output.setFormatter(JsonFormatter(max_string=max_string, max_items=max_items))
+    else:
+        output.setFormatter(TextFormatter(max_string=max_string, max_items=max_items))
+    handlers: List[logging.Handler] = [output]
+
+    if payload_path:
+        payload_file = logging.handlers.RotatingFileHandler(
+            payload_path, maxBytes=payload_max_bytes, backupCount=payload_backups, encoding="utf-8")
+        payload_file.setFormatter(JsonFormatter(redact_payloads=False))
+        payload_file.addFilter(_PayloadFilter())
+        handlers.append(payload_file)
+
+    records: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    queue_handler = _QueueHandler(records)
+    if sampling:
+        queue_handler.addFilter(SamplingFilter(sampling))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+
+    _listener = _QueueListener(records, *handlers)
+    _listener.start()
+    return _listener
+
+
+@atexit.register
+def _stop() -> None:
+    # writes the records still in the queue
+    if _listener is not None:
+        _listener.stop()
@@ -0,0 +1,366 @@
+import bisect
+import collections
+import contextlib
+import contextvars
+import logging
+import math
+import threading
+import time
+import uuid
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# latency buckets in seconds, from a cached token lookup to a large report
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _labels(labels: Dict[str, Any]) -> Labels:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+class Histogram:
+    """
+    Cumulative bucket histogram, as in Prometheus.
+    """
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def percentile(self, percentile: float) -> Optional[float]:
+        """
+        Estimate a percentile (0-100) by linear interpolation inside the bucket it falls in.
+        """
+        if not self.count:
+            return None
+        rank = self.count * percentile / 100
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                lower = self.buckets[index - 1] if index > 0 else 0.0
+                if index == len(self.buckets):
+                    return lower
+                return lower + (self.buckets[index] - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+
+class MetricsRegistry:
+    """
+    Counters, gauges and histograms with labels, readable as JSON or in the Prometheus text format.
+    Thread safe, so that the Prometheus endpoint can read it from its own thread.
+    """
+
+    def __init__(self, namespace: str = "google_ads"):
+        self.namespace = namespace
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[Labels, float]] = collections.defaultdict(dict)
+        self._gauges: Dict[str, Dict[Labels, float]] = collections.defaultdict(dict)
+        self._histograms: Dict[str, Dict[Labels, Histogram]] = collections.defaultdict(dict)
+        self._help: Dict[str, str] = {}
+
+    def describe(self, name: str, help_text: str) -> None:
+        self._help[name] = help_text
+
+    def inc(self, name: str, amount: float = 1, **labels: Any) -> None:
+        key = _labels(labels)
+        with self._lock:
+            series = self._counters[name]
+            series[key] = series.get(key, 0) + amount
+
+    def add(self, name: str, delta: float, **labels: Any) -> None:
+        """
+        Move a gauge up or down, e.g. +1 when a request starts and -1 when it ends.
+        """
+        key = _labels(labels)
+        with self._lock:
+            series = self._gauges[name]
+            series[key] = series.get(key, 0) + delta
+
+    def observe(self, name: str, value: float, **labels: Any) -> None:
+        key = _labels(labels)
+        with self._lock:
+            histogram = self._histograms[name].get(key)
+            if histogram is None:
+                histogram = self._histograms[name][key] = Histogram()
+            histogram.observe(value)
+
+    @contextlib.contextmanager
+    def in_flight(self, name: str, **labels: Any) -> Iterator[None]:
+        self.add(name, 1, **labels)
+        try:
+            yield
+        finally:
+            self.add(name, -1, **labels)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Return every series as JSON-friendly dicts, histograms summarized as count, sum and estimated percentiles.
+
+        Example:
+        {
+            "histograms": {
+                "tool_seconds": [{"labels": {"tool": "run_gaql", "status": "ok"}, "count": 3, "sum": 1.2, "p50": 0.35, "p95": 0.48, "p99": 0.5}]
+            },
+            "counters": {"upstream_response_bytes_total": [{"labels": {"endpoint": "googleAds:searchStream"}, "value": 523411}]},
+            "gauges": {"tool_in_flight": [{"labels": {"tool": "run_gaql"}, "value": 0}]}
+        }
+        """
+        with self._lock:
+            histograms = {
+                name: [
+                    {
+                        "labels": dict(labels),
+                        "count": histogram.count,
+                        "sum": round(histogram.sum, 6),
+                        "p50": _round(histogram.percentile(50)),
+                        "p95": _round(histogram.percentile(95)),
+                        "p99": _round(histogram.percentile(99)),
+                    }
+                    for labels, histogram in sorted(series.items())
+                ]
+                for name, series in sorted(self._histograms.items())
+            }
+            counters = {
+                name: [{"labels": dict(labels), "value": value} for labels, value in sorted(series.items())]
+                for name, series in sorted(self._counters.items())
+            }
+            gauges = {
+                name: [{"labels": dict(labels), "value": value} for labels, value in sorted(series.items())]
+                for name, series in sorted(self._gauges.items())
+            }
+        return {"histograms": histograms, "counters": counters, "gauges": gauges}
+
+    def prometheus_text(self) -> str:
+        """
+        Return every series in the Prometheus text exposition format.
+        """
+        lines: List[str] = []
+
+        def header(name: str, kind: str) -> str:
+            full_name = f"{self.namespace}_{name}"
+            if name in self._help:
+                lines.append(f"# HELP {full_name} {self._help[name]}")
+            lines.append(f"# TYPE {full_name} {kind}")
+            return full_name
+
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                full_name = header(name, "counter")
+                for labels, value in sorted(series.items()):
+                    lines.append(f"{full_name}{_format_labels(labels)} {_format_value(value)}")
+            for name, series in sorted(self._gauges.items()):
+                full_name = header(name, "gauge")
+                for labels, value in sorted(series.items()):
+                    lines.append(f"{full_name}{_format_labels(labels)} {_format_value(value)}")
+            for name, series in sorted(self._histograms.items()):
+                full_name = header(name, "histogram")
+                for labels, histogram in sorted(series.items()):
+                    cumulative = 0
+                    for bound, count in zip(list(histogram.buckets) + [math.inf], histogram.counts):
+                        cumulative += count
+                        le = "+Inf" if bound == math.inf else _format_value(bound)
+                        lines.append(f"{full_name}_bucket{_format_labels(labels + (('le', le),))} {cumulative}")
+                    lines.append(f"{full_name}_sum{_format_labels(labels)} {_format_value(histogram.sum)}")
+                    lines.append(f"{full_name}_count{_format_labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+
+def _round(value: Optional[float]) -> Optional[float]:
+    return None if value is None else round(value, 6)
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    escaped = (
+        key + '="' + value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+        for key, value in labels
+    )
+    return "{" + ",".join(escaped) + "}"
+
+
+############## Tracing ##############
+
+# span of the code that is currently running, inherited by the tasks it starts
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("google_ads_span", default=None)
+
+
+class Span:
+    """
+    Timed operation, e.g. a tool call or one upstream request, with the spans it started as children.
+    """
+
+    max_children = 200
+
+    def __init__(self, name: str, parent: Optional["Span"], attributes: Dict[str, Any]):
+        self.name = name
+        self.trace_id = parent.trace_id if parent else uuid.uuid4().hex
+        self.span_id = uuid.uuid4().hex[:16]
+        self.attributes = {key: value for key, value in attributes.items() if value is not None}
+        self.started = time.time()
+        self.duration: Optional[float] = None
+        self.error: Optional[str] = None
+        self.children: List["Span"] = []
+        self.dropped_children = 0
+        # the matching OpenTelemetry span, parent of the OpenTelemetry spans of the children
+        self.otel_span: Any = None
+
+    def set(self, **attributes: Any) -> None:
+        self.attributes.update({key: value for key, value in attributes.items() if value is not None})
+
+    def to_dict(self) -> Dict[str, Any]:
+        span = {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "start": self.started,
+            "duration_ms": None if self.duration is None else round(self.duration * 1000, 2),
+            "attributes": self.attributes,
+        }
+        if self.error:
+            span["error"] = self.error
+        if self.children:
+            span["children"] = [child.to_dict() for child in self.children]
+        if self.dropped_children:
+            span["dropped_children"] = self.dropped_children
+        return span
+
+
+class Tracer:
+    """
+    Record spans linking each tool call to the upstream requests it made, and keep the latest traces in memory.
+    When the opentelemetry package is installed, every span is also reported as an OpenTelemetry span,
+    exported wherever the OpenTelemetry SDK of the process is configured to send them.
+    """
+
+    def __init__(self, max_traces: int = 100, service_name: str = "mcp-server-google-ads"):
+        self._traces: "collections.deque[Span]" = collections.deque(maxlen=max(max_traces, 1))
+        self.enabled = max_traces > 0
+        self.service_name = service_name
+        self._otel: Optional[Tuple[Any, Any]] = None
+
+    def _otel_tracer(self) -> Tuple[Any, Any]:
+        # imported on the first span and not at startup, opentelemetry takes a while to import
+        if self._otel is None:
+            try:
+                from opentelemetry import trace as otel_trace
+                self._otel = (otel_trace, otel_trace.get_tracer(self.service_name))
+            except ImportError:
+                self._otel = (None, None)
+        return self._otel
+
+    @contextlib.contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[Span]:
+        """
+        Time the block as a span, child of the span that is currently running, if any.
+
+        Example:
+            with tracer.span("POST googleAds:searchStream", customer_id=customer_id) as span:
+                ...
+                span.set(status_code=200)
+        """
+        parent = _current_span.get()
+        span = Span(name, parent, attributes)
+        token = _current_span.set(span)
+        otel_trace, otel_tracer = self._otel_tracer()
+        otel_span = None
+        if otel_tracer is not None:
+            # without a parent, the span joins the OpenTelemetry context of the caller, if any
+            context = otel_trace.set_span_in_context(parent.otel_span) if parent and parent.otel_span else None
+            otel_span = otel_tracer.start_span(name, context=context, attributes=_otel_attributes(span.attributes))
+            span.otel_span = otel_span
+        started = time.perf_counter()
+        try:
+            yield span
+        except BaseException as e:
+            span.error = f"{type(e).__name__}: {e}"[:500]
+            raise
+        finally:
+            span.duration = time.perf_counter() - started
+            _current_span.reset(token)
+            if otel_span is not None:
+                otel_span.set_attributes(_otel_attributes(span.attributes))
+                if span.error:
+                    otel_span.set_status(otel_trace.Status(otel_trace.StatusCode.ERROR, span.error))
+                otel_span.end()
+                # only needed by the children, which are all done, not kept with the recent traces
+                span.otel_span = None
+            self._record(span, parent)
+
+    def _record(self, span: Span, parent: Optional[Span]) -> None:
+        if not self.enabled:
+            return
+        if parent is None:
+            self._traces.append(span)
+        elif len(parent.children) < Span.max_children:
+            parent.children.append(span)
+        else:
+            parent.dropped_children += 1
+
+    def recent(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Return the latest finished traces, newest first.
+        """
+        traces = list(self._traces)[::-1]
+        return [span.to_dict() for span in traces[:limit]]
+
+
+def _otel_attributes(attributes: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        key: value if isinstance(value, (str, bool, int, float)) else str(value)
+        for key, value in attributes.items()
+    }
+
+
+############## Prometheus endpoint ##############
+
+def serve_prometheus(registry: MetricsRegistry, port: int, host: str = "127.0.0.1") -> "http.server.ThreadingHTTPServer":
+    """
+    Serve the registry at http://host:port/metrics from a daemon thread.
+
+    Args:
+        registry: Metrics to expose
+        port: TCP port
+        host: Interface to listen on, localhost by default
+
+    Returns:
+        http.server.ThreadingHTTPServer: The running server, call shutdown() to stop it
+    """
+    import http.server
+
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            if self.path.split("?", 1)[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = registry.prometheus_text().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format: str, *args: Any) -> None:
+            # stdout carries the MCP stdio transport, keep access logs out of it
+            logger.debug(format % args)
+
+    server = http.server.ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="google-ads-metrics", daemon=True).start()
+    logger.info(f"Serving Prometheus metrics at http://{host}:{server.server_address[1]}/metrics")
+    return server
@@ -0,0 +1,460 @@
+import dataclasses
+import datetime
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from result_format import field_path
+
+logger = logging.getLogger(__name__)
+
+
+@dataclasses.dataclass(frozen=True)
+class Entity:
+    """
+    An entity type kept in the mirror.
+
+    Attributes:
+        resource: GAQL resource, e.g. "ad_group"
+        collection: Collection in its resource names, e.g. "adGroups" in customers/1/adGroups/2
+        fields: Fields selected for each row, as returned by the list tools
+        parent: Field holding the id of the parent entity, e.g. "campaign.id"
+        name: Field holding the name
+        status: Field holding the status
+        sort: Field the rows are ordered by, then by id
+        descending: Whether the sort field is in descending order
+        dependents: Collection of another entity -> field of this entity referring to it, for rows
+                    that include fields of that entity and are fetched again when it changes
+    """
+    resource: str
+    collection: str
+    fields: Tuple[str, ...]
+    parent: Optional[str] = None
+    name: Optional[str] = None
+    status: Optional[str] = None
+    sort: Optional[str] = None
+    descending: bool = False
+    dependents: Tuple[Tuple[str, str], ...] = ()
+
+    @property
+    def id(self) -> str:
+        return f"{self.resource}.ad.id" if self.resource == "ad_group_ad" else f"{self.resource}.id"
+
+    @property
+    def resource_name(self) -> str:
+        return f"{self.resource}.resource_name"
+
+
+ENTITIES: Dict[str, Entity] = {
+    "campaign": Entity(
+        "campaign", "campaigns",
+        ("campaign.resource_name", "campaign.id", "campaign.name", "campaign.status", "campaign.start_date",
+         "campaign.end_date", "campaign.bidding_strategy_type", "campaign.advertising_channel_type",
+         "campaign.campaign_budget", "campaign_budget.amount_micros"),
+        name="campaign.name", status="campaign.status", sort="campaign.start_date", descending=True,
+        dependents=(("campaignBudgets", "campaign.campaign_budget"),),
+    ),
+    "ad_group": Entity(
+        "ad_group", "adGroups",
+        ("ad_group.resource_name", "ad_group.id", "ad_group.name", "ad_group.status", "ad_group.type", "campaign.id"),
+        parent="campaign.id", name="ad_group.name", status="ad_group.status",
+    ),
+    "ad_group_ad": Entity(
+        "ad_group_ad", "adGroupAds",
+        ("ad_group_ad.resource_name", "ad_group_ad.ad.id", "ad_group_ad.ad.name", "ad_group_ad.ad.type",
+         "ad_group_ad.ad.final_urls", "ad_group_ad.status", "ad_group.id"),
+        parent="ad_group.id", name="ad_group_ad.ad.name", status="ad_group_ad.status",
+        dependents=(("ads", "ad_group_ad.ad.resource_name"),),
+    ),
+    "campaign_budget": Entity(
+        "campaign_budget", "campaignBudgets",
+        ("campaign_budget.resource_name", "campaign_budget.id", "campaign_budget.name", "campaign_budget.status",
+         "campaign_budget.amount_micros", "campaign_budget.delivery_method", "campaign_budget.explicitly_shared"),
+        name="campaign_budget.name", status="campaign_budget.status",
+    ),
+    "asset": Entity(
+        "asset", "assets",
+        ("asset.resource_name", "asset.id", "asset.name", "asset.type"),
+        name="asset.name",
+    ),
+}
+
+# change_event answers at most this many rows and only covers the last 30 days
+CHANGE_EVENT_LIMIT = 10000
+CHANGE_EVENT_MAX_AGE = 29 * 24 * 3600
+# changes show up in change_event a few minutes after they were made, each sync reads this far back again
+CHANGE_EVENT_LAG = datetime.timedelta(minutes=15)
+# change_event.change_resource_type of the mirrored entities, "AD" being the ad of an ad group ad
+CHANGE_RESOURCE_TYPES = ("CAMPAIGN", "CAMPAIGN_BUDGET", "AD_GROUP", "AD_GROUP_AD", "AD", "ASSET")
+
+_TIME_FORMAT = "%Y-%m-%d %H:%M:%S.%f"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entities (
+    customer_id TEXT NOT NULL,
+    entity TEXT NOT NULL,
+    resource_name TEXT NOT NULL,
+    id INTEGER,
+    parent_id INTEGER,
+    name TEXT,
+    status TEXT,
+    sort TEXT,
+    row TEXT NOT NULL,
+    PRIMARY KEY (customer_id, entity, resource_name)
+);
+CREATE INDEX IF NOT EXISTS entities_parent ON entities (customer_id, entity, parent_id);
+CREATE TABLE IF NOT EXISTS customers (
+    customer_id TEXT PRIMARY KEY,
+    full_synced_at REAL,
+    synced_at REAL,
+    change_cursor TEXT
+);
+CREATE TABLE IF NOT EXISTS pending (
+    customer_id TEXT NOT NULL,
+    resource_name TEXT NOT NULL,
+    PRIMARY KEY (customer_id, resource_name)
+);
+"""
+
+
+def _lookup(row: Dict[str, Any], name: Optional[str]) -> Any:
+    if name is None:
+        return None
+    value: Any = row
+    for key in field_path(name):
+        value = value.get(key) if isinstance(value, dict) else None
+    return value
+
+
+def _int(value: Any) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _quote(value: str) -> str:
+    return "'" + value.replace("\\", "\\\\").replace("'", "\\'") + "'"
+
+
+def _like_pattern(text: str) -> str:
+    # GAQL LIKE matches %, _, [ and ] literally inside brackets
+    return "".join(f"[{char}]" if char in "%_[]" else char for char in text)
+
+
+def entity_query(
+    entity: Entity,
+    conditions: Iterable[str] = (),
+    limit: Optional[int] = None,
+    extra_fields: Iterable[str] = (),
+) -> str:
+    """
+    Return the GAQL query selecting the rows of an entity, in mirror order.
+    """
+    fields = list(entity.fields) + [field for field in extra_fields if field not in entity.fields]
+    query = f"SELECT {', '.join(fields)} FROM {entity.resource}"
+    conditions = list(conditions)
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    order = [f"{entity.sort} {'DESC' if entity.descending else 'ASC'}"] if entity.sort else []
+    query += " ORDER BY " + ", ".join(order + [f"{entity.id} ASC"])
+    if limit is not None:
+        query += f" LIMIT {int(limit)}"
+    return query
+
+
+def filter_conditions(
+    entity: Entity,
+    parent_id: Optional[str] = None,
+    status: Optional[str] = None,
+    name_contains: Optional[str] = None,
+) -> List[str]:
+    """
+    Return the GAQL conditions of the list filters, the same filters Mirror.query applies.
+    """
+    conditions = []
+    if parent_id is not None:
+        if entity.parent is None:
+            raise ValueError(f"{entity.resource} has no parent to filter on")
+        conditions.append(f"{entity.parent} = {_quote(str(parent_id))}")
+    if status is not None:
+        if entity.status is None:
+            raise ValueError(f"{entity.resource} has no status to filter on")
+        conditions.append(f"{entity.status} = {_quote(status.upper())}")
+    if name_contains:
+        if entity.name is None:
+            raise ValueError(f"{entity.resource} has no name to filter on")
+        conditions.append(f"{entity.name} LIKE {_quote('%' + _like_pattern(name_contains) + '%')}")
+    return conditions
+
+
+def refetch_queries(entity: Entity, field: str, resource_names: List[str],
+                    chunk_size: int = 500) -> List[Tuple[str, List[str]]]:
+    """
+    Return the GAQL queries fetching the rows of an entity whose `field` is one of the resource names,
+    each with the resource names it asks for.
+    """
+    queries = []
+    for start in range(0, len(resource_names), chunk_size):
+        chunk = resource_names[start:start + chunk_size]
+        queries.append((entity_query(entity, [f"{field} IN ({', '.join(_quote(name) for name in chunk)})"]), chunk))
+    return queries
+
+
+def collection_of(resource_name: str) -> Optional[str]:
+    """
+    Return the collection of a resource name, e.g. "adGroups" for customers/1/adGroups/2.
+    """
+    parts = resource_name.split("/")
+    return parts[2] if len(parts) >= 4 and parts[0] == "customers" else None
+
+
+def plan_refetch(resource_names: Iterable[str]) -> List[Tuple[Entity, str, List[str], bool]]:
+    """
+    Group changed resource names into the fetches that bring the mirror up to date.
+
+    Returns:
+        List[Tuple[Entity, str, List[str], bool]]: Entity, field to filter on, resource names and whether rows
+                                                   that are not returned any more are deleted
+    """
+    by_collection: Dict[str, List[str]] = {}
+    for resource_name in sorted(set(resource_names)):
+        collection = collection_of(resource_name)
+        if collection:
+            by_collection.setdefault(collection, []).append(resource_name)
+
+    plan = []
+    for entity in ENTITIES.values():
+        if entity.collection in by_collection:
+            plan.append((entity, entity.resource_name, by_collection[entity.collection], True))
+        for collection, field in entity.dependents:
+            if collection in by_collection:
+                plan.append((entity, field, by_collection[collection], False))
+    return plan
+
+
+def change_event_query(since: str, now: Optional[datetime.datetime] = None) -> str:
+    """
+    Return the GAQL query listing the changes to mirrored entities since a change time, oldest first.
+    """
+    now = now or datetime.datetime.now(datetime.timezone.utc)
+    # change times are in the account's time zone, the end of tomorrow is after now in any of them
+    until = (now + datetime.timedelta(days=2)).date().isoformat()
+    types = ", ".join(f"'{change_type}'" for change_type in CHANGE_RESOURCE_TYPES)
+    return (
+        "SELECT change_event.change_resource_name, change_event.change_date_time FROM change_event "
+        f"WHERE change_event.change_date_time >= '{since}' AND change_event.change_date_time <= '{until}' "
+        f"AND change_event.change_resource_type IN ({types}) "
+        f"ORDER BY change_event.change_date_time ASC LIMIT {CHANGE_EVENT_LIMIT}"
+    )
+
+
+def initial_cursor(now: Optional[datetime.datetime] = None) -> str:
+    """
+    Return the change time a full sync is safe to continue from: a day ago in UTC is earlier than
+    the time of any change not visible yet, in any account time zone.
+    """
+    now = now or datetime.datetime.now(datetime.timezone.utc)
+    return (now - datetime.timedelta(days=1)).strftime(_TIME_FORMAT)
+
+
+def next_cursor(cursor: str, change_times: Iterable[str], now: Optional[datetime.datetime] = None) -> str:
+    """
+    Return the change time the next incremental sync starts from, after reading these change times.
+    """
+    candidates = [datetime.datetime.fromisoformat(cursor), datetime.datetime.fromisoformat(initial_cursor(now))]
+    latest = max((datetime.datetime.fromisoformat(change_time) for change_time in change_times), default=None)
+    if latest is not None:
+        candidates.append(latest - CHANGE_EVENT_LAG)
+    return max(candidates).strftime(_TIME_FORMAT)
+
+
+class Mirror:
+    """
+    Local SQLite copy of the campaigns, ad groups, ads, campaign budgets and assets of each account.
+
+    The server fills it with a full sync per account and keeps it current from change_event and from the
+    resource names its own mutates return, so that list queries are answered locally with filtering and paging.
+    Rows are stored as returned by GAQL. The database is shared by the worker processes of an HTTP server.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._connection: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.executescript(_SCHEMA)
+            self._connection = connection
+        return self._connection
+
+    def close(self) -> None:
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    @staticmethod
+    def _values(customer_id: str, entity: Entity, row: Dict[str, Any]) -> Tuple[Any, ...]:
+        return (
+            customer_id, entity.resource, _lookup(row, entity.resource_name),
+            _int(_lookup(row, entity.id)), _int(_lookup(row, entity.parent)),
+            _lookup(row, entity.name), _lookup(row, entity.status), _lookup(row, entity.sort),
+            json.dumps(row, separators=(",", ":")),
+        )
+
+    def replace(self, customer_id: str, entity: Entity, rows: Iterable[Dict[str, Any]]) -> int:
+        """
+        Replace all the rows of an entity of an account, in one transaction.
+        """
+        values = [self._values(customer_id, entity, row) for row in rows]
+        with self._lock, self._connect() as connection:
+            connection.execute("DELETE FROM entities WHERE customer_id = ? AND entity = ?", (customer_id, entity.resource))
+            connection.executemany("INSERT OR REPLACE INTO entities VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", values)
+        return len(values)
+
+    def upsert(self, customer_id: str, entity: Entity, rows: Iterable[Dict[str, Any]],
+               expected: Iterable[str] = ()) -> int:
+        """
+        Insert or update rows of an entity of an account. Rows with an `expected` resource name that is
+        not among the rows are deleted, as the entity does not exist any more.
+        """
+        values = [self._values(customer_id, entity, row) for row in rows]
+        deleted = set(expected) - {value[2] for value in values}
+        with self._lock, self._connect() as connection:
+            connection.executemany(
+                "DELETE FROM entities WHERE customer_id = ? AND entity = ? AND resource_name = ?",
+                [(customer_id, entity.resource, resource_name) for resource_name in sorted(deleted)])
+            connection.executemany("INSERT OR REPLACE INTO entities VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", values)
+        return len(values)
+
+    def state(self, customer_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Return when an account was last fully and incrementally synced, its change cursor and
+        the number of resources changed by this server since, None if it was never synced.
+        """
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT full_synced_at, synced_at, change_cursor, "
+                "(SELECT COUNT(*) FROM pending WHERE pending.customer_id = customers.customer_id) "
+                "FROM customers WHERE customer_id = ?",
+                (customer_id,)).fetchone()
+        if row is None:
+            return None
+        return {"full_synced_at": row[0], "synced_at": row[1], "change_cursor": row[2], "pending": row[3]}
+
+    def mark_synced(self, customer_id: str, change_cursor: str, full: bool, synced_at: Optional[float] = None) -> None:
+        synced_at = synced_at or time.time()
+        with self._lock, self._connect() as connection:
+            if full:
+                connection.execute("INSERT OR REPLACE INTO customers VALUES (?, ?, ?, ?)",
+                                   (customer_id, synced_at, synced_at, change_cursor))
+            else:
+                connection.execute("UPDATE customers SET synced_at = ?, change_cursor = ? WHERE customer_id = ?",
+                                   (synced_at, change_cursor, customer_id))
+
+    def add_pending(self, customer_id: str, resource_names: Iterable[str]) -> None:
+        """
+        Remember resources this server changed, fetched again by the next sync of the account.
+        """
+        with self._lock, self._connect() as connection:
+            connection.executemany("INSERT OR IGNORE INTO pending VALUES (?, ?)",
+                                   [(customer_id, resource_name) for resource_name in resource_names])
+
+    def pending(self, customer_id: str) -> List[str]:
+        with self._lock:
+            rows = self._connect().execute("SELECT resource_name FROM pending WHERE customer_id = ?", (customer_id,))
+            return [row[0] for row in rows]
+
+    def clear_pending(self, customer_id: str, resource_names: Iterable[str]) -> None:
+        with self._lock, self._connect() as connection:
+            connection.executemany("DELETE FROM pending WHERE customer_id = ? AND resource_name = ?",
+                                   [(customer_id, resource_name) for resource_name in resource_names])
+
+    def query(
+        self,
+        customer_id: str,
+        entity: Entity,
+        parent_id: Optional[str] = None,
+        status: Optional[str] = None,
+        name_contains: Optional[str] = None,
+        limit: Optional[int] = None,
+        offset: int = 0,
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        Return one page of the rows of an entity of an account and the number of rows matching the filters.
+        """
+        where = ["customer_id = ?", "entity = ?"]
+        parameters: List[Any] = [customer_id, entity.resource]
+        if parent_id is not None:
+            where.append("parent_id = ?")
+            parameters.append(_int(parent_id))
+        if status is not None:
+            where.append("status = ?")
+            parameters.append(status.upper())
+        if name_contains:
+            where.append("name LIKE ? ESCAPE '\\'")
+            escaped = name_contains.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            parameters.append(f"%{escaped}%")
+        where_clause = " AND ".join(where)
+        order = f"sort {'DESC' if entity.descending else 'ASC'}, id ASC" if entity.sort else "id ASC"
+
+        with self._lock:
+            connection = self._connect()
+            total = connection.execute(f"SELECT COUNT(*) FROM entities WHERE {where_clause}", parameters).fetchone()[0]
+            rows = connection.execute(
+                f"SELECT row FROM entities WHERE {where_clause} ORDER BY {order} LIMIT ? OFFSET ?",
+                parameters + [-1 if limit is None else limit, offset]).fetchall()
+        return [json.loads(row[0]) for row in rows], total
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Row counts per entity and sync times of every mirrored account.
+        """
+        with self._lock:
+            connection = self._connect()
+            customers = connection.execute(
+                "SELECT customer_id, full_synced_at, synced_at, change_cursor FROM customers").fetchall()
+            counts = connection.execute(
+                "SELECT customer_id, entity, COUNT(*) FROM entities GROUP BY customer_id, entity").fetchall()
+            pending = connection.execute("SELECT customer_id, COUNT(*) FROM pending GROUP BY customer_id").fetchall()
+
+        now = time.time()
+        result: Dict[str, Any] = {}
+        for customer_id, full_synced_at, synced_at, change_cursor in customers:
+            result[customer_id] = {
+                "full_synced_at": full_synced_at,
+                "synced_at": synced_at,
+                "age_seconds": round(now - synced_at, 1) if synced_at else None,
+                "change_cursor": change_cursor,
+                "rows": {},
+                "pending": 0,
+            }
+        for customer_id, entity, count in counts:
+            result.setdefault(customer_id, {"rows": {}, "pending": 0})["rows"][entity] = count
+        for customer_id, count in pending:
+            result.setdefault(customer_id, {"rows": {}, "pending": 0})["pending"] = count
+        return result
+
+
+def mutated_resource_names(response: Dict[str, Any]) -> List[str]:
+    """
+    Return the resource names in a mutate response, of {resource}:mutate and of googleAds:mutate.
+    """
+    names = [result.get("resourceName") for result in response.get("results") or [] if isinstance(result, dict)]
+    for operation_response in response.get("mutateOperationResponses") or []:
+        for result in operation_response.values():
+            if isinstance(result, dict):
+                names.append(result.get("resourceName"))
+    return [name for name in names if name]
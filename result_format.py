@@ -0,0 +1,268 @@
+import array
+import csv
+import io
+import json
+import re
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+FORMATS = ("rows", "columns", "csv", "table")
+
+_INT_TYPES = {"INT32", "INT64", "UINT64"}
+_FLOAT_TYPES = {"DOUBLE", "FLOAT"}
+_INTEGER = re.compile(r"^-?\d+$")
+_CAMEL = re.compile(r"([A-Z])")
+
+# currency metrics in micros whose names do not end in _micros
+MICROS_METRICS = frozenset({
+    "metrics.active_view_cpm",
+    "metrics.average_cost",
+    "metrics.average_cpc",
+    "metrics.average_cpe",
+    "metrics.average_cpm",
+    "metrics.average_cpv",
+    "metrics.cost_per_all_conversions",
+    "metrics.cost_per_conversion",
+    "metrics.cost_per_current_model_attributed_conversion",
+})
+
+
+def is_micros(name: str) -> bool:
+    """
+    Return whether a GAQL field holds an amount in micros of the account currency.
+    """
+    return name.endswith("_micros") or name in MICROS_METRICS
+
+
+def currency_name(name: str) -> str:
+    """
+    Return the name of a micros field once converted to currency units, e.g. "metrics.cost" for
+    "metrics.cost_micros". Fields without the suffix keep their name.
+    """
+    return name[:-len("_micros")] if name.endswith("_micros") else name
+
+
+def field_path(name: str) -> List[str]:
+    """
+    Return the keys of a GAQL field in a REST result row, e.g. ["metrics", "costMicros"] for "metrics.cost_micros".
+    """
+    path = []
+    for part in name.split("."):
+        first, *rest = part.split("_")
+        path.append(first + "".join(word[:1].upper() + word[1:] for word in rest))
+    return path
+
+
+def field_name(path: List[str]) -> str:
+    """
+    Inverse of field_path, e.g. "metrics.cost_micros" for ["metrics", "costMicros"].
+    """
+    return ".".join(_CAMEL.sub(lambda match: "_" + match.group(1).lower(), key) for key in path)
+
+
+def row_fields(rows: Iterable[Dict[str, Any]]) -> List[str]:
+    """
+    Return the GAQL field names present in REST result rows, in first-seen order.
+    Used when the fields cannot be taken from the query.
+    """
+    seen: Dict[str, None] = {}
+
+    def walk(value: Dict[str, Any], path: List[str]) -> None:
+        for key, child in value.items():
+            if isinstance(child, dict) and child:
+                walk(child, path + [key])
+            else:
+                seen.setdefault(field_name(path + [key]), None)
+
+    for row in rows:
+        walk(row, [])
+    return list(seen)
+
+
+def lookup(row: Dict[str, Any], path: List[str]) -> Any:
+    """
+    Return the value at a field path of a REST result row, None if missing.
+    """
+    value: Any = row
+    for key in path:
+        if not isinstance(value, dict):
+            return None
+        value = value.get(key)
+    return value
+
+
+class _Column:
+    """
+    Column of values, kept in a compact typed array as long as the values allow it.
+    """
+
+    def __init__(self, name: str, data_type: Optional[str], micros_to_currency: bool):
+        self.name = name
+        self.data_type = data_type
+        self.micros = micros_to_currency and is_micros(name)
+        if self.micros:
+            self.name = currency_name(name)
+            self.data_type = "DOUBLE"
+
+        if self.data_type in _INT_TYPES:
+            self.values: Union[array.array, List[Any]] = array.array("q")
+        elif self.data_type in _FLOAT_TYPES:
+            self.values = array.array("d")
+        else:
+            self.values = []
+
+    def _convert(self, value: Any) -> Any:
+        if value is None:
+            return None
+        # int64 values are strings in REST responses
+        if self.micros or self.data_type in _FLOAT_TYPES:
+            value = float(value)
+            return value / 1_000_000 if self.micros else value
+        if self.data_type in _INT_TYPES:
+            return int(value)
+        if self.data_type is None and isinstance(value, str) and _INTEGER.match(value) and (
+            self.name.startswith("metrics.") or self.name.endswith(".id")
+        ):
+            return int(value)
+        return value
+
+    def append(self, value: Any) -> None:
+        value = self._convert(value)
+        if isinstance(self.values, array.array):
+            if value is not None:
+                try:
+                    self.values.append(value)
+                    return
+                except OverflowError:
+                    pass
+            # a typed array cannot hold missing or out of range values
+            self.values = self.values.tolist()
+        self.values.append(value)
+
+    def to_list(self) -> List[Any]:
+        return self.values.tolist() if isinstance(self.values, array.array) else self.values
+
+
+class ColumnarResult:
+    """
+    GAQL result rows stored column by column: field names once in a header, int and float values in typed arrays.
+    """
+
+    def __init__(
+        self,
+        fields: List[str],
+        data_types: Optional[Dict[str, str]] = None,
+        micros_to_currency: bool = False,
+    ):
+        data_types = data_types or {}
+        self._paths = [field_path(name) for name in fields]
+        self._columns = [_Column(name, data_types.get(name), micros_to_currency) for name in fields]
+        self.row_count = 0
+
+    def append(self, row: Dict[str, Any]) -> None:
+        for path, column in zip(self._paths, self._columns):
+            column.append(lookup(row, path))
+        self.row_count += 1
+
+    def extend(self, rows: Iterable[Dict[str, Any]]) -> None:
+        for row in rows:
+            self.append(row)
+
+    @property
+    def columns(self) -> List[str]:
+        return [column.name for column in self._columns]
+
+    def iter_rows(self) -> Iterable[tuple]:
+        return zip(*[column.values for column in self._columns])
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Example:
+        {
+            "columns": ["campaign.id", "campaign.name", "metrics.cost"],
+            "types": ["INT64", "STRING", "DOUBLE"],
+            "data": [[123, 456], ["Brand", "Generic"], [12.5, 3.75]],
+            "row_count": 2
+        }
+        """
+        return {
+            "columns": self.columns,
+            "types": [column.data_type for column in self._columns],
+            "data": [column.to_list() for column in self._columns],
+            "row_count": self.row_count,
+        }
+
+    def to_csv(self) -> str:
+        return csv_text(self.columns, self.iter_rows())
+
+    def to_table(self) -> str:
+        return markdown_table(self.columns, self.iter_rows())
+
+
+def _text(value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, (list, dict)):
+        return json.dumps(value)
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return str(value)
+
+
+def csv_text(columns: List[str], rows: Iterable[Iterable[Any]]) -> str:
+    """
+    Return CSV text with a header line.
+    """
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(columns)
+    for row in rows:
+        writer.writerow([_text(value) for value in row])
+    return output.getvalue()
+
+
+def markdown_table(columns: List[str], rows: Iterable[Iterable[Any]]) -> str:
+    """
+    Return a markdown table.
+    """
+    lines = [
+        "| " + " | ".join(columns) + " |",
+        "|" + "|".join(" --- " for _ in columns) + "|",
+    ]
+    for row in rows:
+        lines.append("| " + " | ".join(_text(value).replace("|", "\\|").replace("\n", " ") for value in row) + " |")
+    return "\n".join(lines)
+
+
+def format_results(
+    rows: List[Dict[str, Any]],
+    format: str,
+    fields: Optional[List[str]] = None,
+    data_types: Optional[Dict[str, str]] = None,
+    micros_to_currency: bool = False,
+) -> Union[List[Dict[str, Any]], Dict[str, Any], str]:
+    """
+    Convert REST result rows to one of FORMATS.
+
+    Args:
+        rows: REST result rows
+        format: "rows" (rows as returned by the API), "columns", "csv" or "table"
+        fields: Selected GAQL fields, taken from the rows if None
+        data_types: GAQL data type per field, e.g. {"metrics.clicks": "INT64"}, inferred from the values if missing
+        micros_to_currency: Whether to convert *_micros fields and the currency metrics in MICROS_METRICS to
+            currency units, columnar formats only
+
+    Returns:
+        Union[List[Dict[str, Any]], Dict[str, Any], str]: Rows, columns dict, or CSV or markdown text
+    """
+    if format not in FORMATS:
+        raise ValueError(f"Unknown format '{format}', expected one of {', '.join(FORMATS)}")
+    if format == "rows":
+        return rows
+
+    result = ColumnarResult(fields or row_fields(rows), data_types, micros_to_currency)
+    result.extend(rows)
+    if format == "columns":
+        return result.to_dict()
+    if format == "csv":
+        return result.to_csv()
+    return result.to_table()
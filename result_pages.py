@@ -0,0 +1,181 @@
+import json
+import logging
+import os
+import secrets
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_DATA_SUFFIX = ".jsonl"
+_META_SUFFIX = ".json"
+
+
+def make_cursor(handle: str, page: int) -> str:
+    """
+    Return the cursor of a page of a stored result, "<handle>:<page>".
+    """
+    return f"{handle}:{page}"
+
+
+def parse_cursor(cursor: str) -> Tuple[str, int]:
+    """
+    Split a cursor into its handle and page number, raising ValueError if it is malformed.
+    """
+    handle, _, page = cursor.strip().rpartition(":")
+    if not handle or not page.isdigit() or not all(c.isalnum() or c in "-_" for c in handle):
+        raise ValueError(f"Invalid cursor '{cursor}'")
+    return handle, int(page)
+
+
+class ResultPages:
+    """
+    Large query results kept on disk and read back one page at a time.
+
+    Each result is written as one JSON line per row, with a small metadata file holding the byte offset of every
+    page, so a page is read with one seek whatever its position and rows keep the order they were stored in.
+    The files live in a shared directory, so any worker process of an HTTP server can serve a cursor.
+    Results not read for idle_ttl seconds, and the oldest ones beyond max_results, are deleted.
+    """
+
+    def __init__(self, directory: str, idle_ttl: float = 900, max_results: int = 32):
+        self.directory = directory
+        self.idle_ttl = idle_ttl
+        self.max_results = max_results
+        self._lock = threading.Lock()
+        self._created = 0
+        self._pages_read = 0
+        self._evicted = 0
+
+    def _path(self, handle: str, suffix: str) -> str:
+        return os.path.join(self.directory, handle + suffix)
+
+    def create(self, rows: List[Dict[str, Any]], page_size: int, meta: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Store the rows of a result in pages of page_size rows and return its handle.
+        meta is kept with the result and returned with each page, e.g. the query and the output format.
+        """
+        if page_size < 1:
+            raise ValueError("page_size must be at least 1")
+        os.makedirs(self.directory, exist_ok=True)
+        self.sweep()
+        handle = secrets.token_urlsafe(12)
+        offsets = []
+        with open(self._path(handle, _DATA_SUFFIX), "wb") as f:
+            for index, row in enumerate(rows):
+                if index % page_size == 0:
+                    offsets.append(f.tell())
+                f.write(json.dumps(row, separators=(",", ":")).encode("utf-8"))
+                f.write(b"\n")
+        # the metadata file is written last, a result without one is incomplete
+        info = {"row_count": len(rows), "page_size": page_size, "offsets": offsets, "created_at": time.time(),
+                "meta": meta or {}}
+        tmp_path = self._path(handle, _META_SUFFIX) + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(info, f)
+        os.replace(tmp_path, self._path(handle, _META_SUFFIX))
+        with self._lock:
+            self._created += 1
+        return handle
+
+    def page(self, handle: str, page: int) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """
+        Return the rows of a page of a stored result, counting from 0, and the result metadata:
+        row_count, page_size, pages and the meta given to create. Raises KeyError if the result
+        does not exist or has been evicted, IndexError if the page is out of range.
+        """
+        meta_path = self._path(handle, _META_SUFFIX)
+        try:
+            with open(meta_path, "r") as f:
+                info = json.load(f)
+            # reading a result keeps it alive
+            os.utime(meta_path)
+        except (OSError, ValueError):
+            raise KeyError(handle) from None
+
+        offsets = info.pop("offsets")
+        info["pages"] = len(offsets)
+        if not 0 <= page < len(offsets):
+            raise IndexError(f"Page {page} is out of range, the result has {len(offsets)} pages")
+        rows = []
+        try:
+            with open(self._path(handle, _DATA_SUFFIX), "rb") as f:
+                f.seek(offsets[page])
+                for _ in range(info["page_size"]):
+                    line = f.readline()
+                    if not line:
+                        break
+                    rows.append(json.loads(line))
+        except OSError:
+            raise KeyError(handle) from None
+        with self._lock:
+            self._pages_read += 1
+        return rows, info
+
+    def delete(self, handle: str) -> bool:
+        """
+        Delete a stored result, returning whether it existed.
+        """
+        existed = False
+        for suffix in (_META_SUFFIX, _DATA_SUFFIX):
+            try:
+                os.remove(self._path(handle, suffix))
+                existed = True
+            except FileNotFoundError:
+                pass
+        return existed
+
+    def _results(self) -> List[Tuple[float, str]]:
+        # (last access, handle) of every stored result, oldest first, incomplete ones by their data file
+        results = {}
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        for name in names:
+            for suffix in (_META_SUFFIX, _DATA_SUFFIX):
+                if name.endswith(suffix):
+                    handle = name[:-len(suffix)]
+                    try:
+                        mtime = os.path.getmtime(os.path.join(self.directory, name))
+                    except OSError:
+                        continue
+                    if suffix == _META_SUFFIX or handle not in results:
+                        results[handle] = mtime
+        return sorted((mtime, handle) for handle, mtime in results.items())
+
+    def sweep(self, now: Optional[float] = None) -> int:
+        """
+        Delete the results idle for more than idle_ttl seconds, then the oldest ones beyond max_results - 1,
+        making room for one more. Returns the number of results deleted.
+        """
+        now = time.time() if now is None else now
+        results = self._results()
+        expired = [handle for mtime, handle in results if now - mtime > self.idle_ttl]
+        kept = [handle for mtime, handle in results if now - mtime <= self.idle_ttl]
+        expired += kept[:max(0, len(kept) - (self.max_results - 1))]
+        for handle in expired:
+            self.delete(handle)
+        if expired:
+            logger.debug(f"Evicted {len(expired)} stored results")
+            with self._lock:
+                self._evicted += len(expired)
+        return len(expired)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Stored results with their size on disk, and results created, pages read and results evicted so far.
+        """
+        results = self._results()
+        size = 0
+        for _, handle in results:
+            for suffix in (_META_SUFFIX, _DATA_SUFFIX):
+                try:
+                    size += os.path.getsize(self._path(handle, suffix))
+                except OSError:
+                    pass
+        with self._lock:
+            return {"results": len(results), "bytes": size, "idle_ttl_seconds": self.idle_ttl,
+                    "max_results": self.max_results, "created": self._created, "pages_read": self._pages_read,
+                    "evicted": self._evicted}
@@ -0,0 +1,187 @@
+import asyncio
+import collections
+import random
+from typing import Any, Awaitable, Callable, Dict, List, Optional, TypeVar
+
+import httpx
+
+T = TypeVar("T")
+
+# transport errors raised before the request left this process: re-sending can never duplicate a mutate
+UNSENT_REQUEST_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+# transport errors after which a read-only request can be sent again
+TRANSIENT_TRANSPORT_ERRORS = UNSENT_REQUEST_ERRORS + (
+    httpx.ReadTimeout,
+    httpx.ReadError,
+    httpx.WriteError,
+    httpx.RemoteProtocolError,
+)
+
+
+class RetryBudget:
+    """
+    Cap retries at a fraction of the request volume, so that retries cannot multiply the load
+    on an API that is already failing. Every request adds `ratio` tokens, every retry spends one.
+    """
+
+    def __init__(self, ratio: float = 0.1, min_tokens: float = 10, max_tokens: float = 100):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self.tokens = min_tokens
+        self.spent = 0
+        self.denied = 0
+
+    def record_request(self) -> None:
+        self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def try_spend(self) -> bool:
+        if self.tokens >= 1:
+            self.tokens -= 1
+            self.spent += 1
+            return True
+        self.denied += 1
+        return False
+
+
+class RetryPolicy:
+    """
+    Exponential backoff with full jitter, bounded by a maximum number of attempts and a retry budget.
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = 4,
+        base_delay: float = 0.5,
+        max_delay: float = 20.0,
+        budget: Optional[RetryBudget] = None,
+    ):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget = budget or RetryBudget()
+
+    def backoff(self, attempt: int) -> float:
+        """
+        Return the delay before retry number `attempt` (starting at 0).
+        """
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def can_retry(self, attempt: int) -> bool:
+        """
+        Return whether retry number `attempt` (starting at 0) may be made, spending budget if so.
+        """
+        return attempt + 1 < self.max_attempts and self.budget.try_spend()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_attempts": self.max_attempts,
+            "budget_tokens": round(self.budget.tokens, 2),
+            "retries": self.budget.spent,
+            "retries_denied_by_budget": self.budget.denied,
+        }
+
+
+class LatencyTracker:
+    """
+    Rolling window of request latencies, used to decide when a slow read deserves a hedged request.
+    """
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.min_samples = min_samples
+        self._samples: "collections.deque[float]" = collections.deque(maxlen=window)
+
+    def record(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def percentile(self, percentile: float) -> Optional[float]:
+        """
+        Return the latency at the given percentile (0-100), or None until enough samples were recorded.
+        """
+        if len(self._samples) < self.min_samples:
+            return None
+        ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, int(len(ordered) * percentile / 100))
+        return ordered[index]
+
+
+async def hedged(
+    send: Callable[[], Awaitable[T]],
+    delay: Optional[float],
+    on_discard: Optional[Callable[[T], Awaitable[None]]] = None,
+    send_hedge: Optional[Callable[[], Awaitable[T]]] = None,
+    allow_hedge: Optional[Callable[[], bool]] = None,
+    is_success: Optional[Callable[[T], bool]] = None,
+) -> T:
+    """
+    Run `send`, and if it has not finished after `delay` seconds run it a second time.
+    The first successful result wins, the other attempt is cancelled, or discarded through `on_discard` if it
+    also finished. An attempt that failed, by raising or with a result rejected by `is_success`, only decides
+    the outcome once the other one failed too; the last failed result is returned, or the error raised.
+    Only use this for idempotent requests.
+
+    Args:
+        send: Coroutine function sending the request
+        delay: Seconds to wait before hedging, None to never hedge
+        on_discard: Coroutine function releasing the losing result, e.g. closing a streamed response
+        send_hedge: Coroutine function sending the second request, `send` by default, e.g. to wait for
+            a rate limiter slot first
+        allow_hedge: Called when the delay is over, the second request is only sent if it returns True,
+            e.g. when the retry budget allows it
+        is_success: Whether a result is a success, e.g. an HTTP status below 300, every result by default
+
+    Returns:
+        T: Result of the attempt that succeeded first
+    """
+    first = asyncio.ensure_future(send())
+    if delay is None:
+        return await first
+
+    tasks = [first]
+    try:
+        done, _ = await asyncio.wait({first}, timeout=delay)
+        if done:
+            return first.result()
+
+        if allow_hedge is not None and not allow_hedge():
+            return await first
+        tasks.append(asyncio.ensure_future((send_hedge or send)()))
+        pending = set(tasks)
+        error: Optional[BaseException] = None
+        # results rejected by is_success, in the order they arrived
+        failed: List[T] = []
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            winners = []
+            for task in done:
+                if task.exception() is not None:
+                    error = task.exception()
+                elif is_success is None or is_success(task.result()):
+                    winners.append(task.result())
+                else:
+                    failed.append(task.result())
+            if not winners:
+                continue
+
+            for other in pending:
+                other.cancel()
+            losers = winners[1:] + failed
+            for other in pending:
+                try:
+                    losers.append(await other)
+                except BaseException:
+                    continue
+            if on_discard is not None:
+                for result in losers:
+                    await on_discard(result)
+            return winners[0]
+        if failed:
+            if on_discard is not None:
+                for result in failed[:-1]:
+                    await on_discard(result)
+            return failed[-1]
+        raise error
+    finally:
+        # the caller was cancelled or failed while attempts were still running
+        for task in tasks:
+            if not task.done():
+                task.cancel()
@@ -0,0 +1,305 @@
+import asyncio
+import bisect
+import contextlib
+import contextvars
+import itertools
+import logging
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# priority lanes, lower goes first
+INTERACTIVE = 0
+BULK = 1
+LANE_NAMES = {INTERACTIVE: "interactive", BULK: "bulk"}
+
+# lane of the requests sent by the current task, inherited by the tasks it starts
+_current_lane: contextvars.ContextVar[int] = contextvars.ContextVar("google_ads_request_lane", default=INTERACTIVE)
+
+
+@contextlib.contextmanager
+def lane(priority: int) -> Iterator[None]:
+    """
+    Send the requests made inside the block, including those of tasks started in it, in the given lane.
+
+    Example:
+        with scheduler.lane(scheduler.BULK):
+            await asyncio.gather(*jobs)
+    """
+    token = _current_lane.set(priority)
+    try:
+        yield
+    finally:
+        _current_lane.reset(token)
+
+
+class TokenBucket:
+    """
+    Token bucket allowing `rate` requests per second with bursts of up to `burst` requests.
+    A rate of 0 or less means unlimited. The bucket can be paused, e.g. for the retry delay returned by the API.
+    """
+
+    def __init__(self, rate: float, burst: float, now: float):
+        self.rate = rate
+        self.burst = max(burst, 1.0)
+        self.tokens = self.burst
+        self.updated = now
+        self.paused_until = 0.0
+
+    def _fill(self, now: float) -> None:
+        if self.rate > 0:
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now: float) -> float:
+        """
+        Return the number of seconds until a token is available.
+        """
+        pause = max(0.0, self.paused_until - now)
+        if self.rate <= 0:
+            return pause
+        self._fill(now)
+        if self.tokens >= 1:
+            return pause
+        return max(pause, (1 - self.tokens) / self.rate)
+
+    def consume(self, now: float) -> None:
+        if self.rate > 0:
+            self._fill(now)
+            self.tokens -= 1
+
+    def pause(self, until: float) -> None:
+        self.paused_until = max(self.paused_until, until)
+
+    def is_idle(self, now: float) -> bool:
+        """
+        Return whether the bucket is full and not paused, so that it behaves like a new bucket.
+        """
+        if self.paused_until > now:
+            return False
+        return self.rate <= 0 or self.tokens + (now - self.updated) * self.rate >= self.burst
+
+
+class _Waiter:
+    def __init__(self, priority: int, sequence: int, customer_id: str, future: asyncio.Future, enqueued: float):
+        self.priority = priority
+        self.sequence = sequence
+        self.customer_id = customer_id
+        self.future = future
+        self.enqueued = enqueued
+
+    def __lt__(self, other: "_Waiter") -> bool:
+        return (self.priority, self.sequence) < (other.priority, other.sequence)
+
+
+class RequestScheduler:
+    """
+    Pace all outbound Google Ads API calls with token buckets per developer token and per customer ID.
+
+    Waiting requests are released in priority order: interactive requests go ahead of bulk jobs. A request
+    whose customer has no tokens left does not hold up requests for other customers. When the API answers
+    RESOURCE_EXHAUSTED, the affected bucket is paused for the retry delay it returned.
+
+    Customer buckets that are full again are dropped once there are more than min_sweep_size of them,
+    so that a long-running server calling many accounts only keeps the buckets of recently called ones.
+    """
+
+    min_sweep_size = 1024
+
+    def __init__(
+        self,
+        developer_rate: float = 10,
+        developer_burst: float = 20,
+        customer_rate: float = 5,
+        customer_burst: float = 10,
+        default_retry_delay: float = 30,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.customer_rate = customer_rate
+        self.customer_burst = customer_burst
+        self.default_retry_delay = default_retry_delay
+        self._clock = clock
+
+        self._developer = TokenBucket(developer_rate, developer_burst, clock())
+        self._customers: Dict[str, TokenBucket] = {}
+        self._sweep_at = self.min_sweep_size
+        self._evicted = 0
+        self._waiters: List[_Waiter] = []
+        self._sequence = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+        self._granted = {name: 0 for name in LANE_NAMES.values()}
+        self._delayed = {name: 0 for name in LANE_NAMES.values()}
+        self._wait_total = {name: 0.0 for name in LANE_NAMES.values()}
+        self._wait_max = {name: 0.0 for name in LANE_NAMES.values()}
+        self._pauses = 0
+
+    def _customer_bucket(self, customer_id: str) -> TokenBucket:
+        bucket = self._customers.get(customer_id)
+        if bucket is None:
+            if len(self._customers) >= self._sweep_at:
+                self._drop_idle_buckets()
+            bucket = TokenBucket(self.customer_rate, self.customer_burst, self._clock())
+            self._customers[customer_id] = bucket
+        return bucket
+
+    def _drop_idle_buckets(self) -> None:
+        now = self._clock()
+        waiting = {waiter.customer_id for waiter in self._waiters}
+        idle = [customer_id for customer_id, bucket in self._customers.items()
+                if customer_id not in waiting and bucket.is_idle(now)]
+        for customer_id in idle:
+            del self._customers[customer_id]
+        self._evicted += len(idle)
+        # sweeping again only once the buckets doubled keeps the cost per new bucket constant
+        self._sweep_at = max(self.min_sweep_size, 2 * len(self._customers))
+
+    def _bind_loop(self) -> asyncio.AbstractEventLoop:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # waiters of a previous event loop can never be woken up again
+            self._waiters = []
+            self._timer = None
+            self._loop = loop
+        return loop
+
+    async def acquire(self, customer_id: str, priority: Optional[int] = None) -> float:
+        """
+        Wait until a request for the customer may be sent.
+
+        Args:
+            customer_id: Formatted customer ID
+            priority: Lane of the request, defaults to the lane of the current task
+
+        Returns:
+            float: Seconds spent waiting
+        """
+        loop = self._bind_loop()
+        if priority is None:
+            priority = _current_lane.get()
+
+        now = self._clock()
+        waiter = _Waiter(priority, next(self._sequence), customer_id, loop.create_future(), now)
+        bisect.insort(self._waiters, waiter)
+        self._pump()
+        delayed = not waiter.future.done()
+
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+            raise
+
+        waited = self._clock() - now
+        name = LANE_NAMES.get(priority, str(priority))
+        self._granted[name] = self._granted.get(name, 0) + 1
+        self._wait_total[name] = self._wait_total.get(name, 0.0) + waited
+        self._wait_max[name] = max(self._wait_max.get(name, 0.0), waited)
+        if delayed:
+            self._delayed[name] = self._delayed.get(name, 0) + 1
+        return waited
+
+    def _pump(self) -> None:
+        """
+        Release every waiter that can go now, in priority order, and schedule the next wake-up.
+        """
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        now = self._clock()
+        next_delay = None
+        for waiter in list(self._waiters):
+            if waiter.future.done():
+                self._waiters.remove(waiter)
+                continue
+
+            developer_wait = self._developer.wait_time(now)
+            if developer_wait > 0:
+                next_delay = developer_wait if next_delay is None else min(next_delay, developer_wait)
+                break
+
+            customer = self._customer_bucket(waiter.customer_id)
+            customer_wait = customer.wait_time(now)
+            if customer_wait > 0:
+                next_delay = customer_wait if next_delay is None else min(next_delay, customer_wait)
+                continue
+
+            self._developer.consume(now)
+            customer.consume(now)
+            self._waiters.remove(waiter)
+            waiter.future.set_result(None)
+
+        if self._waiters and next_delay is not None and self._loop is not None:
+            self._timer = self._loop.call_later(next_delay, self._pump)
+
+    def pause(self, customer_id: Optional[str], delay: float) -> None:
+        """
+        Hold back requests for a customer, or for the whole developer token when customer_id is None.
+
+        Args:
+            customer_id: Formatted customer ID, or None for the developer token
+            delay: Seconds to hold requests back
+        """
+        until = self._clock() + delay
+        if customer_id is None:
+            self._developer.pause(until)
+        else:
+            self._customer_bucket(customer_id).pause(until)
+        self._pauses += 1
+        if self._loop is not None and self._waiters:
+            self._pump()
+
+    def handle_quota_error(self, customer_id: str, rate_scope: Optional[str], retry_delay: Optional[float]) -> float:
+        """
+        Pause the bucket hit by a RESOURCE_EXHAUSTED error for the retry delay returned by the API.
+
+        Args:
+            customer_id: Formatted customer ID
+            rate_scope: "DEVELOPER" or "ACCOUNT" from the quota error details
+            retry_delay: Retry delay in seconds from the quota error details, if any
+
+        Returns:
+            float: The delay in seconds the bucket was paused for
+        """
+        delay = self.default_retry_delay if retry_delay is None else retry_delay
+        scope = rate_scope or "ACCOUNT"
+
+        logger.warning(f"Quota exhausted ({scope}) for customer {customer_id}, holding requests back for {delay}s")
+        self.pause(None if scope == "DEVELOPER" else customer_id, delay)
+        return delay
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Return queue depth and wait-time metrics per lane.
+        """
+        queue_depth = {name: 0 for name in LANE_NAMES.values()}
+        for waiter in self._waiters:
+            name = LANE_NAMES.get(waiter.priority, str(waiter.priority))
+            queue_depth[name] = queue_depth.get(name, 0) + 1
+
+        now = self._clock()
+        lanes = {}
+        for name, granted in self._granted.items():
+            lanes[name] = {
+                "queue_depth": queue_depth.get(name, 0),
+                "granted": granted,
+                "delayed": self._delayed[name],
+                "avg_wait_ms": round(self._wait_total[name] / granted * 1000, 1) if granted else 0.0,
+                "max_wait_ms": round(self._wait_max[name] * 1000, 1),
+            }
+        return {
+            "lanes": lanes,
+            "pauses": self._pauses,
+            "customer_buckets": len(self._customers),
+            "evicted_buckets": self._evicted,
+            "developer_paused_for": round(max(0.0, self._developer.paused_until - now), 1),
+            "paused_customers": {
+                customer_id: round(bucket.paused_until - now, 1)
+                for customer_id, bucket in self._customers.items()
+                if bucket.paused_until > now
+            },
+        }
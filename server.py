@@ -2,16 +2,50 @@ import logging
 import os
 import json
 import utils
-import requests
+import auth
+import http_client
+import cache
+import accounts
+import image_assets
+import mirror
+import shards
+import history
+import hierarchy
+import result_pages
+import gaql as gaql_parser
+import gaql_fields
+import batch
+import campaign_tree
+import scheduler
+import errors
+import retry
+import aggregate
+import result_format
+import metrics
+import log_pipeline
+from stream_parser import JsonArrayStreamParser
 from pydantic import Field
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, AsyncIterator, Iterator, Literal, Union, Callable, Awaitable
+import argparse
 import datetime
+import asyncio
+import time
+import hashlib
+import contextlib
+import contextvars
+import threading
+import functools
+import httpx
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse, Response
 
-logging.basicConfig(level=logging.INFO,
-                    format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
+# high-volume records get their own loggers, so that they can be sampled with GOOGLE_ADS_LOG_SAMPLING
+gaql_logger = logging.getLogger("google_ads.gaql")
+request_logger = logging.getLogger("google_ads.requests")
 
-from mcp.server.fastmcp import FastMCP
+from mcp.server.fastmcp import FastMCP, Context
 mcp = FastMCP("mcp-server-google-ads")
 
 from dotenv import load_dotenv
@@ -21,12 +55,461 @@ SCOPES = [
     "https://www.googleapis.com/auth/adwords",
 ]
 API_VERSION = "v21"
+# Google Ads REST API endpoint, e.g. http://127.0.0.1:8765 for the local stand-in in fake_google_ads.py
+GOOGLE_ADS_API_BASE_URL = (os.getenv("GOOGLE_ADS_API_BASE_URL") or "https://googleads.googleapis.com").rstrip("/")
 
 GOOGLE_ADS_CREDENTIALS_PATH = os.getenv("GOOGLE_ADS_CREDENTIALS_PATH")
 GOOGLE_ADS_LOGIN_CUSTOMER_ID = os.getenv("GOOGLE_ADS_LOGIN_CUSTOMER_ID")
 GOOGLE_ADS_DEVELOPER_TOKEN = os.getenv("GOOGLE_ADS_DEVELOPER_TOKEN")
 GOOGLE_ADS_AUTH_TYPE = "service_account"
 
+# HTTP connection pool settings, timeouts are in seconds
+GOOGLE_ADS_HTTP_MAX_CONNECTIONS = int(os.getenv("GOOGLE_ADS_HTTP_MAX_CONNECTIONS", "100"))
+GOOGLE_ADS_HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("GOOGLE_ADS_HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+GOOGLE_ADS_HTTP_KEEPALIVE_EXPIRY = float(os.getenv("GOOGLE_ADS_HTTP_KEEPALIVE_EXPIRY", "60"))
+GOOGLE_ADS_HTTP_TIMEOUT = float(os.getenv("GOOGLE_ADS_HTTP_TIMEOUT", "60"))
+GOOGLE_ADS_HTTP_CONNECT_TIMEOUT = float(os.getenv("GOOGLE_ADS_HTTP_CONNECT_TIMEOUT", "10"))
+
+# GAQL result cache, TTLs are in seconds, a TTL of 0 disables caching
+GOOGLE_ADS_CACHE_TTL = float(os.getenv("GOOGLE_ADS_CACHE_TTL", "300"))
+GOOGLE_ADS_CACHE_TTLS = os.getenv("GOOGLE_ADS_CACHE_TTLS", "")
+GOOGLE_ADS_CACHE_MAX_ENTRIES = int(os.getenv("GOOGLE_ADS_CACHE_MAX_ENTRIES", "256"))
+GOOGLE_ADS_CACHE_MAX_ROWS = int(os.getenv("GOOGLE_ADS_CACHE_MAX_ROWS", "200000"))
+
+# directory for the on-disk caches, next to this file by default since MCP clients may start the server from any directory
+GOOGLE_ADS_CACHE_DIR = os.getenv("GOOGLE_ADS_CACHE_DIR") or os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache")
+
+# account metadata registry, entries older than the max age (in seconds) are looked up again
+GOOGLE_ADS_ACCOUNT_REGISTRY_PATH = os.getenv("GOOGLE_ADS_ACCOUNT_REGISTRY_PATH") or os.path.join(GOOGLE_ADS_CACHE_DIR, "accounts.json")
+GOOGLE_ADS_ACCOUNT_REGISTRY_MAX_AGE = float(os.getenv("GOOGLE_ADS_ACCOUNT_REGISTRY_MAX_AGE", str(7 * 24 * 3600)))
+
+# local SQLite copy of the campaigns, ad groups, ads, budgets and assets of each account, kept current from change_event;
+# when enabled the list tools answer from it
+GOOGLE_ADS_MIRROR = os.getenv("GOOGLE_ADS_MIRROR", "false").lower() in ("1", "true", "yes")
+GOOGLE_ADS_MIRROR_PATH = os.getenv("GOOGLE_ADS_MIRROR_PATH") or os.path.join(GOOGLE_ADS_CACHE_DIR, "mirror.sqlite3")
+# seconds after the last sync of an account before a read syncs its changes first
+GOOGLE_ADS_MIRROR_MAX_STALENESS = float(os.getenv("GOOGLE_ADS_MIRROR_MAX_STALENESS", "300"))
+
+# on-disk store of the rows of date-segmented queries per day: days older than the mutable window (the conversion lag,
+# in days) are served from it and only the recent days and days not stored yet are fetched from the API
+GOOGLE_ADS_HISTORY = os.getenv("GOOGLE_ADS_HISTORY", "false").lower() in ("1", "true", "yes")
+GOOGLE_ADS_HISTORY_PATH = os.getenv("GOOGLE_ADS_HISTORY_PATH") or os.path.join(GOOGLE_ADS_CACHE_DIR, f"history_{API_VERSION}.sqlite3")
+GOOGLE_ADS_HISTORY_MUTABLE_DAYS = int(os.getenv("GOOGLE_ADS_HISTORY_MUTABLE_DAYS", "30"))
+
+# content hash -> resource name of the image assets of each account, so that upload_image_assets skips images already uploaded
+GOOGLE_ADS_IMAGE_INDEX_PATH = os.getenv("GOOGLE_ADS_IMAGE_INDEX_PATH") or os.path.join(GOOGLE_ADS_CACHE_DIR, "image_assets.json")
+# seconds after which the existing image assets of an account are listed again
+GOOGLE_ADS_IMAGE_INDEX_MAX_AGE = float(os.getenv("GOOGLE_ADS_IMAGE_INDEX_MAX_AGE", str(7 * 24 * 3600)))
+# directory upload_image_assets may read images from, any readable path if unset
+GOOGLE_ADS_IMAGE_ROOT = os.getenv("GOOGLE_ADS_IMAGE_ROOT")
+
+# run_gaql results with more rows than the page size are written to a file in the results directory and returned one
+# page at a time, with a cursor for fetch_result_page; 0 disables paging. Results not read for the idle TTL (seconds)
+# are deleted, and the oldest ones beyond the maximum number of results kept
+GOOGLE_ADS_RESULT_PAGE_SIZE = int(os.getenv("GOOGLE_ADS_RESULT_PAGE_SIZE", "1000"))
+GOOGLE_ADS_RESULT_DIR = os.getenv("GOOGLE_ADS_RESULT_DIR") or os.path.join(GOOGLE_ADS_CACHE_DIR, "results")
+GOOGLE_ADS_RESULT_IDLE_TTL = float(os.getenv("GOOGLE_ADS_RESULT_IDLE_TTL", "900"))
+GOOGLE_ADS_RESULT_MAX_RESULTS = int(os.getenv("GOOGLE_ADS_RESULT_MAX_RESULTS", "32"))
+
+# GAQL validation before queries are sent, against a field catalog downloaded once per API version (max age in seconds)
+GOOGLE_ADS_GAQL_VALIDATION = os.getenv("GOOGLE_ADS_GAQL_VALIDATION", "true").lower() not in ("0", "false", "no")
+GOOGLE_ADS_FIELD_CATALOG_PATH = os.getenv("GOOGLE_ADS_FIELD_CATALOG_PATH") or os.path.join(GOOGLE_ADS_CACHE_DIR, f"gaql_fields_{API_VERSION}.json")
+GOOGLE_ADS_FIELD_CATALOG_MAX_AGE = float(os.getenv("GOOGLE_ADS_FIELD_CATALOG_MAX_AGE", str(7 * 24 * 3600)))
+
+# cross-account GAQL fan-out: number of client accounts queried at the same time, per-account timeout in seconds
+GOOGLE_ADS_FANOUT_CONCURRENCY = int(os.getenv("GOOGLE_ADS_FANOUT_CONCURRENCY", "10"))
+GOOGLE_ADS_FANOUT_TIMEOUT = float(os.getenv("GOOGLE_ADS_FANOUT_TIMEOUT", "120"))
+
+# account hierarchy: manager accounts listed at the same time while walking each level, seconds a built tree is reused
+GOOGLE_ADS_HIERARCHY_CONCURRENCY = int(os.getenv("GOOGLE_ADS_HIERARCHY_CONCURRENCY", "10"))
+GOOGLE_ADS_HIERARCHY_TTL = float(os.getenv("GOOGLE_ADS_HIERARCHY_TTL", "3600"))
+
+# date-range sharded reports: shards run at the same time, attempts per shard and seconds per shard attempt
+GOOGLE_ADS_REPORT_CONCURRENCY = int(os.getenv("GOOGLE_ADS_REPORT_CONCURRENCY", "4"))
+GOOGLE_ADS_REPORT_SHARD_ATTEMPTS = int(os.getenv("GOOGLE_ADS_REPORT_SHARD_ATTEMPTS", "3"))
+GOOGLE_ADS_REPORT_SHARD_TIMEOUT = float(os.getenv("GOOGLE_ADS_REPORT_SHARD_TIMEOUT", "300"))
+
+# batch mutates: operations and estimated bytes per mutate request, number of requests sent at the same time
+GOOGLE_ADS_MUTATE_MAX_OPERATIONS = int(os.getenv("GOOGLE_ADS_MUTATE_MAX_OPERATIONS", "1000"))
+GOOGLE_ADS_MUTATE_MAX_REQUEST_BYTES = int(os.getenv("GOOGLE_ADS_MUTATE_MAX_REQUEST_BYTES", str(30 * 1024 * 1024)))
+GOOGLE_ADS_MUTATE_CONCURRENCY = int(os.getenv("GOOGLE_ADS_MUTATE_CONCURRENCY", "4"))
+
+# request pacing: requests per second and burst size per developer token and per customer ID, 0 means unlimited
+GOOGLE_ADS_RATE_LIMIT_QPS = float(os.getenv("GOOGLE_ADS_RATE_LIMIT_QPS", "10"))
+GOOGLE_ADS_RATE_LIMIT_BURST = float(os.getenv("GOOGLE_ADS_RATE_LIMIT_BURST", "20"))
+GOOGLE_ADS_CUSTOMER_RATE_LIMIT_QPS = float(os.getenv("GOOGLE_ADS_CUSTOMER_RATE_LIMIT_QPS", "5"))
+GOOGLE_ADS_CUSTOMER_RATE_LIMIT_BURST = float(os.getenv("GOOGLE_ADS_CUSTOMER_RATE_LIMIT_BURST", "10"))
+# RESOURCE_EXHAUSTED handling: requests are re-queued after the returned retry delay, up to this many times and this many seconds
+GOOGLE_ADS_QUOTA_RETRIES = int(os.getenv("GOOGLE_ADS_QUOTA_RETRIES", "2"))
+GOOGLE_ADS_QUOTA_MAX_RETRY_DELAY = float(os.getenv("GOOGLE_ADS_QUOTA_MAX_RETRY_DELAY", "60"))
+
+# retries of transient failures: attempts per request, backoff in seconds, retries allowed per request sent
+GOOGLE_ADS_RETRY_MAX_ATTEMPTS = int(os.getenv("GOOGLE_ADS_RETRY_MAX_ATTEMPTS", "4"))
+GOOGLE_ADS_RETRY_BASE_DELAY = float(os.getenv("GOOGLE_ADS_RETRY_BASE_DELAY", "0.5"))
+GOOGLE_ADS_RETRY_MAX_DELAY = float(os.getenv("GOOGLE_ADS_RETRY_MAX_DELAY", "20"))
+GOOGLE_ADS_RETRY_BUDGET_RATIO = float(os.getenv("GOOGLE_ADS_RETRY_BUDGET_RATIO", "0.1"))
+# GAQL reads slower than this latency percentile get a hedged second request, 0 disables hedging;
+# hedged requests wait for the rate limits and spend retry budget like retries
+GOOGLE_ADS_HEDGE_PERCENTILE = float(os.getenv("GOOGLE_ADS_HEDGE_PERCENTILE", "0"))
+
+# metrics and traces: Prometheus endpoint port on localhost (0 disables it), number of recent tool call traces kept (0 disables them)
+GOOGLE_ADS_METRICS_PORT = int(os.getenv("GOOGLE_ADS_METRICS_PORT", "0"))
+GOOGLE_ADS_TRACE_BUFFER = int(os.getenv("GOOGLE_ADS_TRACE_BUFFER", "50"))
+
+# logging: records are written by a background thread as JSON lines (or text) to stderr, payloads are truncated and
+# base64 blobs hashed; sampling keeps a fraction of the INFO/DEBUG records of some loggers, e.g. "google_ads.gaql=0.1,httpx=0.1"
+GOOGLE_ADS_LOG_LEVEL = os.getenv("GOOGLE_ADS_LOG_LEVEL", "INFO").upper()
+GOOGLE_ADS_LOG_FORMAT = os.getenv("GOOGLE_ADS_LOG_FORMAT", "json")
+GOOGLE_ADS_LOG_SAMPLING = os.getenv("GOOGLE_ADS_LOG_SAMPLING", "")
+GOOGLE_ADS_LOG_MAX_STRING = int(os.getenv("GOOGLE_ADS_LOG_MAX_STRING", "256"))
+# debugging: full, unredacted request payloads go to this rotating file (max bytes per file, 3 files are kept)
+GOOGLE_ADS_LOG_PAYLOADS_PATH = os.getenv("GOOGLE_ADS_LOG_PAYLOADS_PATH")
+GOOGLE_ADS_LOG_PAYLOADS_MAX_BYTES = int(os.getenv("GOOGLE_ADS_LOG_PAYLOADS_MAX_BYTES", str(50 * 1024 * 1024)))
+
+log_pipeline.configure_logging(
+    level=getattr(logging, GOOGLE_ADS_LOG_LEVEL, logging.INFO),
+    format=GOOGLE_ADS_LOG_FORMAT,
+    sampling=log_pipeline.parse_sampling(GOOGLE_ADS_LOG_SAMPLING),
+    payload_path=GOOGLE_ADS_LOG_PAYLOADS_PATH,
+    payload_max_bytes=GOOGLE_ADS_LOG_PAYLOADS_MAX_BYTES,
+    max_string=GOOGLE_ADS_LOG_MAX_STRING,
+)
+
+# MCP transport: stdio (one server process per client) or streamable-http/sse (one shared server for many clients)
+TRANSPORTS = ("stdio", "streamable-http", "sse")
+GOOGLE_ADS_MCP_TRANSPORT = os.getenv("GOOGLE_ADS_MCP_TRANSPORT", "stdio")
+GOOGLE_ADS_MCP_HOST = os.getenv("GOOGLE_ADS_MCP_HOST", "127.0.0.1")
+GOOGLE_ADS_MCP_PORT = int(os.getenv("GOOGLE_ADS_MCP_PORT", "8000"))
+# worker processes of the HTTP transports, more than one requires stateless sessions since each worker has its own memory
+GOOGLE_ADS_MCP_WORKERS = int(os.getenv("GOOGLE_ADS_MCP_WORKERS", "1"))
+GOOGLE_ADS_MCP_STATELESS = os.getenv("GOOGLE_ADS_MCP_STATELESS", "false").lower() in ("1", "true", "yes")
+# seconds running tool calls get to finish when the HTTP server stops
+GOOGLE_ADS_SHUTDOWN_TIMEOUT = float(os.getenv("GOOGLE_ADS_SHUTDOWN_TIMEOUT", "30"))
+
+# load the credentials, fetch the first access token and read the on-disk caches in a background thread at startup,
+# instead of during the first tool call
+GOOGLE_ADS_WARMUP = os.getenv("GOOGLE_ADS_WARMUP", "false").lower() in ("1", "true", "yes")
+
+# one credential manager per process: the key file is loaded once and access tokens are reused until they expire
+credential_manager = auth.CredentialManager(
+    GOOGLE_ADS_CREDENTIALS_PATH,
+    SCOPES,
+    GOOGLE_ADS_DEVELOPER_TOKEN,
+    GOOGLE_ADS_LOGIN_CUSTOMER_ID,
+)
+
+# one pooled, keep-alive HTTP client shared by all tools (HTTP/2 when the h2 package is installed)
+http_pool = http_client.HttpClientPool(
+    max_connections=GOOGLE_ADS_HTTP_MAX_CONNECTIONS,
+    max_keepalive_connections=GOOGLE_ADS_HTTP_MAX_KEEPALIVE_CONNECTIONS,
+    keepalive_expiry=GOOGLE_ADS_HTTP_KEEPALIVE_EXPIRY,
+    timeout=GOOGLE_ADS_HTTP_TIMEOUT,
+    connect_timeout=GOOGLE_ADS_HTTP_CONNECT_TIMEOUT,
+)
+
+# results of repeated GAQL queries, dropped per customer whenever that customer is mutated
+query_cache = cache.QueryCache(
+    default_ttl=GOOGLE_ADS_CACHE_TTL,
+    resource_ttls=cache.parse_resource_ttls(GOOGLE_ADS_CACHE_TTLS),
+    max_entries=GOOGLE_ADS_CACHE_MAX_ENTRIES,
+    max_rows=GOOGLE_ADS_CACHE_MAX_ROWS,
+)
+
+# GAQL queries running right now, joined by identical queries instead of sending them again
+gaql_flights = cache.SingleFlight()
+
+# manager flag, currency, time zone and name of every account seen in a customer_client query
+account_registry = accounts.AccountRegistry(GOOGLE_ADS_ACCOUNT_REGISTRY_PATH, GOOGLE_ADS_ACCOUNT_REGISTRY_MAX_AGE)
+
+# account tree below each manager account walked so far
+account_trees: Dict[str, hierarchy.AccountTree] = {}
+_account_tree_locks: Dict[str, asyncio.Lock] = {}
+
+# opened on first use, only when GOOGLE_ADS_MIRROR is enabled
+entity_mirror = mirror.Mirror(GOOGLE_ADS_MIRROR_PATH)
+_mirror_sync_locks: Dict[str, asyncio.Lock] = {}
+
+# opened on first use, only when GOOGLE_ADS_HISTORY is enabled
+metrics_history = history.HistoryStore(GOOGLE_ADS_HISTORY_PATH)
+
+# large query results, paged to the client by cursor
+result_store = result_pages.ResultPages(GOOGLE_ADS_RESULT_DIR, GOOGLE_ADS_RESULT_IDLE_TTL, GOOGLE_ADS_RESULT_MAX_RESULTS)
+
+# image assets of each account by content hash
+image_index = image_assets.ImageAssetIndex(GOOGLE_ADS_IMAGE_INDEX_PATH, GOOGLE_ADS_IMAGE_INDEX_MAX_AGE)
+
+# GAQL field metadata, downloaded in the background when missing or stale
+field_catalog = gaql_fields.FieldCatalog(GOOGLE_ADS_FIELD_CATALOG_PATH, GOOGLE_ADS_FIELD_CATALOG_MAX_AGE)
+_field_catalog_refresh: Optional[asyncio.Task] = None
+
+# every outbound API call waits for its turn here
+request_scheduler = scheduler.RequestScheduler(
+    developer_rate=GOOGLE_ADS_RATE_LIMIT_QPS,
+    developer_burst=GOOGLE_ADS_RATE_LIMIT_BURST,
+    customer_rate=GOOGLE_ADS_CUSTOMER_RATE_LIMIT_QPS,
+    customer_burst=GOOGLE_ADS_CUSTOMER_RATE_LIMIT_BURST,
+)
+
+
+retry_policy = retry.RetryPolicy(
+    max_attempts=GOOGLE_ADS_RETRY_MAX_ATTEMPTS,
+    base_delay=GOOGLE_ADS_RETRY_BASE_DELAY,
+    max_delay=GOOGLE_ADS_RETRY_MAX_DELAY,
+    budget=retry.RetryBudget(ratio=GOOGLE_ADS_RETRY_BUDGET_RATIO),
+)
+
+# time to response headers of GAQL reads, for hedging
+read_latency = retry.LatencyTracker()
+
+# latency, throughput and error metrics of tool calls and API requests, and traces linking the two
+metrics_registry = metrics.MetricsRegistry()
+metrics_registry.describe("tool_seconds", "MCP tool call duration in seconds")
+metrics_registry.describe("tool_in_flight", "MCP tool calls running")
+metrics_registry.describe("tool_errors_total", "MCP tool calls that raised, by error code or exception type")
+metrics_registry.describe("scheduler_wait_seconds", "Time API requests waited for the request scheduler in seconds")
+metrics_registry.describe("token_seconds", "Time spent getting an access token per API request in seconds")
+metrics_registry.describe("upstream_seconds", "Time to response headers of API requests in seconds")
+metrics_registry.describe("upstream_body_seconds", "Time spent reading API response bodies in seconds")
+metrics_registry.describe("upstream_in_flight", "API requests waiting for response headers")
+metrics_registry.describe("hedged_requests_total", "Second requests sent for slow GAQL reads")
+metrics_registry.describe("upstream_errors_total", "Failed API requests by Google Ads error code, API status or exception type")
+metrics_registry.describe("upstream_response_bytes_total", "API response bytes received, as sent on the wire")
+metrics_registry.describe("upstream_rows_total", "GAQL result rows received")
+metrics_registry.describe("gaql_coalesced_total", "GAQL queries answered by an identical query already running, i.e. API requests saved")
+metrics_registry.describe("gaql_coalesced_rows_total", "Rows of GAQL queries answered by an identical query already running")
+metrics_registry.describe("history_days_total", "Days of date-segmented GAQL queries, by source: stored or api")
+metrics_registry.describe("hierarchy_build_seconds", "Duration of account hierarchy walks in seconds")
+metrics_registry.describe("mirror_sync_seconds", "Duration of entity mirror syncs in seconds, by mode")
+metrics_registry.describe("mirror_synced_rows_total", "Rows written to the entity mirror")
+tracer = metrics.Tracer(GOOGLE_ADS_TRACE_BUFFER)
+
+# tool calls running, and whether the server is shutting down and refuses new ones
+_running_tool_calls = 0
+_draining = False
+_inside_tool: "contextvars.ContextVar[bool]" = contextvars.ContextVar("google_ads_inside_tool", default=False)
+
+
+def _error_label(error: BaseException) -> str:
+    if isinstance(error, errors.GoogleAdsApiError):
+        codes = error.error_codes()
+        return codes[0] if codes else error.status or str(error.status_code)
+    return type(error).__name__
+
+
+def instrumented(tool: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+    """
+    Time each call of a tool and trace the API requests it makes. Goes under @mcp.tool(), the signature is kept.
+    """
+    name = tool.__name__
+
+    @functools.wraps(tool)
+    async def wrapper(*args: Any, **kwargs: Any) -> Any:
+        global _running_tool_calls
+        # tools called by a running tool are part of that call and still run while draining
+        if _draining and not _inside_tool.get():
+            raise RuntimeError("The server is shutting down, retry the call")
+        started = time.perf_counter()
+        status = "ok"
+        token = _inside_tool.set(True)
+        _running_tool_calls += 1
+        with metrics_registry.in_flight("tool_in_flight", tool=name), tracer.span(f"tool {name}", tool=name):
+            try:
+                return await tool(*args, **kwargs)
+            except Exception as e:
+                status = "error"
+                metrics_registry.inc("tool_errors_total", tool=name, error=_error_label(e))
+                raise
+            finally:
+                _running_tool_calls -= 1
+                _inside_tool.reset(token)
+                metrics_registry.observe("tool_seconds", time.perf_counter() - started, tool=name, status=status)
+
+    return wrapper
+
+
+@contextlib.contextmanager
+def upstream_call(api_operation: str, customer_id: Optional[str], attempt: int) -> Iterator[metrics.Span]:
+    """
+    Time one API request until its response headers arrive, as a span of the current tool call.
+    Set the status_code attribute of the yielded span once the response is in.
+    """
+    started = time.perf_counter()
+    status = "error"
+    with tracer.span(f"POST {api_operation}", customer_id=customer_id, attempt=attempt) as span, \
+            metrics_registry.in_flight("upstream_in_flight", endpoint=api_operation):
+        try:
+            yield span
+            status = str(span.attributes.get("status_code", "ok"))
+        except Exception as e:
+            metrics_registry.inc("upstream_errors_total", endpoint=api_operation, code=type(e).__name__)
+            raise
+        finally:
+            metrics_registry.observe("upstream_seconds", time.perf_counter() - started, endpoint=api_operation, status=status)
+
+
+async def send_request(
+    customer_id: Optional[str],
+    api_operation: str,
+    json_body: Dict[str, Any],
+    context: str,
+    idempotent: bool,
+    hedge: bool = False
+) -> httpx.Response:
+    """
+    Send a POST request through the request scheduler and return the response once its headers arrived.
+    The caller reads the body and must close the response.
+
+    Failures are retried only when that is safe:
+    - RESOURCE_EXHAUSTED and UNAUTHENTICATED requests were rejected before execution and are always sent again,
+      after the retry delay returned by the API or with a fresh access token
+    - transport errors raised before the request was sent are always retried
+    - other transient errors (INTERNAL, UNAVAILABLE, DEADLINE_EXCEEDED, read timeouts...) are only retried
+      for idempotent requests, with jittered exponential backoff and within the retry budget
+
+    Args:
+        customer_id: Formatted customer ID, None for services that are not bound to a customer, e.g. googleAdsFields:search
+        api_operation: API operation, e.g. googleAds:searchStream
+        json_body: Request body as dict
+        context: Prefix of error messages, e.g. "Error running GAQL"
+        idempotent: Whether sending the request twice has the same effect as sending it once
+        hedge: Whether to send a second request when the first one is slower than usual, idempotent requests only
+
+    Returns:
+        httpx.Response: Streamed response with status 200
+    """
+    if customer_id is None:
+        url = f"{GOOGLE_ADS_API_BASE_URL}/{API_VERSION}/{api_operation}"
+    else:
+        url = f"{GOOGLE_ADS_API_BASE_URL}/{API_VERSION}/customers/{customer_id}/{api_operation}"
+    client = http_pool.get_client()
+
+    attempt = 0
+    # a rejected access token is replaced once, whatever other retries were made
+    token_refreshed = False
+    while True:
+        waited = await request_scheduler.acquire(customer_id or "")
+        metrics_registry.observe("scheduler_wait_seconds", waited, endpoint=api_operation)
+        retry_policy.budget.record_request()
+        token_started = time.perf_counter()
+        headers = await credential_manager.get_headers()
+        metrics_registry.observe("token_seconds", time.perf_counter() - token_started)
+
+        async def send() -> httpx.Response:
+            return await client.send(client.build_request("POST", url, headers=headers, json=json_body), stream=True)
+
+        async def send_hedge() -> httpx.Response:
+            # the hedged request is paced and counted like any other
+            hedge_waited = await request_scheduler.acquire(customer_id or "")
+            metrics_registry.observe("scheduler_wait_seconds", hedge_waited, endpoint=api_operation)
+            retry_policy.budget.record_request()
+            metrics_registry.inc("hedged_requests_total", endpoint=api_operation)
+            return await send()
+
+        hedge_delay = None
+        if hedge and idempotent and GOOGLE_ADS_HEDGE_PERCENTILE > 0:
+            hedge_delay = read_latency.percentile(GOOGLE_ADS_HEDGE_PERCENTILE)
+
+        started = time.perf_counter()
+        try:
+            with upstream_call(api_operation, customer_id, attempt) as span:
+                # a fast error answer must not win over a hedge that may still succeed
+                response = await retry.hedged(send, hedge_delay, on_discard=lambda response: response.aclose(),
+                                              send_hedge=send_hedge, allow_hedge=retry_policy.budget.try_spend,
+                                              is_success=lambda response: response.status_code < 300)
+                span.set(status_code=response.status_code)
+        except retry.TRANSIENT_TRANSPORT_ERRORS as e:
+            if (idempotent or isinstance(e, retry.UNSENT_REQUEST_ERRORS)) and retry_policy.can_retry(attempt):
+                delay = retry_policy.backoff(attempt)
+                logger.warning(f"{context}: {e!r}, retrying in {delay:.2f}s")
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            raise
+
+        if response.status_code == 200:
+            if hedge:
+                read_latency.record(time.perf_counter() - started)
+            return response
+
+        await response.aread()
+        await response.aclose()
+        error = errors.parse_api_error(context, response.status_code, response.text)
+        for code in error.error_codes() or [error.status or str(response.status_code)]:
+            metrics_registry.inc("upstream_errors_total", endpoint=api_operation, code=code)
+
+        if isinstance(error, errors.QuotaExceededError):
+            # the scheduler holds this request back for the retry delay once it is queued again
+            delay = request_scheduler.handle_quota_error(customer_id or "", error.rate_scope, error.retry_delay)
+            if attempt < GOOGLE_ADS_QUOTA_RETRIES and delay <= GOOGLE_ADS_QUOTA_MAX_RETRY_DELAY:
+                attempt += 1
+                continue
+        elif isinstance(error, errors.AuthenticationApiError):
+            if not token_refreshed:
+                logger.warning(f"{context}: access token rejected, retrying with a new one")
+                credential_manager.invalidate()
+                token_refreshed = True
+                continue
+        elif error.retryable and idempotent and retry_policy.can_retry(attempt):
+            delay = retry_policy.backoff(attempt)
+            logger.warning(f"{error}, retrying in {delay:.2f}s")
+            await asyncio.sleep(delay)
+            attempt += 1
+            continue
+
+        raise error
+
+
+def record_response_body(api_operation: str, response: httpx.Response, seconds: float, rows: Optional[int] = None) -> None:
+    metrics_registry.observe("upstream_body_seconds", seconds, endpoint=api_operation)
+    metrics_registry.inc("upstream_response_bytes_total", response.num_bytes_downloaded, endpoint=api_operation)
+    if rows is not None:
+        metrics_registry.inc("upstream_rows_total", rows, endpoint=api_operation)
+
+
+async def post_request(
+    customer_id: str = Field(description="Customer ID"),
+    api_operation: str = Field(description="API operation, e.g. campaignBudgets:mutate"),
+    json_body: Dict[str, Any] = Field(description="Request body as dict")
+) -> Dict[str, Any]:
+    """
+    Run POST request and return the full response body, e.g. including "partialFailureError".
+    """
+
+    try:
+        customer_id = utils.format_customer_id(customer_id)
+
+        # serialized and redacted by the logging thread, a mutate may carry megabytes of base64 image data
+        request_logger.info(f"Running POST request: {api_operation} for customer {customer_id}",
+                            extra={"customer_id": customer_id, "api_operation": api_operation, "payload": json_body})
+
+        # only validateOnly mutates are safe to send again after an error that may have been raised after execution
+        try:
+            response = await send_request(customer_id, api_operation, json_body, "Error running POST request",
+                                          idempotent=bool(json_body.get("validateOnly")))
+            started = time.perf_counter()
+            try:
+                await response.aread()
+            finally:
+                await response.aclose()
+                record_response_body(api_operation, response, time.perf_counter() - started)
+        finally:
+            # a mutate may have changed the customer even if it failed part way, drop its cached results
+            if api_operation.endswith(":mutate"):
+                query_cache.invalidate_customer(customer_id)
+                gaql_flights.forget(lambda key: key[0] == customer_id)
+
+        result = response.json()
+        # change_event lists changes minutes after they are made, the mirror fetches these right away on the next read
+        if GOOGLE_ADS_MIRROR and api_operation.endswith(":mutate") and not json_body.get("validateOnly"):
+            resource_names = mirror.mutated_resource_names(result)
+            if resource_names:
+                await asyncio.to_thread(entity_mirror.add_pending, customer_id, resource_names)
+        return result
+
+    except Exception as e:
+        logger.error(f"Error running POST request: {e}")
+        raise e
+
 
 async def run_post_request(
     customer_id: str = Field(description="Customer ID"),
@@ -48,79 +531,690 @@ async def run_post_request(
     }
     """
 
+    results = await post_request(customer_id, api_operation, json_body)
+    if not results.get("results"):
+        return []
+
+    return results.get("results")
+
+
+async def run_batch_mutate(
+    customer_id: str = Field(description="Customer ID"),
+    api_operation: str = Field(description="API operation, e.g. adGroupAds:mutate"),
+    operations: List[Dict[str, Any]] = Field(description="Mutate operations, e.g. {\"create\": {...}}"),
+    partial_failure: bool = Field(description="Whether valid operations succeed when others fail")
+) -> List[Dict[str, Any]]:
+    """
+    Send many mutate operations in as few requests as the per-request limits allow, sending the requests concurrently.
+
+    Example response, in input order:
+    [
+        {"index": 0, "resourceName": "customers/1234567890/adGroupAds/111~222"},
+        {"index": 1, "errors": [{"errorCode": {"fieldError": "REQUIRED"}, "message": "The required field was not present."}]}
+    ]
+    """
+
+    chunks = batch.chunk_operations(operations, GOOGLE_ADS_MUTATE_MAX_OPERATIONS, GOOGLE_ADS_MUTATE_MAX_REQUEST_BYTES)
+    logger.info(f"Sending {len(operations)} {api_operation} operations in {len(chunks)} requests")
+
+    semaphore = asyncio.Semaphore(GOOGLE_ADS_MUTATE_CONCURRENCY)
+
+    async def send_chunk(indexes: List[int]) -> List[Dict[str, Any]]:
+        json_body = {
+            "operations": [operations[index] for index in indexes],
+            "partialFailure": partial_failure,
+        }
+        async with semaphore:
+            try:
+                response = await post_request(customer_id, api_operation, json_body)
+            except Exception as e:
+                return batch.map_chunk_results(indexes, error=str(e))
+        return batch.map_chunk_results(indexes, response)
+
+    with scheduler.lane(scheduler.BULK):
+        chunk_results = await asyncio.gather(*[send_chunk(indexes) for indexes in chunks])
+    return [result for results in chunk_results for result in results]
+
+
+async def refresh_field_catalog() -> None:
+    """
+    Download the metadata of every GAQL field with googleAdsFields:search and replace the field catalog.
+    """
+    rows = []
+    json_body = {"query": gaql_fields.FIELDS_QUERY, "pageSize": 10000}
+    while True:
+        response = await send_request(None, "googleAdsFields:search", json_body, "Error downloading GAQL field catalog",
+                                      idempotent=True)
+        try:
+            await response.aread()
+        finally:
+            await response.aclose()
+        page = response.json()
+        rows.extend(page.get("results", []))
+        if not page.get("nextPageToken"):
+            break
+        json_body = {**json_body, "pageToken": page["nextPageToken"]}
+
+    field_catalog.replace(rows)
+    logger.info(f"Downloaded GAQL field catalog with {len(rows)} fields")
+
+
+async def ensure_field_catalog(wait: bool = False) -> None:
+    """
+    Start downloading the field catalog if it is missing or stale. A stale catalog keeps being used meanwhile.
+
+    Args:
+        wait: Whether to wait for the download to finish when there is no catalog yet
+    """
+    global _field_catalog_refresh
+
+    task = _field_catalog_refresh
+    if task is None or task.done() or task.get_loop() is not asyncio.get_running_loop():
+        if not field_catalog.needs_refresh():
+            return
+        field_catalog.refresh_started()
+
+        async def refresh() -> None:
+            try:
+                await refresh_field_catalog()
+            except Exception as e:
+                logger.warning(f"GAQL field catalog unavailable, only checking query syntax: {e}")
+
+        task = _field_catalog_refresh = asyncio.ensure_future(refresh())
+
+    if wait and not field_catalog.is_loaded():
+        await asyncio.shield(task)
+
+
+async def validate_gaql(customer_id: Optional[str], gaql: str) -> None:
+    """
+    Reject a GAQL query that the API would reject, before it is sent: syntax errors, unknown or
+    incompatible fields, fields that cannot be filtered or sorted on, a date segment without a
+    finite date range, and metrics requested for a known manager account.
+
+    Args:
+        customer_id: Formatted customer ID the query runs against, None if not known yet
+        gaql: GAQL query
+
+    Raises:
+        GaqlSyntaxError: The query is not valid GAQL
+        GaqlValidationError: The query uses fields in a way the API rejects
+    """
+    if not GOOGLE_ADS_GAQL_VALIDATION:
+        return
+
+    query = gaql_parser.parse(gaql)
+    await ensure_field_catalog()
+    is_manager = account_registry.is_manager(customer_id) if customer_id else None
+    problems = gaql_parser.check_query(query, is_manager) + field_catalog.validate(query)
+    if problems:
+        raise gaql_parser.GaqlValidationError(problems)
+
+
+async def stream_gaql_batches(
+    customer_id: str = Field(description="Customer ID"),
+    gaql: str = Field(description="GAQL query")
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Run a GAQL query with googleAds:searchStream and yield the response batches as they arrive.
+    Each batch is a dict with "results", "fieldMask" and "requestId". Only the batch that is
+    currently being received is held in memory.
+
+    Args:
+        customer_id: Customer ID
+        gaql: GAQL query
+
+    Returns:
+        AsyncIterator[Dict[str, Any]]: Response batches
+    """
+    customer_id = utils.format_customer_id(customer_id)
+
+    response = await send_request(customer_id, "googleAds:searchStream", {"query": gaql}, "Error running GAQL",
+                                  idempotent=True, hedge=True)
+    started = time.perf_counter()
+    rows = 0
     try:
-        credentials = utils.get_service_account_credentials(GOOGLE_ADS_CREDENTIALS_PATH, SCOPES)
-        headers = utils.generated_request_headers(GOOGLE_ADS_DEVELOPER_TOKEN, GOOGLE_ADS_LOGIN_CUSTOMER_ID, credentials)
-        headers["content-type"] = "application/json"    
+        parser = JsonArrayStreamParser()
+        async for chunk in response.aiter_text():
+            for batch in parser.feed(chunk):
+                rows += len(batch.get("results", ()))
+                yield batch
+        parser.close()
+    finally:
+        await response.aclose()
+        # includes the time the caller spent on each batch, as the next chunk is only read after that
+        elapsed = time.perf_counter() - started
+        record_response_body("googleAds:searchStream", response, elapsed, rows)
+        gaql_logger.info("Ran GAQL", extra={"customer_id": customer_id, "gaql": gaql, "rows": rows,
+                                            "response_bytes": response.num_bytes_downloaded,
+                                            "duration_ms": round(elapsed * 1000, 1)})
+
+
+async def stream_gaql(
+    customer_id: str = Field(description="Customer ID"),
+    gaql: str = Field(description="GAQL query")
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Run a GAQL query and yield the result rows one by one, for callers that consume rows incrementally.
 
-        customer_id = utils.format_customer_id(customer_id)
-        url = f"https://googleads.googleapis.com/{API_VERSION}/customers/{customer_id}/{api_operation}"
+    Example:
+        async for row in stream_gaql(customer_id, query):
+            ...
 
-        logger.info(f"Running POST request: {url}")
-        logger.info(f"Request body: {json.dumps(json_body, indent=2)}")
+    Args:
+        customer_id: Customer ID
+        gaql: GAQL query
 
-        response = requests.post(url, headers=headers, json=json_body)
+    Returns:
+        AsyncIterator[Dict[str, Any]]: Result rows
+    """
+    async for batch in stream_gaql_batches(customer_id, gaql):
+        for row in batch.get("results", []):
+            yield row
 
-        if response.status_code != 200:
-            raise Exception(f"Error running POST request: {response.text}")
-        
-        results = response.json()
-        if not results.get("results"):
-            return []
 
-        return results.get("results")
+async def full_sync_mirror(customer_id: str) -> int:
+    """
+    Copy every mirrored entity of an account into the mirror, replacing what it held.
+    """
+    cursor = mirror.initial_cursor()
+    # resources changed by this server are part of the copy
+    pending = await asyncio.to_thread(entity_mirror.pending, customer_id)
 
-    except Exception as e:
-        logger.error(f"Error running POST request: {e}")
-        raise e
+    async def sync_entity(entity: mirror.Entity) -> int:
+        rows = [row async for row in stream_gaql(customer_id, mirror.entity_query(entity))]
+        return await asyncio.to_thread(entity_mirror.replace, customer_id, entity, rows)
+
+    with scheduler.lane(scheduler.BULK):
+        written = await asyncio.gather(*[sync_entity(entity) for entity in mirror.ENTITIES.values()])
+    await asyncio.to_thread(entity_mirror.clear_pending, customer_id, pending)
+    await asyncio.to_thread(entity_mirror.mark_synced, customer_id, cursor, True)
+    return sum(written)
+
+
+async def incremental_sync_mirror(customer_id: str, cursor: str) -> Optional[int]:
+    """
+    Fetch the entities of an account that changed since the change cursor, or that this server mutated,
+    into the mirror. Returns None when there were more changes than change_event lists.
+    """
+    events = [row async for row in stream_gaql(customer_id, mirror.change_event_query(cursor))]
+    if len(events) >= mirror.CHANGE_EVENT_LIMIT:
+        return None
+    pending = await asyncio.to_thread(entity_mirror.pending, customer_id)
+    changes = [event["changeEvent"] for event in events if event.get("changeEvent")]
+
+    written = 0
+    for entity, field, resource_names, delete_missing in mirror.plan_refetch(
+            [change["changeResourceName"] for change in changes if change.get("changeResourceName")] + pending):
+        for query, chunk in mirror.refetch_queries(entity, field, resource_names):
+            rows = [row async for row in stream_gaql(customer_id, query)]
+            written += await asyncio.to_thread(entity_mirror.upsert, customer_id, entity, rows,
+                                               chunk if delete_missing else ())
+
+    cursor = mirror.next_cursor(cursor, [change["changeDateTime"] for change in changes if change.get("changeDateTime")])
+    await asyncio.to_thread(entity_mirror.clear_pending, customer_id, pending)
+    await asyncio.to_thread(entity_mirror.mark_synced, customer_id, cursor, False)
+    return written
+
+
+async def sync_mirror_customer(customer_id: str, full: bool = False, max_staleness: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Bring the mirror of an account up to date: a full copy the first time, after `full` is asked for or
+    when the last sync is older than change_event reaches back, and only the changes otherwise.
+    With max_staleness, an account synced less than that many seconds ago without own changes since is left as is.
+    """
+    customer_id = utils.format_customer_id(customer_id)
+    lock = _mirror_sync_locks.setdefault(customer_id, asyncio.Lock())
+    async with lock:
+        started = time.perf_counter()
+        state = await asyncio.to_thread(entity_mirror.state, customer_id)
+        age = time.time() - state["synced_at"] if state else None
+        mode = "none"
+        written: Optional[int] = 0
+        fresh = state is not None and max_staleness is not None and age <= max_staleness and not state["pending"]
+        if full or not fresh:
+            written = None
+            if not full and state and age < mirror.CHANGE_EVENT_MAX_AGE:
+                mode = "incremental"
+                written = await incremental_sync_mirror(customer_id, state["change_cursor"])
+            if written is None:
+                mode = "full"
+                written = await full_sync_mirror(customer_id)
+            elapsed = time.perf_counter() - started
+            metrics_registry.observe("mirror_sync_seconds", elapsed, mode=mode)
+            metrics_registry.inc("mirror_synced_rows_total", written, mode=mode)
+            logger.info(f"Synced {written} rows of customer {customer_id} to the mirror ({mode}) in {elapsed:.2f}s")
+            state = await asyncio.to_thread(entity_mirror.state, customer_id)
+
+    synced_at = state["synced_at"] if state else None
+    return {
+        "customer_id": customer_id,
+        "mode": mode,
+        "rows": written,
+        "synced_at": datetime.datetime.fromtimestamp(synced_at, datetime.timezone.utc).isoformat(timespec="seconds") if synced_at else None,
+        "age_seconds": round(time.time() - synced_at, 1) if synced_at else None,
+    }
+
+
+async def list_entity_rows(
+    customer_id: str,
+    entity_name: str,
+    parent_id: Optional[str] = None,
+    status: Optional[str] = None,
+    name_contains: Optional[str] = None,
+    limit: Optional[int] = None,
+    offset: int = 0,
+) -> Dict[str, Any]:
+    """
+    Return one page of the rows of a mirrored entity type, from the mirror when it is enabled and
+    with a GAQL query otherwise.
+    """
+    customer_id = utils.format_customer_id(customer_id)
+    entity = mirror.ENTITIES[entity_name]
+    if GOOGLE_ADS_MIRROR:
+        sync = await sync_mirror_customer(customer_id, max_staleness=GOOGLE_ADS_MIRROR_MAX_STALENESS)
+        rows, total = await asyncio.to_thread(entity_mirror.query, customer_id, entity, parent_id, status,
+                                              name_contains, limit, offset)
+        return {"results": rows, "total": total, "source": "mirror",
+                "synced_at": sync["synced_at"], "age_seconds": sync["age_seconds"]}
+
+    conditions = mirror.filter_conditions(entity, parent_id, status, name_contains)
+    rows = await run_gaql(customer_id, mirror.entity_query(entity, conditions, None if limit is None else offset + limit),
+                          page_size=0)
+    return {"results": rows[offset:] if limit is None else rows[offset:offset + limit],
+            "total": len(rows) if limit is None else None, "source": "api", "synced_at": None, "age_seconds": None}
 
 
 ############## MCP Tools ##############
 
+async def fetch_gaql(customer_id: str, gaql: str, coalesce: bool = True) -> List[Dict[str, Any]]:
+    """
+    Run a GAQL query and return all the rows. Identical queries running at the same time share one API request
+    and the same list of rows, which callers must not modify. With coalesce=False the query always gets its own
+    request, since a request already running may have started before a change the caller wants to see.
+    """
+
+    async def fetch() -> List[Dict[str, Any]]:
+        rows = [row async for row in stream_gaql(customer_id, gaql)]
+        if gaql_parser.get_resource(gaql) == "customer_client":
+            # written in a thread, the registry of a large manager account holds thousands of accounts
+            if account_registry.record_customer_clients(rows, save=False):
+                await asyncio.to_thread(account_registry.save)
+        return rows
+
+    if not coalesce:
+        return await fetch()
+    rows, shared = await gaql_flights.run(query_cache.key(customer_id, gaql), fetch)
+    if shared:
+        gaql_logger.debug("GAQL joined a running request", extra={"customer_id": customer_id, "gaql": gaql})
+        metrics_registry.inc("gaql_coalesced_total")
+        metrics_registry.inc("gaql_coalesced_rows_total", len(rows))
+    return rows
+
+
+async def fetch_gaql_with_history(customer_id: str, gaql: str) -> Optional[List[Dict[str, Any]]]:
+    """
+    Run a date-segmented GAQL query with the days older than the mutable window taken from the history store.
+    The other days are fetched in as few date ranges as possible and the settled ones stored.
+    Returns None if the store cannot serve the query, see history.plan_history.
+    """
+    account = account_registry.get(customer_id) or {}
+    plan = history.plan_history(gaql, history.account_today(account.get("time_zone")), GOOGLE_ADS_HISTORY_MUTABLE_DAYS)
+    if plan is None:
+        return None
+
+    stored = await asyncio.to_thread(metrics_history.get, customer_id, plan.key, plan.days[0], plan.settled_end)
+    missing = [day for day in plan.days if day.isoformat() not in stored]
+    ranges = history.contiguous_ranges(missing)
+    fetched = await asyncio.gather(*[
+        fetch_gaql(customer_id, shards.with_date_range(plan.query, start, end)) for start, end in ranges])
+    by_day = history.rows_by_day(row for rows in fetched for row in rows)
+
+    settled = {day.isoformat(): by_day.get(day.isoformat(), []) for day in missing if day <= plan.settled_end}
+    if settled:
+        await asyncio.to_thread(metrics_history.put, customer_id, plan, settled)
+    gaql_logger.debug("GAQL history", extra={"customer_id": customer_id, "gaql": gaql, "stored_days": len(stored),
+                                             "fetched_days": len(missing), "requests": len(ranges)})
+    metrics_registry.inc("history_days_total", len(stored), source="stored")
+    metrics_registry.inc("history_days_total", len(missing), source="api")
+
+    days = [day.isoformat() for day in plan.days]
+    return shards.merge_shards(gaql, [stored[day] if day in stored else by_day.get(day, []) for day in days])
+
+
+async def read_result_page(handle: str, page: int) -> Dict[str, Any]:
+    """
+    Return a page of a stored result in the format it was requested in, with the cursor of the next page.
+    """
+    try:
+        rows, info = await asyncio.to_thread(result_store.page, handle, page)
+    except KeyError:
+        raise ValueError("The result of this cursor has expired or does not exist, run the query again") from None
+    except IndexError as e:
+        raise ValueError(str(e)) from None
+    meta = info["meta"]
+    results = rows if meta["format"] == "rows" else format_gaql_results(
+        meta["gaql"], rows, meta["format"], meta["micros_to_currency"])
+    return {
+        "results": results,
+        "row_count": info["row_count"],
+        "page": page + 1,
+        "pages": info["pages"],
+        "page_size": info["page_size"],
+        "next_cursor": result_pages.make_cursor(handle, page + 1) if page + 1 < info["pages"] else None,
+    }
+
+
+async def page_gaql_results(
+    gaql: str,
+    results: List[Dict[str, Any]],
+    page_size: int,
+    format: str,
+    micros_to_currency: bool
+) -> Dict[str, Any]:
+    """
+    Store the rows of a large result on disk and return its first page.
+    """
+    meta = {"gaql": gaql, "format": format, "micros_to_currency": micros_to_currency}
+    handle = await asyncio.to_thread(result_store.create, results, page_size, meta)
+    gaql_logger.debug("GAQL result paged", extra={"gaql": gaql, "rows": len(results), "page_size": page_size})
+    return await read_result_page(handle, 0)
+
+
+def format_gaql_results(
+    gaql: str,
+    results: List[Dict[str, Any]],
+    format: str,
+    micros_to_currency: bool = False
+) -> Union[List[Dict[str, Any]], Dict[str, Any], str]:
+    """
+    Convert GAQL result rows to a columnar format, with one column per selected field, typed from the field catalog.
+    """
+    try:
+        fields = gaql_parser.parse(gaql).fields
+    except gaql_parser.GaqlSyntaxError:
+        # validation is disabled and the query uses syntax the parser does not know, take the fields from the rows
+        fields = None
+    data_types = field_catalog.data_types(fields or [])
+    return result_format.format_results(results, format, fields, data_types, micros_to_currency)
+
+
 @mcp.tool()
+@instrumented
 async def run_gaql(
     customer_id: str = Field(description="Customer ID"), 
-    gaql: str = Field(description="GAQL query")
-    ) -> List[Dict[str, Any]]:
+    gaql: str = Field(description="GAQL query"),
+    use_cache: bool = True,
+    format: Literal["rows", "columns", "csv", "table"] = "rows",
+    micros_to_currency: bool = False,
+    page_size: Optional[int] = None
+    ) -> Union[List[Dict[str, Any]], Dict[str, Any], str]:
     """
-    Run a GAQL query.
-    
+    Run a GAQL query and return all the result rows.
+    Rows are fetched with googleAds:searchStream, so large reports are not truncated to the first page.
+    Results are cached for a few minutes, pass use_cache=False to always query the API.
+    Identical queries running at the same time, e.g. from parallel sessions, share one API request, unless
+    use_cache=False.
+    With GOOGLE_ADS_HISTORY enabled, queries selecting segments.date over a literal date window only fetch
+    the recent days and the days not stored yet; older days come from the on-disk history store.
+    The query is checked locally first: invalid field names or incompatible fields are reported without an API call.
+
+    Results with more rows than the page size (1000 by default) are kept by the server and returned one page
+    at a time, in the requested format, as
+    {"results": <first page>, "row_count": 25000, "page": 1, "pages": 25, "page_size": 1000, "next_cursor": "..."}.
+    Pass next_cursor to fetch_result_page for the following pages, until it is null; rows keep their order
+    across pages. Prefer aggregating or filtering in GAQL over reading many pages.
+
+    Formats:
+    - "rows": nested rows as returned by the API
+    - "columns": {"columns": ["campaign.id", ...], "types": ["INT64", ...], "data": [[...], ...], "row_count": n},
+      one value array per selected field, much smaller than rows for large reports
+    - "csv": CSV text with a header line
+    - "table": markdown table
+
     Args:
         customer_id: Customer ID
         gaql: GAQL query
-    
+        use_cache: Whether to serve and store the result in the GAQL result cache
+        format: Output format, one of "rows", "columns", "csv" or "table"
+        micros_to_currency: Whether to convert *_micros fields to currency units (e.g. metrics.cost_micros
+            becomes metrics.cost), and the currency metrics in micros without the suffix such as
+            metrics.average_cpc, for "columns", "csv" and "table"
+        page_size: Optional number of rows per page, 0 returns all the rows at once
+
     Returns:
-        List[Dict[str, Any]]: List of results
+        Union[List[Dict[str, Any]], Dict[str, Any], str]: Result in the requested format, or its first page
     """
 
     try:
-        credentials = utils.get_service_account_credentials(GOOGLE_ADS_CREDENTIALS_PATH, SCOPES)
-        headers = utils.generated_request_headers(GOOGLE_ADS_DEVELOPER_TOKEN, GOOGLE_ADS_LOGIN_CUSTOMER_ID, credentials)    
-
         customer_id = utils.format_customer_id(customer_id)
-        url = f"https://googleads.googleapis.com/{API_VERSION}/customers/{customer_id}/googleAds:search"
+        await validate_gaql(customer_id, gaql)
+        results = query_cache.get(customer_id, gaql) if use_cache else None
+        if results is not None:
+            gaql_logger.debug("GAQL cache hit", extra={"customer_id": customer_id, "gaql": gaql})
+        else:
+            # a mutate while the query runs makes its rows outdated, they are then not cached
+            generation = query_cache.generation(customer_id)
+            results = await fetch_gaql_with_history(customer_id, gaql) if GOOGLE_ADS_HISTORY and use_cache else None
+            if results is None:
+                results = await fetch_gaql(customer_id, gaql, coalesce=use_cache)
+            if use_cache:
+                query_cache.put(customer_id, gaql, results, generation)
+
+        page_size = GOOGLE_ADS_RESULT_PAGE_SIZE if page_size is None else page_size
+        if page_size and len(results) > page_size:
+            return await page_gaql_results(gaql, results, page_size, format, micros_to_currency)
+        if format == "rows":
+            return results
+        return format_gaql_results(gaql, results, format, micros_to_currency)
+
+    except Exception as e:
+        logger.error(f"Error running GAQL: {e}")
+        raise e
+
+
+@mcp.tool()
+@instrumented
+async def fetch_result_page(
+    cursor: str = Field(description="next_cursor returned with a page of a large result")
+) -> Dict[str, Any]:
+    """
+    Fetch the next page of a large run_gaql result, in the format of the first page.
+    Results are kept for about 15 minutes after they were last read; run the query again if the cursor has expired.
+
+    Args:
+        cursor: next_cursor of the previous page
+
+    Returns:
+        Dict[str, Any]: {"results": <page>, "row_count": ..., "page": ..., "pages": ..., "page_size": ...,
+                        "next_cursor": <cursor of the following page, null after the last page>}
+    """
+    handle, page = result_pages.parse_cursor(cursor)
+    return await read_result_page(handle, page)
 
-        logger.debug(f"Running GAQL: {gaql}")
 
-        response = requests.post(url, headers=headers, json={"query": gaql})
+@mcp.tool()
+@instrumented
+async def run_gaql_report(
+    customer_id: str = Field(description="Customer ID"),
+    gaql: str = Field(description="GAQL query selecting segments.date with a date window, e.g. WHERE segments.date BETWEEN '2023-01-01' AND '2025-12-31'"),
+    shard_by: Literal["month", "week", "day"] = "month",
+    max_concurrency: Optional[int] = None,
+    use_cache: bool = True,
+    format: Literal["rows", "columns", "csv", "table"] = "rows",
+    micros_to_currency: bool = False,
+    ctx: Optional[Context] = None
+) -> Dict[str, Any]:
+    """
+    Run a GAQL report over a long date window as one query per month, week or day, several at a time,
+    and merge the rows in the order the query asks for. Use this instead of run_gaql for daily data over
+    many months: each shard is small enough to finish quickly, and a shard that fails is retried on its own.
+    The query must select segments.date and give the window with literal dates, BETWEEN or a >= and <= pair on
+    segments.date; other queries, e.g. totals over the window, run as a single shard. Progress is reported as each shard finishes.
 
-        if response.status_code != 200:
-            raise Exception(f"Error running GAQL: {response.text}")
-        
-        results = response.json()
-        if not results.get("results"):
-            return []
+    Example response:
+    {
+        "results": [{"campaign": {"id": "111"}, "segments": {"date": "2023-01-01"}, "metrics": {"clicks": "42"}}],
+        "shards": [
+            {"start": "2023-01-01", "end": "2023-01-31", "row_count": 31, "attempts": 1, "elapsed_ms": 812.4, "error": null}
+        ],
+        "summary": {"shards": 36, "succeeded": 36, "failed": 0, "rows": 1096, "elapsed_ms": 7431.0}
+    }
 
-        return results.get("results")
+    Args:
+        customer_id: Customer ID
+        gaql: GAQL query
+        shard_by: Length of the date range of each shard, "month", "week" or "day"
+        max_concurrency: Optional number of shards run at the same time
+        use_cache: Whether to serve and store each shard in the GAQL result cache
+        format: Output format of the merged results, as in run_gaql
+        micros_to_currency: Whether to convert *_micros fields to currency units, as in run_gaql
+
+    Returns:
+        Dict[str, Any]: Merged results, per-shard summary and totals. Rows of failed shards are missing,
+                        check summary.failed
+    """
+
+    started = time.perf_counter()
+    customer_id = utils.format_customer_id(customer_id)
+    await validate_gaql(customer_id, gaql)
+    plan = shards.plan_shards(gaql, shard_by)
+    logger.info(f"Running GAQL report for customer {customer_id} in {len(plan)} shards by {shard_by}")
+
+    semaphore = asyncio.Semaphore(max_concurrency or GOOGLE_ADS_REPORT_CONCURRENCY)
+    finished = 0
+
+    async def run_shard(shard: shards.Shard) -> Dict[str, Any]:
+        nonlocal finished
+        sharded = len(plan) > 1
+        summary = {"start": shard.start.isoformat() if sharded else None, "end": shard.end.isoformat() if sharded else None,
+                   "row_count": 0, "attempts": 0, "elapsed_ms": 0.0, "error": None}
+        async with semaphore:
+            shard_started = time.perf_counter()
+            for attempt in range(GOOGLE_ADS_REPORT_SHARD_ATTEMPTS):
+                summary["attempts"] = attempt + 1
+                try:
+                    rows = await asyncio.wait_for(run_gaql(customer_id, shard.query, use_cache, page_size=0), GOOGLE_ADS_REPORT_SHARD_TIMEOUT)
+                    summary.update(rows=rows, row_count=len(rows), error=None)
+                    break
+                except (errors.TransientApiError, httpx.HTTPError, asyncio.TimeoutError) as e:
+                    summary["error"] = str(e) or repr(e)
+                    if attempt + 1 < GOOGLE_ADS_REPORT_SHARD_ATTEMPTS:
+                        logger.warning(f"GAQL report shard {summary['start']}..{summary['end']} failed, retrying: {e!r}")
+                        await asyncio.sleep(retry_policy.backoff(attempt))
+                except Exception as e:
+                    # the same query would fail again
+                    summary["error"] = str(e) or repr(e)
+                    break
+            summary["elapsed_ms"] = round((time.perf_counter() - shard_started) * 1000, 1)
+
+        finished += 1
+        if ctx is not None:
+            outcome = f"failed: {summary['error']}" if summary["error"] else f"{summary['row_count']} rows"
+            # there is no request to report to when the tool is called outside of an MCP session
+            with contextlib.suppress(ValueError):
+                await ctx.report_progress(finished, len(plan), f"Shard {summary['start']}..{summary['end']}: {outcome}")
+        return summary
+
+    summaries = await asyncio.gather(*[run_shard(shard) for shard in plan])
+    rows = shards.merge_shards(gaql, [summary.pop("rows", []) for summary in summaries])
+
+    failed = sum(1 for summary in summaries if summary["error"])
+    return {
+        "results": rows if format == "rows" else format_gaql_results(gaql, rows, format, micros_to_currency),
+        "shards": summaries,
+        "summary": {
+            "shards": len(summaries),
+            "succeeded": len(summaries) - failed,
+            "failed": failed,
+            "rows": len(rows),
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+        },
+    }
+
+
+@mcp.tool()
+@instrumented
+async def aggregate_gaql(
+    customer_id: str = Field(description="Customer ID"),
+    gaql: str = Field(description="GAQL query selecting the group-by and aggregated fields"),
+    group_by: List[str] = Field(description="Fields to group by, e.g. [\"campaign.name\", \"segments.device\"], empty for one total row"),
+    aggregates: List[str] = Field(description="Aggregates, e.g. [\"sum(metrics.cost_micros)\", \"avg(metrics.clicks)\", \"count(*)\", \"ctr\", \"cpc\"]"),
+    order_by: Optional[str] = None,
+    ascending: bool = False,
+    top_n: Optional[int] = None,
+    micros_to_currency: bool = False,
+    format: Literal["columns", "csv", "table"] = "columns"
+) -> Union[Dict[str, Any], str]:
+    """
+    Run a GAQL query and aggregate the rows on the server as they stream in, returning only the aggregated table.
+    Use this instead of run_gaql for totals over many segmented rows, e.g. total cost by campaign and device over 90 days.
+
+    Aggregates:
+    - sum(field), avg(field), min(field), max(field), count(field) and count(*)
+    - weighted ratios over each group: ctr (clicks / impressions), cpc (cost / clicks),
+      cpm (cost / impressions * 1000) and cpa (cost / conversions); the query must select the metrics they use
+
+    Example response:
+    {
+        "columns": ["campaign.name", "segments.device", "sum(metrics.cost_micros)", "ctr"],
+        "rows": [["Brand", "MOBILE", 125000000.0, 0.052]],
+        "group_count": 12,
+        "row_count": 1080
+    }
+
+    Args:
+        customer_id: Customer ID
+        gaql: GAQL query selecting the group-by and aggregated fields
+        group_by: Fields to group by
+        aggregates: Aggregates to compute per group
+        order_by: Aggregate to sort the groups by, defaults to the first aggregate
+        ascending: Whether to sort smallest first, largest first by default
+        top_n: Number of groups to return, all if not set
+        micros_to_currency: Whether to convert micros sums, averages, minimums, maximums and cpc/cpm/cpa to currency units
+        format: Output format, one of "columns", "csv" or "table"
+
+    Returns:
+        Union[Dict[str, Any], str]: Aggregated table
+    """
+
+    try:
+        customer_id = utils.format_customer_id(customer_id)
+        aggregator = aggregate.GroupAggregator(group_by, aggregates)
+        await validate_gaql(customer_id, gaql)
+        try:
+            selected = set(gaql_parser.parse(gaql).fields)
+        except gaql_parser.GaqlSyntaxError:
+            selected = None
+        missing = [name for name in aggregator.required_fields() if selected is not None and name not in selected]
+        if missing:
+            raise ValueError(f"The query must select the fields used by group_by and aggregates: {', '.join(missing)}")
+
+        # rows are aggregated batch by batch and never collected, unless the result is already cached
+        cached = query_cache.get(customer_id, gaql)
+        if cached is not None:
+            aggregator.extend(cached)
+        else:
+            async for batch in stream_gaql_batches(customer_id, gaql):
+                aggregator.extend(batch.get("results", []))
+
+        columns, rows = aggregator.results(order_by, ascending, top_n, micros_to_currency)
+        logger.info(f"Aggregated {aggregator.row_count} rows into {aggregator.group_count} groups")
+        if format == "csv":
+            return result_format.csv_text(columns, rows)
+        if format == "table":
+            return result_format.markdown_table(columns, rows)
+        return {"columns": columns, "rows": rows, "group_count": aggregator.group_count, "row_count": aggregator.row_count}
 
     except Exception as e:
-        logger.error(f"Error running GAQL: {e}")
+        logger.error(f"Error aggregating GAQL results: {e}")
         raise e
 
 
 ############## MCP tools using REST APIs ##############
 
 @mcp.tool()
+@instrumented
 async def create_image_asset(
     customer_id: str = Field(description="Customer ID"),
     image_asset: Dict[str, Any] = Field(description="Image asset")
@@ -146,6 +1240,7 @@ async def create_image_asset(
     return await run_post_request(customer_id, "assets:mutate", operations)
 
 @mcp.tool()
+@instrumented
 async def create_ad(
     customer_id: str = Field(description="Customer ID"),
     ad: Dict[str, Any] = Field(description="Ad")
@@ -173,6 +1268,7 @@ async def create_ad(
 
 
 @mcp.tool()
+@instrumented
 async def create_ad_group(
     customer_id: str = Field(description="Customer ID"),
     ad_group: Dict[str, Any] = Field(description="Ad group")
@@ -210,6 +1306,7 @@ async def create_ad_group(
 
 
 @mcp.tool()
+@instrumented
 async def create_campaign_budget(
     customer_id: str = Field(description="Customer ID"),
     campaign_budget: Dict[str, Any] = Field(description="Campaign budget")
@@ -236,12 +1333,13 @@ async def create_campaign_budget(
 
 
 @mcp.tool()
+@instrumented
 async def create_display_campaign(
     customer_id: str = Field(description="Customer ID"),
     campaign: Dict[str, Any] = Field(description="Campaign")
 ) -> Dict[str, Any]:
     """
-    Create a campaign.
+    Create a campaign together with a new campaign budget, in a single request.
     
     Args:
         customer_id: Customer ID
@@ -251,30 +1349,281 @@ async def create_display_campaign(
         Dict[str, Any]: Campaign
     """
 
-    # first, create a campaign budget, find the budget resource name in the response
+    # the budget and the campaign referencing it are created together in one atomic googleAds:mutate request
     budget = {
         "name": "Test Campaign Budget: " + str(datetime.datetime.now()),
         "amountMicros": 100000,
         "deliveryMethod": "STANDARD"
     }
-    budget_result = await create_campaign_budget(customer_id, budget)
-    budget_resource_name = budget_result[0]["resourceName"]
+    tree = await create_campaign_tree(customer_id, campaign, budget)
+    return [{"resourceName": tree["campaign"]}]
 
-    # second, create a campaign, using the newly created budget resource name
-    campaign["campaignBudget"] = budget_resource_name
-    operations = {
-        "operations": [
-            {
-                "create": campaign
-            }
-        ]
-    }
-    return await run_post_request(customer_id, "campaigns:mutate", operations)
+
+@mcp.tool()
+@instrumented
+async def create_campaign_tree(
+    customer_id: str = Field(description="Customer ID"),
+    campaign: Dict[str, Any] = Field(description="Campaign, without campaignBudget unless an existing budget is used"),
+    campaign_budget: Optional[Dict[str, Any]] = None,
+    ad_groups: Optional[List[Dict[str, Any]]] = None
+) -> Dict[str, Any]:
+    """
+    Create a campaign budget, a campaign, its ad groups and their ads in a single atomic googleAds:mutate request.
+    Entities are linked through temporary resource names, either everything is created or nothing is.
+
+    ad_groups example, ads take the same format as in create_ad without "adGroup":
+    [
+        {
+            "name": "Test Ad Group",
+            "status": "ENABLED",
+            "type": "DISPLAY_STANDARD",
+            "cpcBidMicros": 100000,
+            "ads": [
+                {
+                    "status": "ENABLED",
+                    "ad": {
+                        "name": "earbuds",
+                        "finalUrls": ["https://www.yahoo.com"],
+                        "imageAd": {"imageAsset": {"asset": "customers/9711179739/assets/297374613372"}}
+                    }
+                }
+            ]
+        }
+    ]
+
+    Args:
+        customer_id: Customer ID
+        campaign: Campaign
+        campaign_budget: Optional campaign budget to create for the campaign
+        ad_groups: Optional ad groups to create in the campaign, each with optional "ads"
+    
+    Returns:
+        Dict[str, Any]: Resource names of the created campaign budget, campaign, ad groups and ads
+    """
+
+    customer_id = utils.format_customer_id(customer_id)
+    operations = campaign_tree.build_campaign_tree_operations(customer_id, campaign, campaign_budget, ad_groups)
+    logger.info(f"Creating campaign tree with {len(operations)} operations for customer: {customer_id}")
+
+    response = await post_request(customer_id, "googleAds:mutate", {"mutateOperations": operations})
+    return campaign_tree.summarize_campaign_tree_response(response)
+
+
+@mcp.tool()
+@instrumented
+async def create_image_assets(
+    customer_id: str = Field(description="Customer ID"),
+    image_assets: List[Dict[str, Any]] = Field(description="Image assets, same format as in create_image_asset"),
+    partial_failure: bool = True
+) -> List[Dict[str, Any]]:
+    """
+    Create many image assets with as few requests as possible.
+    
+    Args:
+        customer_id: Customer ID
+        image_assets: Image assets
+        partial_failure: Whether valid image assets are created when others fail
+    
+    Returns:
+        List[Dict[str, Any]]: Resource name or errors of each image asset, in input order
+    """
+
+    operations = [{"create": image_asset} for image_asset in image_assets]
+    return await run_batch_mutate(customer_id, "assets:mutate", operations, partial_failure)
+
+
+async def match_existing_image(customer_id: str, digest: str, file_size: int) -> Optional[str]:
+    """
+    Download and hash the account's image assets of the same file size whose hash is not known yet,
+    and return the resource name of the one with this content hash, if any.
+    """
+    client = http_pool.get_client()
+    for candidate in image_index.candidates(customer_id, file_size):
+        try:
+            response = await client.get(candidate["url"])
+            response.raise_for_status()
+        except httpx.HTTPError as e:
+            logger.warning(f"Failed to download image asset {candidate['resource_name']}: {e}")
+            continue
+        candidate_digest = hashlib.sha256(response.content).hexdigest()
+        image_index.record(customer_id, candidate_digest, candidate["resource_name"], candidate["name"], file_size, save=False)
+        if candidate_digest == digest:
+            return candidate["resource_name"]
+    return None
+
+
+@mcp.tool()
+@instrumented
+async def upload_image_assets(
+    customer_id: str = Field(description="Customer ID"),
+    path: str = Field(description="Image file or directory of images (.png, .jpg, .jpeg, .gif) on the machine running the server"),
+    recursive: bool = False,
+    refresh_index: bool = False
+) -> List[Dict[str, Any]]:
+    """
+    Upload images from local files as image assets, skipping the images the account already has.
+    Use this instead of create_image_assets when the images are files: they are read and base64 encoded by the
+    server, and an image whose content was uploaded before returns the existing asset instead of a duplicate.
+    The new images are created with as few assets:mutate requests as possible, named after their file.
+
+    Example response, in file order:
+    [
+        {"path": "/images/logo.png", "sha256": "9f86...", "status": "uploaded", "resourceName": "customers/1234567890/assets/111"},
+        {"path": "/images/logo_copy.png", "sha256": "9f86...", "status": "duplicate", "resourceName": "customers/1234567890/assets/111"},
+        {"path": "/images/banner.png", "sha256": "2c26...", "status": "existing", "resourceName": "customers/1234567890/assets/99"},
+        {"path": "/images/huge.png", "sha256": "fcde...", "status": "error", "errors": [...]}
+    ]
+
+    Args:
+        customer_id: Customer ID
+        path: Image file or directory of images
+        recursive: Whether to include the images in subdirectories
+        refresh_index: Whether to list the account's existing image assets again rather than use the index
+
+    Returns:
+        List[Dict[str, Any]]: Status and resource name or errors of each image
+    """
+
+    customer_id = utils.format_customer_id(customer_id)
+    if GOOGLE_ADS_IMAGE_ROOT:
+        root = os.path.realpath(GOOGLE_ADS_IMAGE_ROOT)
+        if os.path.commonpath([root, os.path.realpath(os.path.expanduser(path))]) != root:
+            raise ValueError(f"{path} is outside of the image directory {GOOGLE_ADS_IMAGE_ROOT}")
+
+    files = await asyncio.to_thread(image_assets.find_images, path, recursive)
+    digests = await asyncio.to_thread(lambda: [(image_assets.file_digest(file), os.path.getsize(file)) for file in files])
+
+    if refresh_index or not image_index.is_seeded(customer_id):
+        rows = await run_gaql(customer_id, image_assets.SEED_QUERY, use_cache=False, page_size=0)
+        unhashed = image_index.seed(customer_id, rows, save=False)
+        logger.info(f"Indexed {len(rows)} image assets of customer {customer_id}, {unhashed} not hashed yet")
+
+    results: List[Dict[str, Any]] = []
+    # content hash -> position of the first file with that content among the new images
+    new_images: Dict[str, int] = {}
+    for index, (file, (digest, file_size)) in enumerate(zip(files, digests)):
+        result = {"path": file, "sha256": digest}
+        results.append(result)
+        if digest in new_images:
+            result["status"] = "duplicate"
+            continue
+        resource_name = image_index.find(customer_id, digest) or await match_existing_image(customer_id, digest, file_size)
+        if resource_name:
+            result.update(status="existing", resourceName=resource_name)
+        else:
+            new_images[digest] = index
+
+    def operation(index: int, data: str) -> Dict[str, Any]:
+        return {"create": {"name": image_assets.asset_name(files[index]), "type": "IMAGE", "imageAsset": {"data": data}}}
+
+    # requests are planned from the file sizes, then each one is encoded, sent and dropped before the next,
+    # so that at most one request worth of base64 data is in memory
+    uploads = list(new_images.items())
+    sizes = [batch.estimate_size(operation(index, "")) + image_assets.encoded_size(digests[index][1])
+             for _, index in uploads]
+    for chunk in batch.chunk_sizes(sizes, GOOGLE_ADS_MUTATE_MAX_OPERATIONS, GOOGLE_ADS_MUTATE_MAX_REQUEST_BYTES):
+        # encoded in a thread, one file at a time from a memory map
+        operations = await asyncio.to_thread(lambda: [
+            operation(uploads[position][1], image_assets.encode_base64(files[uploads[position][1]]))
+            for position in chunk
+        ])
+        responses = await run_batch_mutate(customer_id, "assets:mutate", operations, True)
+        del operations
+        for position, response in zip(chunk, responses):
+            digest, index = uploads[position]
+            if response.get("resourceName"):
+                image_index.record(customer_id, digest, response["resourceName"], image_assets.asset_name(files[index]),
+                                   digests[index][1], save=False)
+                results[index].update(status="uploaded", resourceName=response["resourceName"])
+            else:
+                results[index].update(status="error", errors=response.get("errors"))
+        # a later request may fail, the images uploaded so far must not be uploaded again by the next call
+        await asyncio.to_thread(image_index.save)
+    if not uploads:
+        await asyncio.to_thread(image_index.save)
+
+    for result in results:
+        if result["status"] == "duplicate":
+            original = results[new_images[result["sha256"]]]
+            for key in ("resourceName", "errors"):
+                if key in original:
+                    result[key] = original[key]
+    return results
+
+
+@mcp.tool()
+@instrumented
+async def create_ads(
+    customer_id: str = Field(description="Customer ID"),
+    ads: List[Dict[str, Any]] = Field(description="Ads, same format as in create_ad"),
+    partial_failure: bool = True
+) -> List[Dict[str, Any]]:
+    """
+    Create many ads with as few requests as possible.
+    
+    Args:
+        customer_id: Customer ID
+        ads: Ads
+        partial_failure: Whether valid ads are created when others fail
+    
+    Returns:
+        List[Dict[str, Any]]: Resource name or errors of each ad, in input order
+    """
+
+    operations = [{"create": ad} for ad in ads]
+    return await run_batch_mutate(customer_id, "adGroupAds:mutate", operations, partial_failure)
+
+
+@mcp.tool()
+@instrumented
+async def create_ad_groups(
+    customer_id: str = Field(description="Customer ID"),
+    ad_groups: List[Dict[str, Any]] = Field(description="Ad groups, same format as in create_ad_group"),
+    partial_failure: bool = True
+) -> List[Dict[str, Any]]:
+    """
+    Create many ad groups with as few requests as possible.
+    
+    Args:
+        customer_id: Customer ID
+        ad_groups: Ad groups
+        partial_failure: Whether valid ad groups are created when others fail
+    
+    Returns:
+        List[Dict[str, Any]]: Resource name or errors of each ad group, in input order
+    """
+
+    operations = [{"create": ad_group} for ad_group in ad_groups]
+    return await run_batch_mutate(customer_id, "adGroups:mutate", operations, partial_failure)
+
+
+@mcp.tool()
+@instrumented
+async def create_campaign_budgets(
+    customer_id: str = Field(description="Customer ID"),
+    campaign_budgets: List[Dict[str, Any]] = Field(description="Campaign budgets, same format as in create_campaign_budget"),
+    partial_failure: bool = True
+) -> List[Dict[str, Any]]:
+    """
+    Create many campaign budgets with as few requests as possible.
+    
+    Args:
+        customer_id: Customer ID
+        campaign_budgets: Campaign budgets
+        partial_failure: Whether valid campaign budgets are created when others fail
+    
+    Returns:
+        List[Dict[str, Any]]: Resource name or errors of each campaign budget, in input order
+    """
+
+    operations = [{"create": campaign_budget} for campaign_budget in campaign_budgets]
+    return await run_batch_mutate(customer_id, "campaignBudgets:mutate", operations, partial_failure)
 
 
 ############## MCP tools using GAQL queries ##############
 
 @mcp.tool()
+@instrumented
 async def is_manager_account(customer_id: str = Field(description="Customer ID")) -> bool:
     """
     Check if a customer account is a manager account.
@@ -329,6 +1678,13 @@ async def is_manager_account(customer_id: str = Field(description="Customer ID")
         bool: True if the customer account is a manager account, False otherwise
     """
 
+    # the account type almost never changes, answer from the account registry when possible
+    customer_id = utils.format_customer_id(customer_id)
+    is_manager = account_registry.is_manager(customer_id)
+    if is_manager is not None:
+        logger.info(f"Customer account {customer_id} is a {'manager' if is_manager else 'client'} account (account registry)")
+        return is_manager
+
     query = """
     SELECT
         customer_client.id,
@@ -340,13 +1696,21 @@ async def is_manager_account(customer_id: str = Field(description="Customer ID")
     FROM customer_client
     """
 
-    results = await run_gaql(customer_id, query)
+    results = await run_gaql(customer_id, query, page_size=0)
 
     # if the query returns an empty list, the given customer ID is a client account
     if not results:
         logger.info(f"Customer account {customer_id} is a client account")
+        account_registry.record(customer_id, manager=False, save=False)
+        await asyncio.to_thread(account_registry.save)
         return False
     
+    # run_gaql recorded every returned account, including the given one
+    is_manager = account_registry.is_manager(customer_id)
+    if is_manager is not None:
+        logger.info(f"Customer account {customer_id} is a {'manager' if is_manager else 'client'} account")
+        return is_manager
+
     # check the manager field of the first element to determine if the given customer ID is a manager account or client account
     result = results[0].get("customerClient").get("manager")
     if result:
@@ -357,9 +1721,12 @@ async def is_manager_account(customer_id: str = Field(description="Customer ID")
 
 
 @mcp.tool()
+@instrumented
 async def list_client_accounts(manager_customer_id: str = Field(description="Manager account ID")) -> List[Dict[str, Any]]:
     """
     List all client accounts for a manager account.
+    Use get_account_hierarchy for sub-managers, levels and link status, and list_leaf_accounts for the client
+    accounts below a sub-manager.
 
     Args:
         manager_customer_id: Manager account ID
@@ -382,143 +1749,466 @@ async def list_client_accounts(manager_customer_id: str = Field(description="Man
     WHERE customer_client.manager = FALSE
     """
 
-    return await run_gaql(manager_customer_id, query)
+    return await run_gaql(manager_customer_id, query, page_size=0)
 
 
 @mcp.tool()
-async def list_campaigns(customer_id: str = Field(description="Customer account ID")) -> List[Dict[str, Any]]:
+@instrumented
+async def run_gaql_across_clients(
+    manager_customer_id: str = Field(description="Manager account ID"),
+    gaql: str = Field(description="GAQL query to run against every client account"),
+    max_concurrency: Optional[int] = None,
+    include_inactive: bool = False
+) -> Dict[str, Any]:
     """
-    List all campaigns for a customer account.
+    Run a GAQL query against all the client accounts of a manager account, several accounts at a time.
+    Each result row is tagged with the "customerId" it came from. An account that fails is reported
+    in the per-account summary and does not abort the run.
+
+    Example response:
+    {
+        "results": [
+            {"customerId": "9711179739", "campaign": {"resourceName": "customers/9711179739/campaigns/186234441837", "id": "186234441837"}}
+        ],
+        "accounts": [
+            {"customer_id": "9711179739", "descriptive_name": "test123", "row_count": 1, "elapsed_ms": 412.5, "error": null}
+        ],
+        "summary": {"accounts": 1, "succeeded": 1, "failed": 0, "rows": 1, "elapsed_ms": 415.2}
+    }
+
+    Args:
+        manager_customer_id: Manager account ID
+        gaql: GAQL query to run against every client account
+        max_concurrency: Optional number of accounts queried at the same time
+        include_inactive: Whether to also query client accounts that are not ENABLED
+    
+    Returns:
+        Dict[str, Any]: Merged results, per-account summary and totals
+    """
+
+    started = time.perf_counter()
+    # an invalid query would fail for every client account
+    await validate_gaql(None, gaql)
+    client_accounts = await list_client_accounts(manager_customer_id)
+    clients = [
+        client_account["customerClient"]
+        for client_account in client_accounts
+        if include_inactive or client_account["customerClient"].get("status") == "ENABLED"
+    ]
+    logger.info(f"Running GAQL across {len(clients)} client accounts of manager account: {manager_customer_id}")
+
+    semaphore = asyncio.Semaphore(max_concurrency or GOOGLE_ADS_FANOUT_CONCURRENCY)
+
+    async def run_for_client(client: Dict[str, Any]) -> Dict[str, Any]:
+        client_id = str(client["id"])
+        summary = {"customer_id": client_id, "descriptive_name": client.get("descriptiveName"), "row_count": 0, "elapsed_ms": 0.0, "error": None}
+        async with semaphore:
+            client_started = time.perf_counter()
+            try:
+                rows = await asyncio.wait_for(run_gaql(client_id, gaql, page_size=0), GOOGLE_ADS_FANOUT_TIMEOUT)
+                # rows may be shared with the result cache, tag copies
+                summary["rows"] = [{"customerId": client_id, **row} for row in rows]
+                summary["row_count"] = len(rows)
+            except Exception as e:
+                logger.warning(f"GAQL failed for client account {client_id}: {e!r}")
+                summary["error"] = str(e) or repr(e)
+            summary["elapsed_ms"] = round((time.perf_counter() - client_started) * 1000, 1)
+        return summary
+
+    with scheduler.lane(scheduler.BULK):
+        summaries = await asyncio.gather(*[run_for_client(client) for client in clients])
+
+    results = []
+    for summary in summaries:
+        results.extend(summary.pop("rows", []))
+
+    failed = sum(1 for summary in summaries if summary["error"])
+    return {
+        "results": results,
+        "accounts": summaries,
+        "summary": {
+            "accounts": len(summaries),
+            "succeeded": len(summaries) - failed,
+            "failed": failed,
+            "rows": len(results),
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+        },
+    }
+
+
+async def get_account_tree(manager_customer_id: Optional[str] = None, refresh: bool = False) -> hierarchy.AccountTree:
+    """
+    Return the account tree below a manager account, the login customer by default. The tree is built once and
+    reused for GOOGLE_ADS_HIERARCHY_TTL seconds; concurrent calls for the same manager share one walk.
+    """
+    root_id = utils.format_customer_id(manager_customer_id or GOOGLE_ADS_LOGIN_CUSTOMER_ID or "")
+    if not root_id:
+        raise ValueError("Pass manager_customer_id, GOOGLE_ADS_LOGIN_CUSTOMER_ID is not set")
+
+    async def fetch(customer_id: str, gaql: str) -> List[Dict[str, Any]]:
+        # the tree is the cache, a rebuild reads the current links
+        return await run_gaql(customer_id, gaql, use_cache=False, page_size=0)
+
+    lock = _account_tree_locks.setdefault(root_id, asyncio.Lock())
+    async with lock:
+        tree = account_trees.get(root_id)
+        if refresh or tree is None or time.time() - tree.built_at > GOOGLE_ADS_HIERARCHY_TTL:
+            started = time.perf_counter()
+            tree = await hierarchy.build_tree(root_id, fetch, GOOGLE_ADS_HIERARCHY_CONCURRENCY)
+            elapsed = time.perf_counter() - started
+            metrics_registry.observe("hierarchy_build_seconds", elapsed)
+            logger.info(f"Walked the hierarchy of {root_id}: {len(tree.nodes)} accounts in {elapsed:.1f}s")
+            account_trees[root_id] = tree
+    return tree
+
+
+@mcp.tool()
+@instrumented
+async def get_account_hierarchy(
+    manager_customer_id: Optional[str] = None,
+    max_depth: Optional[int] = None,
+    refresh: bool = False
+) -> Dict[str, Any]:
+    """
+    Return the complete account hierarchy below a manager account: sub-managers, client accounts and their levels,
+    including links that are not active (pending invitations, refused, canceled or inactive links).
+    The hierarchy is walked one level at a time, listing all the managers of a level at the same time, and kept
+    for an hour, so that list_leaf_accounts and get_account_path answer instantly afterwards.
+
+    Example response:
+    {
+        "tree": {"customer_id": "1234567890", "name": "Agency", "manager": true, "status": "ENABLED", "link_status": null,
+                 "depth": 0, ..., "children": [
+                     {"customer_id": "9711179739", "name": "test123", "manager": false, "link_status": "ACTIVE",
+                      "depth": 1, ..., "children": []}]},
+        "summary": {"root": "1234567890", "accounts": 2, "managers": 1, "clients": 1, "inactive_links": 0,
+                    "depth": 1, "built_at": 1760700000.0, "age_seconds": 12.5, "errors": {}}
+    }
+
+    Args:
+        manager_customer_id: Manager account ID, the login customer ID by default
+        max_depth: Optional number of levels returned below the manager, deeper accounts are only counted
+        refresh: Whether to walk the hierarchy again instead of using the cached tree
+
+    Returns:
+        Dict[str, Any]: Nested tree and summary. Managers whose accounts could not be listed are in summary.errors
+    """
+    tree = await get_account_tree(manager_customer_id, refresh)
+    return {"tree": tree.to_dict(max_depth=max_depth), "summary": tree.summary()}
+
+
+@mcp.tool()
+@instrumented
+async def list_leaf_accounts(
+    customer_id: Optional[str] = None,
+    manager_customer_id: Optional[str] = None,
+    status: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    List the client (non-manager) accounts anywhere below an account of the hierarchy, through sub-managers,
+    from the cached account hierarchy (see get_account_hierarchy). Each account is listed once.
+
+    Args:
+        customer_id: Account to list below, the manager account by default
+        manager_customer_id: Root manager account of the hierarchy, the login customer ID by default
+        status: Optional account status, e.g. "ENABLED"
+
+    Returns:
+        Dict[str, Any]: {"accounts": [{"customer_id": ..., "name": ..., "status": ..., "depth": ..., ...}],
+                         "count": n, "age_seconds": age of the cached hierarchy}
+    """
+    tree = await get_account_tree(manager_customer_id)
+    accounts = tree.leaves(utils.format_customer_id(customer_id) if customer_id else None)
+    if status:
+        accounts = [account for account in accounts if account.status == status.upper()]
+    return {"accounts": [account.to_dict() for account in accounts], "count": len(accounts),
+            "age_seconds": round(time.time() - tree.built_at, 1)}
+
+
+@mcp.tool()
+@instrumented
+async def get_account_path(
+    customer_id: str = Field(description="Customer ID"),
+    manager_customer_id: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Return the chain of accounts from the root manager down to an account, from the cached account hierarchy
+    (see get_account_hierarchy). An account linked to several managers is reached through the one closest to the root.
+
+    Args:
+        customer_id: Customer ID
+        manager_customer_id: Root manager account of the hierarchy, the login customer ID by default
+
+    Returns:
+        Dict[str, Any]: {"path": [<root>, ..., <account>], "age_seconds": age of the cached hierarchy}
+    """
+    tree = await get_account_tree(manager_customer_id)
+    path = tree.path(utils.format_customer_id(customer_id))
+    return {"path": [account.to_dict() for account in path], "age_seconds": round(time.time() - tree.built_at, 1)}
+
+
+@mcp.tool()
+@instrumented
+async def list_campaigns(
+    customer_id: str = Field(description="Customer account ID"),
+    include_metrics: bool = True,
+    status: Optional[str] = None,
+    name_contains: Optional[str] = None,
+    limit: Optional[int] = None,
+    offset: int = 0
+) -> List[Dict[str, Any]]:
+    """
+    List campaigns for a customer account, newest first, with their budget.
+    Client accounts include all-time metrics unless include_metrics is False. Without metrics the campaigns
+    are read from the local mirror when it is enabled.
 
     Args:
         customer_id: Customer account ID
+        include_metrics: Whether to include impressions, clicks, cost, conversions, CTR and average CPC
+        status: Optional status to filter on, e.g. ENABLED or PAUSED
+        name_contains: Optional text the campaign name contains
+        limit: Optional maximum number of campaigns
+        offset: Number of campaigns to skip, for paging
     
     Returns:
-        str: List of campaigns
+        List[Dict[str, Any]]: List of campaigns
     """
 
-    # first check if the account is a manager account or a client account
+    if not include_metrics:
+        return (await list_entity_rows(customer_id, "campaign", None, status, name_contains, limit, offset))["results"]
+
+    # first check if the account is a manager account or a client account, manager accounts have no metrics
     is_manager = await is_manager_account(customer_id)
-    if is_manager:
-        logger.info(f"Listing campaigns for manager account: {customer_id}")
-        query = """
-        SELECT
-            campaign.id,
-            campaign.name,
-            campaign.status,
-            campaign.start_date,
-            campaign.end_date,
-            campaign.bidding_strategy_type,
-            campaign.advertising_channel_type,
-            campaign_budget.amount_micros
-        FROM campaign
-        ORDER BY campaign.start_date DESC
-        """
-    else:
-        logger.info(f"Listing campaigns for client account: {customer_id}")
-        query = """
-        SELECT
-            campaign.id,
-            campaign.name,
-            campaign.status,
-            campaign.start_date,
-            campaign.end_date,
-            campaign.bidding_strategy_type,
-            campaign.advertising_channel_type,
-            campaign_budget.amount_micros,
-            metrics.impressions,
-            metrics.clicks,
-            metrics.cost_micros,
-            metrics.conversions,
-            metrics.ctr,
-            metrics.average_cpc
-        FROM campaign
-        ORDER BY campaign.start_date DESC
-        """
-
-    return await run_gaql(customer_id, query)
+    logger.info(f"Listing campaigns for {'manager' if is_manager else 'client'} account: {customer_id}")
+    metrics_fields = () if is_manager else (
+        "metrics.impressions",
+        "metrics.clicks",
+        "metrics.cost_micros",
+        "metrics.conversions",
+        "metrics.ctr",
+        "metrics.average_cpc",
+    )
+    entity = mirror.ENTITIES["campaign"]
+    query = mirror.entity_query(entity, mirror.filter_conditions(entity, None, status, name_contains),
+                                None if limit is None else offset + limit, metrics_fields)
+    results = await run_gaql(customer_id, query, page_size=0)
+    return results[offset:] if limit is None else results[offset:offset + limit]
 
 
 @mcp.tool()
+@instrumented
 async def list_ad_groups(
     customer_id: str = Field(description="Customer account ID"),
-    campaign_id: Optional[str] = None
+    campaign_id: Optional[str] = None,
+    status: Optional[str] = None,
+    name_contains: Optional[str] = None,
+    limit: Optional[int] = None,
+    offset: int = 0
 ) -> List[Dict[str, Any]]:
     """
-    List ad groups for a customer account, optionally filtered by campaign ID.
+    List ad groups for a customer account, optionally filtered by campaign ID, status and name.
+    Read from the local mirror when it is enabled.
     
     Args:
         customer_id: Customer account ID
         campaign_id: Optional campaign ID to filter ad groups
+        status: Optional status to filter on, e.g. ENABLED or PAUSED
+        name_contains: Optional text the ad group name contains
+        limit: Optional maximum number of ad groups
+        offset: Number of ad groups to skip, for paging
     
     Returns:
         List[Dict[str, Any]]: List of ad groups
     """
-    if campaign_id:
-        logger.info(f"Listing ad groups for campaign: {campaign_id}, customer: {customer_id}")
-        query = f"""
-        SELECT
-            ad_group.id,
-            ad_group.name,
-            ad_group.status
-        FROM ad_group
-        WHERE campaign.id = '{campaign_id}'
-        """
-    else:
-        logger.info(f"Listing all the ad groups for customer: {customer_id}")
-        query = """
-        SELECT
-            ad_group.id,
-            ad_group.name,
-            ad_group.status
-        FROM ad_group
-        """
-        
-    return await run_gaql(customer_id, query)
+    logger.info(f"Listing ad groups for customer: {customer_id}" + (f", campaign: {campaign_id}" if campaign_id else ""))
+    return (await list_entity_rows(customer_id, "ad_group", campaign_id, status, name_contains, limit, offset))["results"]
 
 
 @mcp.tool()
+@instrumented
 async def list_ads(
     customer_id: str = Field(description="Customer account ID"),
-    ad_group_id: Optional[str] = None
+    ad_group_id: Optional[str] = None,
+    status: Optional[str] = None,
+    name_contains: Optional[str] = None,
+    limit: Optional[int] = None,
+    offset: int = 0
 ) -> List[Dict[str, Any]]:
     """
-    List ads for a customer account, optionally filtered by ad group ID.
+    List ads for a customer account, optionally filtered by ad group ID, status and name.
+    Read from the local mirror when it is enabled.
     
     Args:
         customer_id: Customer account ID
         ad_group_id: Optional ad group ID to filter ads
+        status: Optional status to filter on, e.g. ENABLED or PAUSED
+        name_contains: Optional text the ad name contains
+        limit: Optional maximum number of ads
+        offset: Number of ads to skip, for paging
     
     Returns:
         List[Dict[str, Any]]: List of ads
     """
-    if ad_group_id:
-        logger.info(f"Listing ads for ad group: {ad_group_id}, customer: {customer_id}")
-        query = f"""
-        SELECT
-            ad_group_ad.ad.id,
-            ad_group_ad.ad.final_urls
-        FROM ad_group_ad
-        WHERE ad_group.id = '{ad_group_id}'
-        """
-    else:
-        logger.info(f"Listing all the ads for customer: {customer_id}")
-        query = """
-        SELECT
-            ad_group_ad.ad.id,
-            ad_group_ad.ad.final_urls
-        FROM ad_group_ad
-        """
-    
-    return await run_gaql(customer_id, query)
+    logger.info(f"Listing ads for customer: {customer_id}" + (f", ad group: {ad_group_id}" if ad_group_id else ""))
+    return (await list_entity_rows(customer_id, "ad_group_ad", ad_group_id, status, name_contains, limit, offset))["results"]
+
+
+@mcp.tool()
+@instrumented
+async def list_entities(
+    customer_id: str = Field(description="Customer account ID"),
+    entity: Literal["campaign", "ad_group", "ad_group_ad", "campaign_budget", "asset"] = Field(description="Entity type"),
+    parent_id: Optional[str] = None,
+    status: Optional[str] = None,
+    name_contains: Optional[str] = None,
+    limit: int = 100,
+    offset: int = 0
+) -> Dict[str, Any]:
+    """
+    List one page of the campaigns, ad groups, ads, campaign budgets or assets of an account.
+    With the local mirror enabled, pages are read from it in milliseconds, and the response tells
+    when the account was last synced with the API.
+
+    Example response:
+    {
+        "results": [{"adGroup": {"resourceName": "customers/1234567890/adGroups/111", "id": "111", "name": "Shoes", "status": "ENABLED", "type": "SEARCH_STANDARD"}, "campaign": {"id": "222"}}],
+        "total": 5230,
+        "source": "mirror",
+        "synced_at": "2026-10-17T09:12:44+00:00",
+        "age_seconds": 42.5
+    }
+
+    Args:
+        customer_id: Customer account ID
+        entity: Entity type
+        parent_id: Optional campaign ID for ad groups, ad group ID for ads
+        status: Optional status to filter on, e.g. ENABLED or PAUSED
+        name_contains: Optional text the name contains
+        limit: Maximum number of rows
+        offset: Number of rows to skip, for paging
+
+    Returns:
+        Dict[str, Any]: Rows, total number of matching rows (null when read from the API with a limit) and freshness
+    """
+    return await list_entity_rows(customer_id, entity, parent_id, status, name_contains, limit, offset)
+
+
+@mcp.tool()
+@instrumented
+async def sync_mirror(
+    customer_id: str = Field(description="Customer account ID"),
+    full: bool = False
+) -> Dict[str, Any]:
+    """
+    Bring the local mirror of an account up to date now: the first sync copies every campaign, ad group, ad,
+    campaign budget and asset, later ones only fetch what changed according to change_event.
+    Reads sync on their own when the last sync is a few minutes old, use this after changes made elsewhere.
+
+    Args:
+        customer_id: Customer account ID
+        full: Whether to copy everything again rather than only the changes
+
+    Returns:
+        Dict[str, Any]: Sync mode ("full" or "incremental"), rows written and sync time
+    """
+    if not GOOGLE_ADS_MIRROR:
+        raise ValueError("The mirror is disabled, set GOOGLE_ADS_MIRROR=true to enable it")
+    return await sync_mirror_customer(customer_id, full)
 
 
 ############## Other MCP Resources and Prompts ##############
 
-@mcp.resource("gaql://reference")
-def gaql_reference() -> str:
-    """Google Ads Query Language (GAQL) reference documentation."""
-    return """
+@mcp.resource("stats://cache")
+def cache_stats() -> str:
+    """GAQL result cache hit/miss statistics, and how many queries joined an identical running query."""
+    return json.dumps({**query_cache.stats(), "coalescing": gaql_flights.stats()}, indent=2)
+
+@mcp.resource("accounts://registry")
+def account_registry_contents() -> str:
+    """Known accounts with their manager flag, currency, time zone and descriptive name."""
+    return json.dumps(account_registry.to_dict(), indent=2)
+
+@mcp.resource("mirror://status")
+def mirror_status() -> str:
+    """Last full and incremental sync, change cursor and row counts of every account in the local mirror."""
+    if not GOOGLE_ADS_MIRROR:
+        return json.dumps({"enabled": False})
+    return json.dumps({"enabled": True, "max_staleness_seconds": GOOGLE_ADS_MIRROR_MAX_STALENESS,
+                       "customers": entity_mirror.stats()}, indent=2)
+
+@mcp.resource("stats://history")
+def history_stats() -> str:
+    """Queries, days and rows of each account in the on-disk store of historical metrics."""
+    if not GOOGLE_ADS_HISTORY:
+        return json.dumps({"enabled": False})
+    return json.dumps({"enabled": True, "mutable_days": GOOGLE_ADS_HISTORY_MUTABLE_DAYS,
+                       "customers": metrics_history.stats()}, indent=2)
+
+@mcp.resource("stats://results")
+def result_pages_stats() -> str:
+    """Large query results kept for paging: number, size on disk, pages read and results evicted."""
+    return json.dumps({"page_size": GOOGLE_ADS_RESULT_PAGE_SIZE, **result_store.stats()}, indent=2)
+
+@mcp.resource("accounts://hierarchy")
+def account_hierarchy_summary() -> str:
+    """Summary of the cached account hierarchy of every manager account walked so far."""
+    return json.dumps({root_id: tree.summary() for root_id, tree in account_trees.items()}, indent=2)
+
+@mcp.resource("stats://image-assets")
+def image_index_stats() -> str:
+    """Number of indexed image assets per account, with and without a known content hash."""
+    return json.dumps(image_index.stats(), indent=2)
+
+@mcp.resource("stats://scheduler")
+def scheduler_stats() -> str:
+    """Request scheduler queue depth and wait-time metrics per priority lane."""
+    return json.dumps(request_scheduler.stats(), indent=2)
+
+@mcp.resource("stats://retries")
+def retry_stats() -> str:
+    """Retry budget and counters of automatically retried requests."""
+    return json.dumps(retry_policy.stats(), indent=2)
+
+@mcp.resource("stats://credentials")
+def credentials_stats() -> str:
+    """Access token cache hit and refresh counters."""
+    return json.dumps(credential_manager.stats(), indent=2)
+
+
+@mcp.resource("stats://metrics")
+def metrics_snapshot() -> str:
+    """Latency histograms, in-flight gauges, bytes, rows and error counters of tool calls and API requests."""
+    return json.dumps(metrics_registry.snapshot(), indent=2)
+
+
+@mcp.resource("metrics://prometheus")
+def metrics_prometheus() -> str:
+    """The same metrics in the Prometheus text exposition format."""
+    return metrics_registry.prometheus_text()
+
+
+@mcp.resource("stats://traces")
+def recent_traces() -> str:
+    """Latest tool calls with the API requests each of them made, newest first."""
+    return json.dumps(tracer.recent(), indent=2)
+
+
+@mcp.resource("stats://gaql-fields")
+def field_catalog_stats() -> str:
+    """Size and age of the GAQL field catalog used to validate queries."""
+    return json.dumps(field_catalog.stats(), indent=2)
+
+
+@mcp.resource("gaql://fields/{resource}")
+async def gaql_resource_fields(resource: str) -> str:
+    """Fields that can be selected, filtered and sorted with FROM the given resource, from the GAQL field catalog."""
+    await ensure_field_catalog(wait=True)
+    if not field_catalog.is_loaded():
+        return "The GAQL field catalog could not be downloaded, see the server log."
+    return field_catalog.describe_resource(resource.lower())
+
+
+GAQL_REFERENCE = """
     # Google Ads Query Language (GAQL) Reference
     
     GAQL is similar to SQL but with specific syntax for Google Ads. Here's a quick reference:
@@ -559,6 +2249,7 @@ def gaql_reference() -> str:
     - WHERE segments.date DURING LAST_7_DAYS
     - WHERE segments.date DURING LAST_30_DAYS
     - WHERE segments.date BETWEEN '2023-01-01' AND '2023-01-31'
+    - For daily data over many months, use run_gaql_report, which splits the BETWEEN window into monthly queries
     
     ### Filtering
     - WHERE campaign.status = 'ENABLED'
@@ -569,8 +2260,23 @@ def gaql_reference() -> str:
     - Always check account currency before analyzing cost data
     - Cost values are in micros (millionths): 1000000 = 1 unit of currency
     - Use LIMIT to avoid large result sets
+    - Large results come back one page at a time with a next_cursor, read the following pages with fetch_result_page
     """
 
+
+@mcp.resource("gaql://reference")
+async def gaql_reference() -> str:
+    """Google Ads Query Language (GAQL) reference documentation."""
+    await ensure_field_catalog(wait=True)
+    resources = field_catalog.resources()
+    catalog_section = f"""
+    ## Resources ({API_VERSION})
+    Read gaql://fields/{{resource}} for the attributes, segments and metrics available with a resource.
+
+    {", ".join(resources)}
+    """ if resources else ""
+    return GAQL_REFERENCE + catalog_section
+
 @mcp.prompt("google_ads_workflow")
 def google_ads_workflow() -> str:
     """Provides guidance on the recommended workflow for using Google Ads tools."""
@@ -589,7 +2295,7 @@ def google_ads_workflow() -> str:
        - For ad creative review: `get_ad_creatives(customer_id="ACCOUNT_ID")`
     
     4. For custom queries, use the GAQL query tool:
-       - `run_gaql(customer_id="ACCOUNT_ID", query="YOUR_QUERY", format="table")`
+       - `run_gaql(customer_id="ACCOUNT_ID", gaql="YOUR_QUERY", format="table")`
     
     5. Let me know if you have specific questions about:
        - Campaign performance
@@ -657,16 +2363,168 @@ def gaql_help() -> str:
     
     Once you've chosen a query, use it with:
     ```
-    run_gaql(customer_id="YOUR_ACCOUNT_ID", query="YOUR_QUERY_HERE")
+    run_gaql(customer_id="YOUR_ACCOUNT_ID", gaql="YOUR_QUERY_HERE", format="table")
     ```
     
     Remember:
     - Always provide the customer_id as a string
-    - Cost values are in micros (1,000,000 = 1 unit of currency)
+    - Cost values are in micros (1,000,000 = 1 unit of currency), pass micros_to_currency=True to convert them
     - Use LIMIT to avoid large result sets
     - Check the account currency before analyzing cost data
     """
 
 
+############## Startup ##############
+
+def start_warm_up() -> threading.Thread:
+    """
+    Do the one-time work of the first tool call in a daemon thread while the server answers the MCP handshake:
+    read the field catalog and account registry, import google-auth, load the key file and fetch an access token.
+    A failure is logged, the first tool call then tries again and reports the error.
+    """
+
+    def warm_up() -> None:
+        started = time.perf_counter()
+        field_catalog.load()
+        account_registry.load()
+        try:
+            credential_manager.get_headers_blocking()
+        except Exception as e:
+            logger.warning(f"Warm-up could not get an access token: {e}")
+        logger.info(f"Warm-up done in {(time.perf_counter() - started) * 1000:.0f}ms")
+
+    thread = threading.Thread(target=warm_up, name="google-ads-warm-up", daemon=True)
+    thread.start()
+    return thread
+
+
+############## HTTP Transports ##############
+
+@mcp.custom_route("/healthz", methods=["GET"])
+async def health(request: Request) -> Response:
+    """Liveness of an HTTP server, for load balancers."""
+    return JSONResponse(
+        {"status": "draining" if _draining else "ok", "running_tool_calls": _running_tool_calls},
+        status_code=503 if _draining else 200,
+    )
+
+
+@mcp.custom_route("/metrics", methods=["GET"])
+async def prometheus_metrics(request: Request) -> Response:
+    """Metrics of this worker process in the Prometheus text format."""
+    return PlainTextResponse(metrics_registry.prometheus_text(), media_type="text/plain; version=0.0.4")
+
+
+async def drain_tool_calls(timeout: float) -> None:
+    """
+    Refuse new tool calls, wait up to `timeout` seconds for the running ones to finish, then end the SSE streams still open.
+    """
+    from sse_starlette.sse import AppStatus
+
+    global _draining
+    _draining = True
+    deadline = time.monotonic() + timeout
+    if _running_tool_calls:
+        logger.info(f"Waiting for {_running_tool_calls} running tool calls to finish")
+    while _running_tool_calls and time.monotonic() < deadline:
+        await asyncio.sleep(0.1)
+    if _running_tool_calls:
+        logger.warning(f"Shutting down with {_running_tool_calls} tool calls still running")
+    # e.g. the notification streams of idle sessions, which would otherwise hold the server until the uvicorn timeout
+    AppStatus.should_exit = True
+
+
+def create_app(transport: Optional[str] = None, stateless: Optional[bool] = None) -> Starlette:
+    """
+    Build the ASGI app of an HTTP transport. Concurrent sessions share the credentials, connection pool and caches of the process.
+    Also serves as the uvicorn factory of worker processes, e.g. `uvicorn server:create_app --factory --workers 4`,
+    which read their settings from the GOOGLE_ADS_MCP_* environment variables.
+
+    Args:
+        transport: "streamable-http" or "sse", defaults to GOOGLE_ADS_MCP_TRANSPORT
+        stateless: Whether each request is independent of the previous ones, defaults to GOOGLE_ADS_MCP_STATELESS
+
+    Returns:
+        Starlette: The app, which drains running tool calls on shutdown
+    """
+    from sse_starlette.sse import AppStatus
+
+    # by default SSE responses end as soon as the server is told to stop, cutting off the results of running tool calls
+    AppStatus.disable_automatic_graceful_drain()
+
+    if GOOGLE_ADS_WARMUP:
+        start_warm_up()
+
+    transport = transport or GOOGLE_ADS_MCP_TRANSPORT
+    mcp.settings.stateless_http = GOOGLE_ADS_MCP_STATELESS if stateless is None else stateless
+    app = mcp.sse_app() if transport == "sse" else mcp.streamable_http_app()
+    lifespan = app.router.lifespan_context
+
+    @contextlib.asynccontextmanager
+    async def draining_lifespan(app: Starlette) -> AsyncIterator[None]:
+        async with lifespan(app):
+            try:
+                yield
+            finally:
+                # before the session manager cancels the sessions, whose tasks run the tool calls
+                await drain_tool_calls(GOOGLE_ADS_SHUTDOWN_TIMEOUT)
+                await http_pool.aclose()
+
+    app.router.lifespan_context = draining_lifespan
+    return app
+
+
+def serve_http(transport: str, host: str, port: int, workers: int, stateless: bool) -> None:
+    """
+    Run an HTTP transport with uvicorn until SIGINT or SIGTERM, then stop accepting connections and drain running calls.
+    """
+    import uvicorn
+
+    stateless = stateless or workers > 1
+    # log_config=None: uvicorn records go through the logging pipeline like all others
+    options = {"host": host, "port": port, "timeout_graceful_shutdown": int(GOOGLE_ADS_SHUTDOWN_TIMEOUT), "log_config": None}
+    if workers == 1:
+        class DrainingServer(uvicorn.Server):
+            # start draining when the signal arrives, uvicorn only runs the app shutdown once all connections closed
+            def handle_exit(self, sig: int, frame: Any) -> None:
+                super().handle_exit(sig, frame)
+                if not _draining:
+                    self.drain = asyncio.ensure_future(drain_tool_calls(GOOGLE_ADS_SHUTDOWN_TIMEOUT), loop=self.loop)
+
+            async def serve(self, *args: Any, **kwargs: Any) -> None:
+                self.loop = asyncio.get_running_loop()
+                await super().serve(*args, **kwargs)
+
+        DrainingServer(uvicorn.Config(create_app(transport, stateless), **options)).run()
+        return
+
+    # worker processes import this module again and read their settings from the environment
+    os.environ["GOOGLE_ADS_MCP_TRANSPORT"] = transport
+    os.environ["GOOGLE_ADS_MCP_STATELESS"] = "true"
+    uvicorn.run("server:create_app", factory=True, workers=workers,
+                app_dir=os.path.dirname(os.path.abspath(__file__)), **options)
+
+
 if __name__ == "__main__":
-    mcp.run(transport="stdio")
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Google Ads MCP server")
+    parser.add_argument("--transport", choices=TRANSPORTS, default=GOOGLE_ADS_MCP_TRANSPORT)
+    parser.add_argument("--host", default=GOOGLE_ADS_MCP_HOST, help="interface of the HTTP transports")
+    parser.add_argument("--port", type=int, default=GOOGLE_ADS_MCP_PORT, help="port of the HTTP transports")
+    parser.add_argument("--workers", type=int, default=GOOGLE_ADS_MCP_WORKERS,
+                        help="worker processes of the streamable-http transport, implies --stateless when more than 1")
+    parser.add_argument("--stateless", action="store_true", default=GOOGLE_ADS_MCP_STATELESS,
+                        help="keep no session state between requests, so that any worker can serve any request")
+    args = parser.parse_args()
+    if args.transport not in TRANSPORTS:
+        parser.error(f"invalid transport '{args.transport}', expected one of {', '.join(TRANSPORTS)}")
+    if args.transport == "sse" and args.workers > 1:
+        parser.error("the sse transport keeps sessions in memory and cannot run on several workers, use streamable-http")
+
+    if args.transport == "stdio":
+        if GOOGLE_ADS_WARMUP:
+            start_warm_up()
+        if GOOGLE_ADS_METRICS_PORT:
+            metrics.serve_prometheus(metrics_registry, GOOGLE_ADS_METRICS_PORT)
+        mcp.run(transport="stdio")
+    else:
+        serve_http(args.transport, args.host, args.port, args.workers, args.stateless)
\ No newline at end of file
@@ -0,0 +1,145 @@
+import dataclasses
+import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import gaql as gaql_parser
+from result_format import field_path
+
+SHARD_PERIODS = ("month", "week", "day")
+
+DATE_FIELD = "segments.date"
+
+
+@dataclasses.dataclass
+class Shard:
+    """
+    One date range of a sharded report: the query restricted to [start, end].
+    """
+    start: datetime.date
+    end: datetime.date
+    query: str
+
+
+def _date(value: str) -> Optional[datetime.date]:
+    try:
+        return datetime.date.fromisoformat(value.strip("'\""))
+    except ValueError:
+        return None
+
+
+def date_window(query: gaql_parser.Query) -> Optional[Tuple[datetime.date, datetime.date]]:
+    """
+    Return the first and last day the segments.date conditions of a query allow, or None unless
+    they set both with literal dates, e.g. BETWEEN '2024-01-01' AND '2024-12-31' or a >= and <= pair.
+    """
+    start: Optional[datetime.date] = None
+    end: Optional[datetime.date] = None
+    for condition in query.conditions:
+        if condition.field != DATE_FIELD:
+            continue
+        dates = [_date(value) for value in condition.values]
+        if not dates or None in dates:
+            return None
+        if condition.operator == "BETWEEN":
+            low, high = dates
+        elif condition.operator in (">=", ">"):
+            low, high = dates[0] + datetime.timedelta(days=condition.operator == ">"), None
+        elif condition.operator in ("<=", "<"):
+            low, high = None, dates[0] - datetime.timedelta(days=condition.operator == "<")
+        else:
+            # =, IN and DURING are short or not contiguous
+            return None
+        if low is not None:
+            start = low if start is None else max(start, low)
+        if high is not None:
+            end = high if end is None else min(end, high)
+    if start is None or end is None or start > end:
+        return None
+    return start, end
+
+
+def split_window(start: datetime.date, end: datetime.date, period: str) -> List[Tuple[datetime.date, datetime.date]]:
+    """
+    Split [start, end] at calendar month, ISO week (Monday) or day boundaries.
+    """
+    if period not in SHARD_PERIODS:
+        raise ValueError(f"Invalid shard period '{period}', expected one of {', '.join(SHARD_PERIODS)}")
+    ranges = []
+    current = start
+    while current <= end:
+        if period == "month":
+            following = (current.replace(day=1) + datetime.timedelta(days=32)).replace(day=1)
+        elif period == "week":
+            following = current + datetime.timedelta(days=7 - current.weekday())
+        else:
+            following = current + datetime.timedelta(days=1)
+        last = min(end, following - datetime.timedelta(days=1))
+        ranges.append((current, last))
+        current = last + datetime.timedelta(days=1)
+    return ranges
+
+
+def plan_shards(gaql: str, period: str = "month") -> List[Shard]:
+    """
+    Split a GAQL query selecting segments.date with a literal window on it into one query per period, in date order.
+    Any other query is a single shard, run as is: without segments.date in the rows, the metrics of a shard
+    would be partial totals that cannot be told apart or sorted against each other.
+    """
+    query = gaql_parser.parse(gaql)
+    window = date_window(query) if DATE_FIELD in query.fields else None
+    if window is None:
+        return [Shard(datetime.date.min, datetime.date.max, gaql)]
+
+    return [Shard(start, end, with_date_range(query, start, end)) for start, end in split_window(window[0], window[1], period)]
+
+
+def with_date_range(query: gaql_parser.Query, start: datetime.date, end: datetime.date) -> str:
+    """
+    Return the GAQL text of a query with its segments.date conditions replaced by BETWEEN start AND end.
+    """
+    condition = gaql_parser.Condition(DATE_FIELD, "BETWEEN", [f"'{start.isoformat()}'", f"'{end.isoformat()}'"])
+    others = [condition for condition in query.conditions if condition.field != DATE_FIELD]
+    return gaql_parser.format_query(dataclasses.replace(query, conditions=[condition] + others))
+
+
+def _sort_value(value: Any) -> Tuple[bool, int, Any]:
+    # numbers before text, int64 values being strings in the REST encoding
+    if value is None:
+        return True, 0, 0
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return False, 0, value
+    try:
+        return False, 0, float(value)
+    except (TypeError, ValueError):
+        return False, 1, str(value)
+
+
+def merge_shards(gaql: str, shard_rows: List[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """
+    Merge the rows of the shards of a query, given in date order, into the order and LIMIT of the query.
+    Rows of a query ordered by segments.date, or not ordered, are concatenated; otherwise they are sorted again.
+    """
+    query = gaql_parser.parse(gaql)
+    ordering = query.ordering
+    if ordering and ordering[0].field == DATE_FIELD and ordering[0].descending:
+        shard_rows = shard_rows[::-1]
+    rows = [row for rows in shard_rows for row in rows]
+
+    if ordering and ordering[0].field != DATE_FIELD and len(shard_rows) > 1:
+        for order in reversed(ordering):
+            path = field_path(order.field)
+
+            def key(row: Dict[str, Any], path: List[str] = path) -> Tuple[bool, int, Any]:
+                value: Any = row
+                for name in path:
+                    value = value.get(name) if isinstance(value, dict) else None
+                return _sort_value(value)
+
+            # missing values last in both directions
+            present = [row for row in rows if not key(row)[0]]
+            missing = [row for row in rows if key(row)[0]]
+            rows = sorted(present, key=key, reverse=order.descending) + missing
+
+    if query.limit is not None:
+        rows = rows[:query.limit]
+    return rows
@@ -0,0 +1,170 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# modules only the first tool call needs, importing any of them at startup is a regression
+DEFERRED_MODULES = ("google.auth", "google.oauth2", "requests", "urllib3", "cryptography", "opentelemetry", "http.server")
+
+# settings the server reads at import, none of them is used before the first tool call
+ENV = {
+    "GOOGLE_ADS_CREDENTIALS_PATH": os.path.join(HERE, "service_account_key.json"),
+    "GOOGLE_ADS_DEVELOPER_TOKEN": "startup-benchmark",
+    "GOOGLE_ADS_LOGIN_CUSTOMER_ID": "1000000000",
+    "GOOGLE_ADS_WARMUP": "false",
+}
+
+
+def _env() -> Dict[str, str]:
+    return {**os.environ, **ENV}
+
+
+def parse_importtime(output: str) -> Dict[str, Any]:
+    """
+    Parse the stderr of `python -X importtime`.
+
+    Returns:
+        Dict[str, Any]: "total_us", the cumulative time of the top-level imports, and "packages",
+                        the self time in microseconds per top-level package, slowest first
+    """
+    total = 0
+    packages: Dict[str, int] = {}
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue
+        self_us, cumulative_us, name = int(parts[0]), int(parts[1]), parts[2]
+        if not name.startswith("  "):
+            total += cumulative_us
+        package = name.strip().split(".")[0]
+        packages[package] = packages.get(package, 0) + self_us
+    return {"total_us": total, "packages": dict(sorted(packages.items(), key=lambda item: -item[1]))}
+
+
+def import_profile(module: str = "server") -> Dict[str, Any]:
+    """
+    Import a module in a fresh interpreter under -X importtime.
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], cwd=HERE, env=_env(),
+                            capture_output=True, text=True, check=True)
+    return parse_importtime(result.stderr)
+
+
+def eager_deferred_modules(module: str = "server") -> List[str]:
+    """
+    Return the deferred modules that importing `module` loads, which should be none.
+    """
+    code = (f"import sys, {module}; print('\\n'.join(sorted(name for name in sys.modules "
+            f"if name.startswith({DEFERRED_MODULES!r}))))")
+    result = subprocess.run([sys.executable, "-c", code], cwd=HERE, env=_env(), capture_output=True, text=True, check=True)
+    return [name for name in result.stdout.splitlines()
+            if any(name == deferred or name.startswith(deferred + ".") for deferred in DEFERRED_MODULES)]
+
+
+def _interpreter_start() -> float:
+    started = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "pass"], check=True)
+    return time.perf_counter() - started
+
+
+def stdio_startup() -> Dict[str, float]:
+    """
+    Start `server.py` over stdio like an MCP client does and time its first answers.
+
+    Returns:
+        Dict[str, float]: Seconds from process start to the initialize response and to the tools/list response
+    """
+    messages = [
+        {"jsonrpc": "2.0", "id": 1, "method": "initialize", "params": {
+            "protocolVersion": "2025-06-18", "capabilities": {},
+            "clientInfo": {"name": "startup-benchmark", "version": "1"}}},
+        {"jsonrpc": "2.0", "method": "notifications/initialized"},
+        {"jsonrpc": "2.0", "id": 2, "method": "tools/list"},
+    ]
+    started = time.perf_counter()
+    process = subprocess.Popen([sys.executable, os.path.join(HERE, "server.py")], cwd=HERE, env=_env(),
+                               stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    timings = {}
+    try:
+        for message in messages:
+            process.stdin.write(json.dumps(message).encode() + b"\n")
+            process.stdin.flush()
+            if "id" not in message:
+                continue
+            line = process.stdout.readline()
+            if not line:
+                raise RuntimeError("server.py exited before answering")
+            response = json.loads(line)
+            if "error" in response:
+                raise RuntimeError(f"{message['method']} failed: {response['error']}")
+            timings[message["method"]] = time.perf_counter() - started
+    finally:
+        process.stdin.close()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+    return {"initialize_s": timings["initialize"], "tools_list_s": timings["tools/list"]}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure server startup and fail when it exceeds a budget")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=float(os.getenv("GOOGLE_ADS_STARTUP_BUDGET_MS", "1500")),
+                        help="maximum median time from process start to the tools/list response")
+    parser.add_argument("--top", type=int, default=12, help="number of packages in the import breakdown")
+    parser.add_argument("--output", help="JSON file to save the results to")
+    args = parser.parse_args()
+
+    interpreter = statistics.median(_interpreter_start() for _ in range(args.runs))
+    profiles = [import_profile() for _ in range(args.runs)]
+    startups = [stdio_startup() for _ in range(args.runs)]
+    eager = eager_deferred_modules()
+
+    packages = {}
+    for name in profiles[0]["packages"]:
+        packages[name] = statistics.median(profile["packages"].get(name, 0) for profile in profiles) / 1000
+    packages = dict(sorted(packages.items(), key=lambda item: -item[1])[:args.top])
+    report = {
+        "runs": args.runs,
+        "interpreter_ms": round(interpreter * 1000, 1),
+        "import_server_ms": round(statistics.median(profile["total_us"] for profile in profiles) / 1000, 1),
+        "initialize_ms": round(statistics.median(startup["initialize_s"] for startup in startups) * 1000, 1),
+        "tools_list_ms": round(statistics.median(startup["tools_list_s"] for startup in startups) * 1000, 1),
+        "import_self_ms_by_package": {name: round(ms, 1) for name, ms in packages.items()},
+        "eager_deferred_modules": eager,
+        "budget_ms": args.budget_ms,
+    }
+
+    print(f"interpreter start          {report['interpreter_ms']:>8.1f}ms")
+    print(f"import server (importtime) {report['import_server_ms']:>8.1f}ms")
+    print(f"initialize response        {report['initialize_ms']:>8.1f}ms")
+    print(f"tools/list response        {report['tools_list_ms']:>8.1f}ms  (budget {args.budget_ms:.0f}ms)")
+    print("import time by package (self):")
+    for name, ms in report["import_self_ms_by_package"].items():
+        print(f"  {name:<22} {ms:>8.1f}ms")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    failures = []
+    if eager:
+        failures.append(f"modules that should load on first use are imported at startup: {', '.join(eager)}")
+    if report["tools_list_ms"] > args.budget_ms:
+        failures.append(f"startup took {report['tools_list_ms']:.0f}ms, over the budget of {args.budget_ms:.0f}ms")
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+import json
+import re
+from typing import Any, List
+
+# everything up to the next bracket outside of a string, complete strings included;
+# stops at the opening quote of a string that is not complete yet
+_SKIP = re.compile(r'(?:[^{}\[\]"]+|"(?:[^"\\]|\\.)*")*', re.DOTALL)
+# the rest of a string that started in an earlier chunk, up to its closing quote,
+# or up to a backslash whose escaped character is in the next chunk
+_STRING_REST = re.compile(r'[^"\\]*(?:\\.[^"\\]*)*', re.DOTALL)
+
+
+class JsonArrayStreamParser:
+    """
+    Incremental parser for a JSON array of objects that arrives in chunks, such as the body of
+    googleAds:searchStream, which is an array of result batches.
+
+    Each element is decoded as soon as its closing bracket arrives. Every chunk is scanned once; the chunks
+    of the element that is currently being received are kept as they are and joined when it is complete.
+
+    Example:
+        parser = JsonArrayStreamParser()
+        for chunk in chunks:
+            for batch in parser.feed(chunk):
+                ...
+        parser.close()
+    """
+
+    def __init__(self):
+        self._depth = 0
+        # pieces of the element being received, from the previous chunks
+        self._pieces: List[str] = []
+        # inside a string that continues in the next chunk, and whether its last character was a backslash
+        self._in_string = False
+        self._escaped = False
+
+    def feed(self, text: str) -> List[Any]:
+        """
+        Add a chunk of text and return the array elements completed by it.
+
+        Args:
+            text: Next chunk of the response body
+
+        Returns:
+            List[Any]: Decoded elements, in order
+        """
+        elements = []
+        pos = 0
+        length = len(text)
+        # start of the current element in this chunk
+        start = 0 if self._depth >= 2 else None
+
+        while pos < length:
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                    pos += 1
+                    continue
+                pos = _STRING_REST.match(text, pos).end()
+                if pos >= length:
+                    break
+                if text[pos] == "\\":
+                    self._escaped = True
+                else:
+                    self._in_string = False
+                pos += 1
+                continue
+
+            pos = _SKIP.match(text, pos).end()
+            if pos >= length:
+                break
+
+            char = text[pos]
+            if char == '"':
+                # the string continues in the next chunk
+                self._in_string = True
+            elif char in "{[":
+                self._depth += 1
+                if self._depth == 2:
+                    start = pos
+            else:
+                self._depth -= 1
+                if self._depth < 0:
+                    raise ValueError("Unbalanced JSON in stream")
+                if self._depth == 1:
+                    self._pieces.append(text[start:pos + 1])
+                    elements.append(json.loads("".join(self._pieces)))
+                    self._pieces = []
+                    start = None
+            pos += 1
+
+        if start is not None:
+            self._pieces.append(text[start:])
+        return elements
+
+    def close(self) -> None:
+        """
+        Check that the stream ended with a complete array.
+        """
+        if self._depth != 0 or self._in_string:
+            raise ValueError("Incomplete JSON array in stream")
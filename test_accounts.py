@@ -0,0 +1,42 @@
+import asyncio
+
+from accounts import AccountRegistry
+
+
+def test_customer_client_rows_are_recorded_and_persisted(tmp_path):
+    path = str(tmp_path / "accounts.json")
+    registry = AccountRegistry(path)
+    rows = [
+        {"customerClient": {"id": "2857151978", "manager": True, "currencyCode": "USD", "timeZone": "America/Los_Angeles"}},
+        {"customerClient": {"id": "9711179739", "manager": False, "descriptiveName": "test123"}},
+    ]
+    assert registry.record_customer_clients(rows) == 2
+
+    reloaded = AccountRegistry(path)
+    assert reloaded.is_manager("2857151978") is True
+    assert reloaded.is_manager("9711179739") is False
+    assert reloaded.get("2857151978")["currency_code"] == "USD"
+    assert reloaded.get("9711179739")["descriptive_name"] == "test123"
+
+
+def test_unknown_and_stale_accounts_are_not_answered(tmp_path):
+    registry = AccountRegistry(str(tmp_path / "accounts.json"), max_age=-1)
+    assert registry.is_manager("1234567890") is None
+    registry.record("1234567890", manager=True)
+    assert registry.is_manager("1234567890") is None
+
+
+def test_save_in_a_thread_while_accounts_are_recorded(tmp_path):
+    path = str(tmp_path / "accounts.json")
+    registry = AccountRegistry(path)
+
+    async def main():
+        saves = []
+        for index in range(200):
+            registry.record_customer_clients([{"customerClient": {"id": str(index), "manager": False}}], save=False)
+            saves.append(asyncio.create_task(asyncio.to_thread(registry.save)))
+        await asyncio.gather(*saves)
+        await asyncio.to_thread(registry.save)
+
+    asyncio.run(main())
+    assert len(AccountRegistry(path).to_dict()) == 200
@@ -0,0 +1,58 @@
+import pytest
+
+from aggregate import GroupAggregator
+
+ROWS = [
+    {"campaign": {"name": "Brand"}, "segments": {"device": "MOBILE"},
+     "metrics": {"clicks": "10", "impressions": "100", "costMicros": "5000000"}},
+    {"campaign": {"name": "Brand"}, "segments": {"device": "MOBILE"},
+     "metrics": {"clicks": "30", "impressions": "300", "costMicros": "15000000"}},
+    {"campaign": {"name": "Brand"}, "segments": {"device": "DESKTOP"},
+     "metrics": {"clicks": "5", "impressions": "200", "costMicros": "1000000"}},
+    {"campaign": {"name": "Generic"}, "segments": {"device": "MOBILE"},
+     "metrics": {"impressions": "50", "costMicros": "0"}},
+]
+
+
+def test_group_by_with_sums_and_weighted_ratios():
+    aggregator = GroupAggregator(["campaign.name", "segments.device"], ["sum(metrics.cost_micros)", "ctr", "cpc", "count(*)"])
+    aggregator.extend(ROWS)
+    columns, rows = aggregator.results()
+    assert columns == ["campaign.name", "segments.device", "sum(metrics.cost_micros)", "ctr", "cpc", "count(*)"]
+    assert rows == [
+        ["Brand", "MOBILE", 20000000.0, 0.1, 500000.0, 2],
+        ["Brand", "DESKTOP", 1000000.0, 0.025, 200000.0, 1],
+        ["Generic", "MOBILE", 0.0, 0.0, None, 1],
+    ]
+    assert aggregator.group_count == 3
+    assert aggregator.row_count == 4
+
+
+def test_top_n_by_another_aggregate_in_currency_units():
+    aggregator = GroupAggregator(["campaign.name"], ["sum(metrics.cost_micros)", "avg(metrics.clicks)", "max(metrics.clicks)"])
+    aggregator.extend(ROWS)
+    columns, rows = aggregator.results(order_by="avg(metrics.clicks)", ascending=True, limit=1, micros_to_currency=True)
+    assert columns == ["campaign.name", "sum(metrics.cost)", "avg(metrics.clicks)", "max(metrics.clicks)"]
+    assert rows == [["Brand", 21.0, 15.0, 30.0]]
+
+
+def test_currency_metrics_without_the_suffix_are_converted():
+    rows = [{"metrics": {"averageCpc": 1500000.0, "costPerConversion": 4000000.0}},
+            {"metrics": {"averageCpc": 500000.0, "costPerConversion": 2000000.0}}]
+    aggregator = GroupAggregator([], ["avg(metrics.average_cpc)", "sum(metrics.cost_per_conversion)"])
+    aggregator.extend(rows)
+    assert aggregator.results(micros_to_currency=True) == (
+        ["avg(metrics.average_cpc)", "sum(metrics.cost_per_conversion)"], [[1.0, 6.0]])
+
+
+def test_total_without_group_by():
+    aggregator = GroupAggregator([], ["sum(metrics.impressions)", "count(metrics.clicks)"])
+    aggregator.extend(ROWS)
+    assert aggregator.results() == (["sum(metrics.impressions)", "count(metrics.clicks)"], [[650.0, 3]])
+    assert aggregator.required_fields() == ["metrics.clicks", "metrics.impressions"]
+
+
+@pytest.mark.parametrize("aggregates", [[], ["median(metrics.clicks)"], ["sum(*)"], ["metrics.clicks"]])
+def test_invalid_aggregates(aggregates):
+    with pytest.raises(ValueError):
+        GroupAggregator(["campaign.name"], aggregates)
@@ -0,0 +1,78 @@
+import asyncio
+import datetime
+import threading
+import time
+
+import auth
+import utils
+
+
+class FakeCredentials:
+    def __init__(self, lifetime_seconds):
+        self.lifetime_seconds = lifetime_seconds
+        self.token = None
+        self.expiry = None
+
+
+def install_fakes(monkeypatch, lifetime_seconds=3600, refresh_delay=0.0):
+    calls = {"load": 0, "refresh": 0}
+
+    def fake_load(credentials_path, scopes):
+        calls["load"] += 1
+        return FakeCredentials(lifetime_seconds)
+
+    def fake_refresh(credentials):
+        time.sleep(refresh_delay)
+        calls["refresh"] += 1
+        credentials.token = f"token-{calls['refresh']}"
+        now = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+        credentials.expiry = now + datetime.timedelta(seconds=credentials.lifetime_seconds)
+
+    monkeypatch.setattr(utils, "get_service_account_credentials", fake_load)
+    monkeypatch.setattr(utils, "refresh_credentials", fake_refresh)
+    return calls
+
+
+def test_token_is_reused_until_expiry(monkeypatch):
+    calls = install_fakes(monkeypatch)
+    manager = auth.CredentialManager("key.json", [], "dev-token", "1234567890")
+
+    async def run():
+        first = await manager.get_headers()
+        second = await manager.get_headers()
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert first == second
+    assert first["Authorization"] == "Bearer token-1"
+    assert calls == {"load": 1, "refresh": 1}
+    assert manager.stats()["hits"] == 1
+
+
+def test_concurrent_callers_refresh_once(monkeypatch):
+    calls = install_fakes(monkeypatch, refresh_delay=0.05)
+    manager = auth.CredentialManager("key.json", [], "dev-token", "1234567890")
+
+    async def run():
+        return await asyncio.gather(*[manager.get_headers() for _ in range(20)])
+
+    results = asyncio.run(run())
+    assert {headers["Authorization"] for headers in results} == {"Bearer token-1"}
+    assert calls["refresh"] == 1
+
+
+def test_token_is_refreshed_ahead_of_expiry_in_background(monkeypatch):
+    # a token living 100 seconds is always inside the 300 second refresh-ahead window
+    calls = install_fakes(monkeypatch, lifetime_seconds=100)
+    manager = auth.CredentialManager("key.json", [], "dev-token", "1234567890")
+
+    manager.get_headers_blocking()
+    headers = manager.get_headers_blocking()
+    # the still valid token is handed out while the refresh runs in the background
+    assert headers["Authorization"] in ("Bearer token-1", "Bearer token-2")
+
+    for thread in threading.enumerate():
+        if thread.name == "google-ads-token-refresh":
+            thread.join()
+    assert calls["refresh"] == 2
+    assert manager.stats()["background_refreshes"] == 1
@@ -0,0 +1,42 @@
+from batch import chunk_operations, chunk_sizes, map_chunk_results
+
+
+def test_operations_are_chunked_by_count_and_size():
+    operations = [{"create": {"name": str(i)}} for i in range(5)]
+    assert chunk_operations(operations, max_operations=2) == [[0, 1], [2, 3], [4]]
+
+    images = [{"create": {"imageAsset": {"data": "x" * 100}}} for _ in range(3)]
+    assert chunk_operations(images, max_bytes=300) == [[0, 1], [2]]
+    # an operation larger than the limit is sent on its own
+    assert chunk_operations(images, max_bytes=10) == [[0], [1], [2]]
+    # the same plan from estimated sizes alone
+    assert chunk_sizes([150, 150, 150], max_bytes=300) == [[0, 1], [2]]
+
+
+def test_partial_failures_are_mapped_to_input_indexes():
+    response = {
+        "results": [{"resourceName": "customers/1/adGroupAds/1~1"}, {}],
+        "partialFailureError": {
+            "code": 3,
+            "message": "The required field was not present.",
+            "details": [{
+                "@type": "type.googleapis.com/google.ads.googleads.v21.errors.GoogleAdsFailure",
+                "errors": [{
+                    "errorCode": {"fieldError": "REQUIRED"},
+                    "message": "The required field was not present.",
+                    "location": {"fieldPathElements": [{"fieldName": "operations", "index": 1}, {"fieldName": "create"}]},
+                }],
+            }],
+        },
+    }
+    assert map_chunk_results([4, 7], response) == [
+        {"index": 4, "resourceName": "customers/1/adGroupAds/1~1"},
+        {"index": 7, "errors": [{"errorCode": {"fieldError": "REQUIRED"}, "message": "The required field was not present."}]},
+    ]
+
+
+def test_failed_request_fails_every_operation_in_it():
+    assert map_chunk_results([0, 1], error="boom") == [
+        {"index": 0, "errors": [{"message": "boom"}]},
+        {"index": 1, "errors": [{"message": "boom"}]},
+    ]
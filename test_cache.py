@@ -0,0 +1,151 @@
+import asyncio
+
+from cache import QueryCache, SingleFlight, parse_resource_ttls
+from gaql import normalize_query
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_equivalent_queries_normalize_equal():
+    first = """
+    SELECT campaign.id, campaign.name
+    FROM campaign
+    WHERE campaign.status = 'ENABLED' AND segments.date BETWEEN '2025-01-01' AND '2025-01-31'
+    ORDER BY campaign.name
+    """
+    second = "select campaign.name,campaign.id from CAMPAIGN where segments.date between '2025-01-01' and '2025-01-31' and campaign.status='ENABLED' order by campaign.name"
+    assert normalize_query(first) == normalize_query(second)
+
+
+def test_string_literals_keep_their_case():
+    assert normalize_query("SELECT campaign.id FROM campaign WHERE campaign.name LIKE '%Brand%'") != \
+        normalize_query("SELECT campaign.id FROM campaign WHERE campaign.name LIKE '%brand%'")
+
+
+def test_entries_expire_after_the_resource_ttl():
+    clock = FakeClock()
+    query_cache = QueryCache(default_ttl=60, resource_ttls=parse_resource_ttls("campaign=600"), clock=clock)
+    query_cache.put("1", "SELECT campaign.id FROM campaign", [{"campaign": {"id": "1"}}])
+    query_cache.put("1", "SELECT ad_group.id FROM ad_group", [{"adGroup": {"id": "2"}}])
+
+    clock.now = 120
+    assert query_cache.get("1", "select campaign.id from campaign") == [{"campaign": {"id": "1"}}]
+    assert query_cache.get("1", "SELECT ad_group.id FROM ad_group") is None
+    assert query_cache.stats()["hits"] == 1
+    assert query_cache.stats()["misses"] == 1
+
+
+def test_least_recently_used_entries_are_evicted():
+    query_cache = QueryCache(max_entries=2)
+    query_cache.put("1", "SELECT campaign.id FROM campaign", [])
+    query_cache.put("1", "SELECT ad_group.id FROM ad_group", [])
+    query_cache.get("1", "SELECT campaign.id FROM campaign")
+    query_cache.put("1", "SELECT ad_group_ad.ad.id FROM ad_group_ad", [])
+
+    assert query_cache.get("1", "SELECT campaign.id FROM campaign") == []
+    assert query_cache.get("1", "SELECT ad_group.id FROM ad_group") is None
+
+
+def test_mutate_invalidates_only_that_customer():
+    query_cache = QueryCache()
+    query_cache.put("1", "SELECT campaign.id FROM campaign", [])
+    query_cache.put("2", "SELECT campaign.id FROM campaign", [])
+
+    assert query_cache.invalidate_customer("1") == 1
+    assert query_cache.get("1", "SELECT campaign.id FROM campaign") is None
+    assert query_cache.get("2", "SELECT campaign.id FROM campaign") == []
+
+
+def test_rows_read_before_a_mutate_are_not_cached():
+    query_cache = QueryCache()
+    query = "SELECT campaign.id, campaign.status FROM campaign"
+    started = asyncio.Event()
+    mutated = asyncio.Event()
+
+    async def read():
+        generation = query_cache.generation("1")
+        started.set()
+        # the mutate finishes while the API request is running
+        await mutated.wait()
+        query_cache.put("1", query, [{"campaign": {"status": "ENABLED"}}], generation)
+
+    async def mutate():
+        await started.wait()
+        query_cache.invalidate_customer("1")
+        mutated.set()
+
+    async def main():
+        await asyncio.gather(read(), mutate())
+
+    asyncio.run(main())
+    assert query_cache.get("1", query) is None
+    assert query_cache.stats()["stale_writes"] == 1
+
+    # a read started after the mutate is cached, as are reads of other customers
+    query_cache.put("1", query, [], query_cache.generation("1"))
+    query_cache.put("2", query, [], 0)
+    assert query_cache.get("1", query) == [] and query_cache.get("2", query) == []
+
+
+def test_single_flight_shares_one_call():
+    flights = SingleFlight()
+    calls = []
+
+    async def call(value):
+        calls.append(value)
+        await asyncio.sleep(0.01)
+        return [value]
+
+    async def main():
+        results = await asyncio.gather(*[flights.run(("1", "q"), lambda: call("a")) for _ in range(5)],
+                                       flights.run(("1", "other"), lambda: call("b")))
+        assert calls == ["a", "b"]
+        assert [shared for _, shared in results] == [False, True, True, True, True, False]
+        assert results[0][0] is results[4][0]
+        assert flights.stats()["coalesced"] == 4 and flights.stats()["max_waiters"] == 4
+        # finished calls are not shared
+        assert (await flights.run(("1", "q"), lambda: call("c")))[0] == ["c"]
+
+    asyncio.run(main())
+
+
+def test_single_flight_errors_cancellation_and_forget():
+    flights = SingleFlight()
+    started = []
+
+    async def fail():
+        started.append(1)
+        await asyncio.sleep(0.01)
+        raise RuntimeError("boom")
+
+    async def slow():
+        started.append(1)
+        await asyncio.sleep(0.02)
+        return "done"
+
+    async def main():
+        results = await asyncio.gather(flights.run("k", fail), flights.run("k", fail), return_exceptions=True)
+        assert [str(result) for result in results] == ["boom", "boom"] and len(started) == 1
+
+        # a cancelled caller does not cancel the call for the others
+        first = asyncio.ensure_future(flights.run("s", slow))
+        second = asyncio.ensure_future(flights.run("s", slow))
+        await asyncio.sleep(0)
+        first.cancel()
+        assert await second == ("done", True)
+
+        # forgotten keys start a new call
+        waiting = asyncio.ensure_future(flights.run("s", slow))
+        await asyncio.sleep(0)
+        assert flights.forget(lambda key: key == "s") == 1
+        assert await flights.run("s", slow) == ("done", False)
+        assert await waiting == ("done", False)
+        assert len(started) == 4
+
+    asyncio.run(main())
@@ -0,0 +1,40 @@
+from campaign_tree import build_campaign_tree_operations, summarize_campaign_tree_response
+
+
+def test_entities_are_linked_through_temporary_resource_names():
+    campaign = {"name": "Test Campaign"}
+    operations = build_campaign_tree_operations(
+        "1234567890",
+        campaign,
+        {"name": "Test Campaign Budget"},
+        [{"name": "Test Ad Group", "ads": [{"status": "ENABLED"}]}],
+    )
+
+    budget = operations[0]["campaignBudgetOperation"]["create"]
+    created_campaign = operations[1]["campaignOperation"]["create"]
+    ad_group = operations[2]["adGroupOperation"]["create"]
+    ad = operations[3]["adGroupAdOperation"]["create"]
+    assert budget["resourceName"] == "customers/1234567890/campaignBudgets/-1"
+    assert created_campaign["campaignBudget"] == budget["resourceName"]
+    assert created_campaign["resourceName"] == "customers/1234567890/campaigns/-2"
+    assert ad_group["campaign"] == created_campaign["resourceName"]
+    assert "ads" not in ad_group
+    assert ad["adGroup"] == ad_group["resourceName"]
+    # the caller's dicts are left untouched
+    assert campaign == {"name": "Test Campaign"}
+
+
+def test_response_is_summarized_as_a_tree():
+    response = {
+        "mutateOperationResponses": [
+            {"campaignBudgetResult": {"resourceName": "customers/1/campaignBudgets/11"}},
+            {"campaignResult": {"resourceName": "customers/1/campaigns/22"}},
+            {"adGroupResult": {"resourceName": "customers/1/adGroups/33"}},
+            {"adGroupAdResult": {"resourceName": "customers/1/adGroupAds/33~44"}},
+        ]
+    }
+    assert summarize_campaign_tree_response(response) == {
+        "campaignBudget": "customers/1/campaignBudgets/11",
+        "campaign": "customers/1/campaigns/22",
+        "adGroups": [{"resourceName": "customers/1/adGroups/33", "ads": ["customers/1/adGroupAds/33~44"]}],
+    }
@@ -0,0 +1,129 @@
+import asyncio
+import json
+
+import pytest
+
+import errors
+import retry
+
+
+def error_body(http_code, status, error_code=None, quota_details=None):
+    failure = {"errorCode": error_code or {}, "message": "Something went wrong."}
+    if quota_details:
+        failure["details"] = {"quotaErrorDetails": quota_details}
+    return json.dumps({
+        "error": {
+            "code": http_code,
+            "message": "Request failed.",
+            "status": status,
+            "details": [{
+                "@type": "type.googleapis.com/google.ads.googleads.v21.errors.GoogleAdsFailure",
+                "errors": [failure],
+                "requestId": "abc123",
+            }],
+        }
+    })
+
+
+def test_error_payloads_are_classified():
+    invalid = errors.parse_api_error("Error running GAQL", 400, error_body(400, "INVALID_ARGUMENT", {"queryError": "UNRECOGNIZED_FIELD"}))
+    assert type(invalid) is errors.GoogleAdsApiError
+    assert not invalid.retryable
+    assert invalid.error_codes() == ["queryError.UNRECOGNIZED_FIELD"]
+    assert invalid.request_id == "abc123"
+    assert "queryError.UNRECOGNIZED_FIELD" in str(invalid)
+
+    unavailable = errors.parse_api_error("Error running GAQL", 503, error_body(503, "UNAVAILABLE"))
+    assert isinstance(unavailable, errors.TransientApiError)
+    assert unavailable.retryable
+
+    internal = errors.parse_api_error("Error running GAQL", 400, error_body(400, "INVALID_ARGUMENT", {"internalError": "TRANSIENT_ERROR"}))
+    assert internal.retryable
+
+    quota = errors.parse_api_error(
+        "Error running GAQL", 429,
+        error_body(429, "RESOURCE_EXHAUSTED", {"quotaError": "RESOURCE_EXHAUSTED"}, {"rateScope": "DEVELOPER", "retryDelay": "30s"}),
+    )
+    assert isinstance(quota, errors.QuotaExceededError)
+    assert (quota.rate_scope, quota.retry_delay) == ("DEVELOPER", 30.0)
+
+    unparsable = errors.parse_api_error("Error running GAQL", 502, "<html>Bad Gateway</html>")
+    assert unparsable.retryable
+    assert "Bad Gateway" in str(unparsable)
+
+
+def test_retry_budget_limits_retries():
+    policy = retry.RetryPolicy(max_attempts=10, budget=retry.RetryBudget(ratio=0.5, min_tokens=1))
+    assert policy.can_retry(0)
+    assert not policy.can_retry(0)
+    policy.budget.record_request()
+    policy.budget.record_request()
+    assert policy.can_retry(0)
+    assert not retry.RetryPolicy(max_attempts=2).can_retry(1)
+
+
+def test_slow_request_is_hedged():
+    attempts = []
+
+    async def send():
+        attempt = len(attempts)
+        attempts.append(attempt)
+        # the first attempt is slow, the hedged one answers quickly
+        await asyncio.sleep(0.5 if attempt == 0 else 0.01)
+        return attempt
+
+    assert asyncio.run(retry.hedged(send, 0.05)) == 1
+    assert attempts == [0, 1]
+
+
+def test_hedge_uses_its_own_send_and_can_be_denied():
+    sent = []
+
+    async def send(name):
+        sent.append(name)
+        await asyncio.sleep(0.2 if name == "first" else 0.01)
+        return name
+
+    hedge = lambda: send("hedge")
+    assert asyncio.run(retry.hedged(lambda: send("first"), 0.02, send_hedge=hedge, allow_hedge=lambda: True)) == "hedge"
+    assert sent == ["first", "hedge"]
+
+    sent.clear()
+    assert asyncio.run(retry.hedged(lambda: send("first"), 0.02, send_hedge=hedge, allow_hedge=lambda: False)) == "first"
+    assert sent == ["first"]
+
+
+def test_failed_result_does_not_beat_a_pending_hedge():
+    discarded = []
+
+    async def send(status, delay):
+        await asyncio.sleep(delay)
+        return status
+
+    async def discard(status):
+        discarded.append(status)
+
+    def run(first, hedge):
+        return asyncio.run(retry.hedged(lambda: send(*first), 0.02, on_discard=discard, send_hedge=lambda: send(*hedge),
+                                        is_success=lambda status: status < 300))
+
+    # the first attempt fails while the hedge is still running
+    assert run((503, 0.03), (200, 0.05)) == 200
+    assert discarded == [503]
+    # both fail, the last failure is returned
+    discarded.clear()
+    assert run((429, 0.03), (503, 0.05)) == 503
+    assert discarded == [429]
+    # a success is returned as soon as it arrives
+    discarded.clear()
+    assert run((200, 0.03), (503, 0.2)) == 200
+    assert discarded == []
+
+
+def test_hedging_raises_when_every_attempt_fails():
+    async def send():
+        await asyncio.sleep(0.02)
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        asyncio.run(retry.hedged(send, 0.01))
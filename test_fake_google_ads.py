@@ -0,0 +1,62 @@
+import asyncio
+
+import httpx
+
+from fake_google_ads import FakeConfig, FakeGoogleAdsApi
+from stream_parser import JsonArrayStreamParser
+
+QUERY = "SELECT campaign.id, segments.device, metrics.cost_micros FROM campaign WHERE segments.date DURING LAST_7_DAYS"
+
+
+def post(api, path, body):
+    async def send():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=api.app), base_url="http://fake") as client:
+            return await client.post(path, json=body)
+    return asyncio.run(send())
+
+
+def test_search_is_paginated():
+    api = FakeGoogleAdsApi(FakeConfig(rows=25, page_size=10))
+    pages = []
+    body = {"query": QUERY}
+    while True:
+        page = post(api, "/v21/customers/123/googleAds:search", body).json()
+        pages.append(page["results"])
+        if "nextPageToken" not in page:
+            break
+        body = {"query": QUERY, "pageToken": page["nextPageToken"]}
+    assert [len(results) for results in pages] == [10, 10, 5]
+    assert pages[0][1]["segments"]["device"] == "DESKTOP"
+    assert pages[0][0]["metrics"]["costMicros"].isdigit()
+
+
+def test_search_stream_returns_batches():
+    api = FakeGoogleAdsApi(FakeConfig(rows=25, page_size=10))
+    response = post(api, "/v21/customers/123/googleAds:searchStream", {"query": QUERY + " LIMIT 15"})
+    parser = JsonArrayStreamParser()
+    batches = parser.feed(response.text)
+    parser.close()
+    assert [len(batch["results"]) for batch in batches] == [10, 5]
+
+
+def test_manager_accounts_list_their_clients():
+    api = FakeGoogleAdsApi(FakeConfig(client_accounts=3, manager_ids={"1000000000"}))
+    query = "SELECT customer_client.id, customer_client.manager FROM customer_client WHERE customer_client.manager = FALSE"
+    rows = post(api, "/v21/customers/1000000000/googleAds:search", {"query": query}).json()["results"]
+    assert [row["customerClient"]["id"] for row in rows] == ["1000000001", "1000000002", "1000000003"]
+
+
+def test_mutates_and_injected_errors():
+    api = FakeGoogleAdsApi()
+    response = post(api, "/v21/customers/123/campaignBudgets:mutate", {"operations": [{"create": {}}, {"create": {}}]})
+    assert len(response.json()["results"]) == 2
+    response = post(api, "/v21/customers/123/googleAds:mutate", {"mutateOperations": [
+        {"campaignBudgetOperation": {"create": {"resourceName": "customers/123/campaignBudgets/-1"}}},
+        {"campaignOperation": {"create": {"campaignBudget": "customers/123/campaignBudgets/-1"}}},
+    ]})
+    assert list(response.json()["mutateOperationResponses"][1]) == ["campaignResult"]
+
+    api.config.quota_error_rate = 1.0
+    response = post(api, "/v21/customers/123/googleAds:search", {"query": QUERY})
+    assert response.status_code == 429
+    assert response.json()["error"]["status"] == "RESOURCE_EXHAUSTED"
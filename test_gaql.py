@@ -0,0 +1,135 @@
+import pytest
+
+from gaql import GaqlSyntaxError, check_query, format_query, parse
+from gaql_fields import FieldCatalog
+
+
+def make_catalog(tmp_path):
+    catalog = FieldCatalog(str(tmp_path / "fields.json"))
+    catalog.replace([
+        {"name": "campaign", "category": "RESOURCE",
+         "selectableWith": ["customer", "segments.date", "segments.device", "metrics.clicks", "metrics.cost_micros"]},
+        {"name": "ad_group", "category": "RESOURCE", "selectableWith": ["campaign", "segments.date"]},
+        {"name": "customer", "category": "RESOURCE", "selectableWith": []},
+        {"name": "campaign.id", "category": "ATTRIBUTE", "dataType": "INT64", "selectable": True, "filterable": True, "sortable": True},
+        {"name": "campaign.name", "category": "ATTRIBUTE", "dataType": "STRING", "selectable": True, "filterable": True, "sortable": True},
+        {"name": "campaign.status", "category": "ATTRIBUTE", "dataType": "ENUM", "selectable": True, "filterable": True,
+         "sortable": True, "enumValues": ["ENABLED", "PAUSED", "REMOVED"]},
+        {"name": "campaign.url_custom_parameters", "category": "ATTRIBUTE", "dataType": "MESSAGE", "selectable": True,
+         "isRepeated": True},
+        {"name": "ad_group.id", "category": "ATTRIBUTE", "dataType": "INT64", "selectable": True, "filterable": True, "sortable": True},
+        {"name": "customer.currency_code", "category": "ATTRIBUTE", "dataType": "STRING", "selectable": True, "filterable": True},
+        {"name": "segments.date", "category": "SEGMENT", "dataType": "DATE", "selectable": True, "filterable": True, "sortable": True},
+        {"name": "segments.device", "category": "SEGMENT", "dataType": "ENUM", "selectable": True, "filterable": True, "sortable": True},
+        {"name": "metrics.clicks", "category": "METRIC", "dataType": "INT64", "selectable": True, "filterable": True, "sortable": True,
+         "selectableWith": ["segments.date"]},
+        {"name": "metrics.cost_micros", "category": "METRIC", "dataType": "INT64", "selectable": True, "filterable": True,
+         "sortable": True, "selectableWith": ["segments.date", "segments.device"]},
+    ])
+    return catalog
+
+
+def test_parse_all_clauses():
+    query = parse("""
+        SELECT campaign.id, Campaign.Name, metrics.clicks
+        FROM campaign
+        WHERE segments.date BETWEEN '2025-01-01' AND '2025-01-31'
+          AND campaign.status IN ('ENABLED', 'PAUSED')
+          AND campaign.name NOT LIKE '%Test%'
+          AND campaign.end_date IS NOT NULL
+        ORDER BY metrics.clicks DESC, campaign.name
+        LIMIT 10
+        PARAMETERS include_drafts = true
+    """)
+    assert query.fields == ["campaign.id", "campaign.name", "metrics.clicks"]
+    assert query.resource == "campaign"
+    assert [(c.field, c.operator, c.values) for c in query.conditions] == [
+        ("segments.date", "BETWEEN", ["'2025-01-01'", "'2025-01-31'"]),
+        ("campaign.status", "IN", ["'ENABLED'", "'PAUSED'"]),
+        ("campaign.name", "NOT LIKE", ["'%Test%'"]),
+        ("campaign.end_date", "IS NOT NULL", []),
+    ]
+    assert [(o.field, o.descending) for o in query.ordering] == [("metrics.clicks", True), ("campaign.name", False)]
+    assert query.limit == 10
+    assert query.parameters == {"include_drafts": "true"}
+
+
+def test_format_query_round_trips():
+    gaql = ("SELECT campaign.id, metrics.clicks FROM campaign "
+            "WHERE segments.date BETWEEN '2025-01-01' AND '2025-01-31' AND campaign.status IN ('ENABLED', 'PAUSED') "
+            "AND campaign.end_date IS NOT NULL AND segments.date DURING LAST_7_DAYS "
+            "ORDER BY metrics.clicks DESC, campaign.id ASC LIMIT 10 PARAMETERS include_drafts = true")
+    assert format_query(parse(gaql)) == gaql
+
+
+@pytest.mark.parametrize("gaql, message", [
+    ("SELECT campaign.id campaign.name FROM campaign", "expected FROM but found 'campaign.name'"),
+    ("SELECT campaign.id, FROM campaign", "expected FROM"),
+    ("SELECT campaign.id FROM campaign WHERE segments.date DURING LAST_90_DAYS", "after DURING"),
+    ("SELECT campaign.id FROM campaign WHERE campaign.id ~ 1", "unknown operator '~'"),
+    ("SELECT campaign.id FROM campaign LIMIT 0", "positive number after LIMIT"),
+    ("SELECT campaign.id FROM campaign WHERE", "the query ended"),
+    ("SELECT campaign.id FROM campaign LIMIT 10 ORDER BY campaign.id", "unexpected 'ORDER'"),
+])
+def test_syntax_errors_point_at_the_offending_token(gaql, message):
+    with pytest.raises(GaqlSyntaxError, match=message):
+        parse(gaql)
+
+
+def test_date_segment_requires_a_finite_date_range():
+    assert check_query(parse("SELECT segments.date FROM campaign WHERE segments.date DURING LAST_7_DAYS")) == []
+    assert check_query(parse(
+        "SELECT segments.date FROM campaign WHERE segments.date >= '2025-01-01' AND segments.date <= '2025-01-31'")) == []
+    assert check_query(parse("SELECT segments.date FROM campaign WHERE segments.date >= '2025-01-01'"))
+
+
+def test_metrics_are_rejected_for_manager_accounts_only():
+    query = parse("SELECT customer.id, metrics.clicks FROM customer")
+    assert check_query(query, is_manager=True)
+    assert check_query(query, is_manager=False) == []
+    assert check_query(query) == []
+
+
+def test_catalog_accepts_valid_query(tmp_path):
+    catalog = make_catalog(tmp_path)
+    query = parse("SELECT campaign.id, customer.currency_code, segments.device, metrics.cost_micros FROM campaign "
+                  "WHERE campaign.status = 'ENABLED' ORDER BY metrics.cost_micros DESC")
+    assert catalog.validate(query) == []
+
+
+def test_catalog_reports_unknown_and_incompatible_fields(tmp_path):
+    catalog = make_catalog(tmp_path)
+    problems = catalog.validate(parse(
+        "SELECT campaign.nme, ad_group.id, segments.device, metrics.clicks FROM campaign "
+        "WHERE campaign.url_custom_parameters IS NULL"))
+    assert "unknown field 'campaign.nme', did you mean 'campaign.name'?" in problems
+    assert "'ad_group.id' cannot be used with FROM campaign" in problems
+    assert "'campaign.url_custom_parameters' cannot be used in WHERE" in problems
+    assert "metric 'metrics.clicks' cannot be segmented by 'segments.device'" in problems
+    assert catalog.validate(parse("SELECT campaign.id FROM campaigns")) == [
+        "unknown resource 'campaigns', did you mean 'campaign'?"
+    ]
+
+
+def test_catalog_is_persisted_and_refreshed_when_stale(tmp_path):
+    now = [1000.0]
+    catalog = FieldCatalog(str(tmp_path / "fields.json"), max_age=60, clock=lambda: now[0])
+    assert catalog.needs_refresh()
+    catalog.replace([{"name": "campaign", "category": "RESOURCE"}])
+
+    reloaded = FieldCatalog(str(tmp_path / "fields.json"), max_age=60, clock=lambda: now[0])
+    assert reloaded.resources() == ["campaign"]
+    assert not reloaded.needs_refresh()
+
+    now[0] += 120
+    assert reloaded.needs_refresh()
+    reloaded.refresh_started()
+    assert not reloaded.needs_refresh()
+
+
+def test_describe_resource_lists_compatible_fields(tmp_path):
+    description = make_catalog(tmp_path).describe_resource("campaign")
+    assert "- campaign.status (ENUM; selectable, filterable, sortable): ENABLED, PAUSED, REMOVED" in description
+    assert "- customer" in description
+    assert "- metrics.clicks (INT64; selectable, filterable, sortable)" in description
+    assert "ad_group.id" not in description
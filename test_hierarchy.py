@@ -0,0 +1,66 @@
+import asyncio
+
+import pytest
+
+from hierarchy import CLIENTS_QUERY, build_tree
+
+
+def client(id, manager=False, name=None, status="ENABLED"):
+    return {"customerClient": {"id": id, "manager": manager, "descriptiveName": name or f"Account {id}", "status": status}}
+
+
+def link(id, status):
+    return {"customerClientLink": {"clientCustomer": f"customers/{id}", "status": status}}
+
+
+# 1 -> 2 (manager) -> 4, 5 (manager) -> 6
+#   -> 3, pending 7
+# 5 is also linked directly below 1
+ACCOUNTS = {
+    "1": ([client("1", True), client("2", True), client("3"), client("5", True)], [link("7", "PENDING")]),
+    "2": ([client("2", True), client("4"), client("5", True)], []),
+    "5": ([client("5", True), client("6", status="CLOSED")], []),
+}
+
+
+def run(fetched, failing=()):
+    async def fetch(customer_id, gaql):
+        fetched.append(customer_id)
+        if customer_id in failing:
+            raise RuntimeError(f"cannot read {customer_id}")
+        clients, links = ACCOUNTS[customer_id]
+        return clients if gaql == CLIENTS_QUERY else links
+
+    return asyncio.run(build_tree("1", fetch, concurrency=2))
+
+
+def test_tree_indexes_and_lookups():
+    fetched = []
+    tree = run(fetched)
+    # each manager is walked once, with its clients and its links
+    assert sorted(fetched) == ["1", "1", "2", "2", "5", "5"]
+
+    assert [node.customer_id for node in tree.leaves()] == ["3", "4", "6"]
+    assert [node.customer_id for node in tree.leaves("2")] == ["4", "6"]
+    assert tree.leaves("3") == []
+    assert [node.customer_id for node in tree.path("6")] == ["1", "5", "6"]
+    assert tree.nodes["6"].depth == 2 and tree.parents["5"] == ["1", "2"]
+    assert tree.nodes["7"].link_status == "PENDING" and tree.nodes["7"].name is None
+    with pytest.raises(ValueError):
+        tree.path("8")
+
+    summary = tree.summary()
+    assert (summary["accounts"], summary["managers"], summary["clients"], summary["inactive_links"]) == (7, 3, 3, 1)
+    assert tree.nodes["1"].name == "Account 1"
+
+    nested = tree.to_dict(max_depth=1)
+    assert [child["customer_id"] for child in nested["children"]] == ["2", "3", "5", "7"]
+    assert nested["children"][0]["children"] == [] and nested["children"][0]["child_count"] == 2
+
+
+def test_failed_manager_is_reported_and_root_failure_raises():
+    tree = run([], failing={"5"})
+    assert list(tree.errors) == ["5"]
+    assert [node.customer_id for node in tree.leaves()] == ["3", "4"]
+    with pytest.raises(RuntimeError):
+        run([], failing={"1"})
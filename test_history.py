@@ -0,0 +1,51 @@
+import datetime
+
+import pytest
+
+from history import HistoryStore, contiguous_ranges, plan_history, rows_by_day
+
+D = datetime.date
+TODAY = D(2026, 10, 17)
+QUERY = ("SELECT campaign.id, segments.date, metrics.clicks FROM campaign "
+         "WHERE segments.date BETWEEN '{}' AND '{}' AND campaign.status = 'ENABLED' ORDER BY segments.date")
+
+
+def test_plan_keys_the_query_without_its_window():
+    plan = plan_history(QUERY.format("2025-10-17", "2026-10-16"), TODAY, mutable_days=30)
+    assert len(plan.days) == 365 and plan.days[0] == D(2025, 10, 17)
+    assert plan.settled_end == D(2026, 9, 16)
+    assert plan.base_query == ("SELECT campaign.id, segments.date, metrics.clicks FROM campaign "
+                               "WHERE campaign.status = 'ENABLED' ORDER BY segments.date ASC")
+    assert plan_history(QUERY.format("2026-01-01", "2026-01-31"), TODAY, 30).key == plan.key
+
+
+@pytest.mark.parametrize("gaql", [
+    QUERY.format("2026-09-20", "2026-10-16"),  # only mutable days
+    QUERY.format("2026-01-01", "2026-01-31") + " LIMIT 10",
+    "SELECT campaign.id, metrics.clicks FROM campaign WHERE segments.date BETWEEN '2026-01-01' AND '2026-01-31'",
+    "SELECT campaign.id, segments.date FROM campaign WHERE segments.date DURING LAST_30_DAYS",
+])
+def test_plan_skips_queries_the_store_cannot_serve(gaql):
+    assert plan_history(gaql, TODAY, mutable_days=30) is None
+
+
+def test_contiguous_ranges_and_rows_by_day():
+    assert contiguous_ranges([D(2026, 1, 3), D(2026, 1, 1), D(2026, 1, 2), D(2026, 1, 5)]) == [
+        (D(2026, 1, 1), D(2026, 1, 3)), (D(2026, 1, 5), D(2026, 1, 5))]
+    rows = [{"segments": {"date": "2026-01-02"}, "n": 1}, {"segments": {"date": "2026-01-01"}},
+            {"segments": {"date": "2026-01-02"}, "n": 2}]
+    assert rows_by_day(rows) == {"2026-01-02": [rows[0], rows[2]], "2026-01-01": [rows[1]]}
+
+
+def test_store_reads_back_windows_and_empty_days(tmp_path):
+    store = HistoryStore(str(tmp_path / "history.sqlite3"))
+    plan = plan_history(QUERY.format("2026-01-01", "2026-01-03"), TODAY, 30)
+    row = {"campaign": {"id": "1"}, "segments": {"date": "2026-01-01"}, "metrics": {"clicks": "3"}}
+    assert store.put("1", plan, {"2026-01-01": [row], "2026-01-02": []}) == 2
+
+    assert store.get("1", plan.key, D(2026, 1, 1), D(2026, 1, 31)) == {"2026-01-01": [row], "2026-01-02": []}
+    assert store.get("1", plan.key, D(2026, 1, 2), D(2026, 1, 2)) == {"2026-01-02": []}
+    assert store.get("2", plan.key, D(2026, 1, 1), D(2026, 1, 31)) == {}
+    assert store.stats() == {"1": {"campaign": {"queries": 1, "days": 2, "rows": 1,
+                                                "first_day": "2026-01-01", "last_day": "2026-01-02"}}}
+    store.close()
@@ -0,0 +1,78 @@
+import asyncio
+import http.server
+import threading
+import time
+
+import pytest
+
+from http_client import HttpClientPool
+
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    lock = threading.Lock()
+    running = 0
+    max_running = 0
+    ports = set()
+
+    def do_GET(self) -> None:
+        cls = type(self)
+        with cls.lock:
+            cls.running += 1
+            cls.max_running = max(cls.max_running, cls.running)
+            cls.ports.add(self.client_address[1])
+        time.sleep(0.02)
+        with cls.lock:
+            cls.running -= 1
+        self.send_response(200)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+
+@pytest.fixture
+def url():
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    Handler.max_running = 0
+    Handler.ports = set()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}/"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_client_is_shared_per_event_loop_and_closed(url):
+    pool = HttpClientPool(max_connections=1, max_keepalive_connections=1, http2=False)
+
+    async def requests():
+        client = pool.get_client()
+        assert pool.get_client() is client
+        responses = await asyncio.gather(*[client.get(url) for _ in range(3)])
+        assert [response.text for response in responses] == ["ok"] * 3
+        return client
+
+    first = asyncio.run(requests())
+    # one connection at a time, kept alive between the requests
+    assert Handler.max_running == 1 and len(Handler.ports) == 1
+
+    async def close():
+        client = await requests()
+        assert client is not first
+        await pool.aclose()
+        assert client.is_closed
+        # the next request opens a new client
+        assert pool.get_client() is not client
+        await pool.aclose()
+
+    asyncio.run(close())
+    assert len(Handler.ports) == 2
+
+    # a client bound to a closed loop is dropped, not closed from another loop
+    asyncio.run(requests())
+    asyncio.run(pool.aclose())
+    assert pool._client is None
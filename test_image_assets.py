@@ -0,0 +1,63 @@
+import base64
+import hashlib
+
+import pytest
+
+import image_assets
+from image_assets import ImageAssetIndex, encode_base64, encoded_size, file_digest, find_images
+
+
+def test_find_images(tmp_path):
+    (tmp_path / "b.png").write_bytes(b"b")
+    (tmp_path / "a.JPG").write_bytes(b"a")
+    (tmp_path / "notes.txt").write_text("not an image")
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "sub" / "c.gif").write_bytes(b"c")
+
+    assert find_images(str(tmp_path)) == [str(tmp_path / "a.JPG"), str(tmp_path / "b.png")]
+    assert find_images(str(tmp_path), recursive=True)[-1] == str(tmp_path / "sub" / "c.gif")
+    assert find_images(str(tmp_path / "b.png")) == [str(tmp_path / "b.png")]
+    with pytest.raises(ValueError):
+        find_images(str(tmp_path / "notes.txt"))
+    with pytest.raises(ValueError):
+        find_images(str(tmp_path / "missing"))
+
+
+@pytest.mark.parametrize("size", [0, 1, 2, 3, 1000, 3 * 7 + 1])
+def test_digest_and_base64_match_whole_file_encoding(tmp_path, monkeypatch, size):
+    # small chunks, so that several are encoded and joined
+    monkeypatch.setattr(image_assets, "_CHUNK_SIZE", 6)
+    data = bytes(range(256)) * 4
+    path = tmp_path / "image.png"
+    path.write_bytes(data[:size])
+
+    assert file_digest(str(path)) == hashlib.sha256(data[:size]).hexdigest()
+    assert encode_base64(str(path)) == base64.b64encode(data[:size]).decode()
+    assert encoded_size(size) == len(base64.b64encode(data[:size]))
+
+
+def test_index_seeds_hashes_and_persists(tmp_path):
+    path = str(tmp_path / "index.json")
+    index = ImageAssetIndex(path)
+    assert not index.is_seeded("123")
+
+    rows = [
+        {"asset": {"resourceName": "customers/123/assets/1", "name": "logo",
+                   "imageAsset": {"fileSize": "10", "fullSize": {"url": "https://example.com/1"}}}},
+        {"asset": {"resourceName": "customers/123/assets/2", "name": "banner",
+                   "imageAsset": {"fileSize": "20", "fullSize": {"url": "https://example.com/2"}}}},
+    ]
+    assert index.seed("123", rows) == 2
+    assert index.is_seeded("123")
+    assert [c["resource_name"] for c in index.candidates("123", 10)] == ["customers/123/assets/1"]
+
+    index.record("123", "abc", "customers/123/assets/1", "logo", 10)
+    assert index.candidates("123", 10) == []
+    assert index.find("123", "abc") == "customers/123/assets/1"
+    assert index.find("456", "abc") is None
+
+    reloaded = ImageAssetIndex(path)
+    assert reloaded.find("123", "abc") == "customers/123/assets/1"
+    # seeding again keeps the hashed assets out of the candidates
+    assert reloaded.seed("123", rows) == 1
+    assert reloaded.stats()["123"]["hashed"] == 1
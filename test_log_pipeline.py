@@ -0,0 +1,69 @@
+import base64
+import io
+import json
+import logging
+
+import pytest
+
+from log_pipeline import SamplingFilter, configure_logging, parse_sampling, redact
+
+IMAGE = base64.b64encode(bytes(range(256)) * 40).decode()
+
+
+def test_blobs_are_hashed_and_long_values_cut():
+    body = {
+        "operations": [{"create": {"name": "logo", "imageAsset": {"data": IMAGE}}}] * 3,
+        "note": "x " * 200,
+    }
+    redacted = redact(body, max_string=20, max_items=2)
+    data = redacted["operations"][0]["create"]["imageAsset"]["data"]
+    assert data.startswith(f"<{len(IMAGE)} chars sha256:")
+    assert redacted["operations"][2] == "<1 more items>"
+    assert redacted["note"] == "x " * 10 + "...<380 more chars>"
+    assert redacted["operations"][0]["create"]["name"] == "logo"
+    assert body["operations"][0]["create"]["imageAsset"]["data"] == IMAGE
+
+
+def test_sampling_keeps_warnings_and_uses_most_specific_logger():
+    sampler = SamplingFilter({"google_ads": 1.0, "google_ads.gaql": 0.0}, random_source=lambda: 0.5)
+
+    def record(name, level=logging.INFO):
+        return logging.LogRecord(name, level, __file__, 1, "message", None, None)
+
+    assert not sampler.filter(record("google_ads.gaql"))
+    assert sampler.filter(record("google_ads.gaql", logging.WARNING))
+    assert sampler.filter(record("google_ads.requests"))
+    assert sampler.filter(record("httpx"))
+    assert parse_sampling("google_ads.gaql=0.1, httpx=0.5") == {"google_ads.gaql": 0.1, "httpx": 0.5}
+    with pytest.raises(ValueError):
+        parse_sampling("httpx")
+
+
+def test_records_are_written_as_json_lines_by_the_listener(tmp_path):
+    stream = io.StringIO()
+    payload_path = tmp_path / "payloads.jsonl"
+    root = logging.getLogger()
+    handlers, level = list(root.handlers), root.level
+    listener = configure_logging(stream=stream, payload_path=str(payload_path), sampling={"noisy": 0.0})
+    try:
+        logger = logging.getLogger("google_ads.requests")
+        logger.info("Running POST request", extra={"customer_id": "123", "payload": {"data": IMAGE}})
+        logging.getLogger("noisy").info("dropped")
+        try:
+            raise RuntimeError("boom")
+        except RuntimeError:
+            logging.getLogger("google_ads").exception("failed")
+    finally:
+        listener.stop()
+        root.handlers[:] = handlers
+        root.setLevel(level)
+
+    lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert [line["message"] for line in lines] == ["Running POST request", "failed"]
+    assert lines[0]["customer_id"] == "123"
+    assert lines[0]["payload"]["data"].startswith("<")
+    assert "RuntimeError: boom" in lines[1]["exception"]
+
+    captured = [json.loads(line) for line in payload_path.read_text().splitlines()]
+    assert len(captured) == 1
+    assert captured[0]["payload"]["data"] == IMAGE
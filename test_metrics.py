@@ -0,0 +1,105 @@
+import asyncio
+import urllib.request
+
+import pytest
+
+from metrics import Histogram, MetricsRegistry, Tracer, serve_prometheus
+
+
+def test_histogram_percentiles_interpolate_within_buckets():
+    histogram = Histogram([1, 2, 4])
+    for value in [0.5, 1.5, 1.5, 3, 10]:
+        histogram.observe(value)
+    assert histogram.counts == [1, 2, 1, 1]
+    assert histogram.percentile(50) == pytest.approx(1.75)
+    assert histogram.percentile(99) == 4
+    assert Histogram().percentile(50) is None
+
+
+def test_snapshot_and_prometheus_text():
+    registry = MetricsRegistry()
+    registry.describe("tool_seconds", "Tool call duration")
+    registry.observe("tool_seconds", 0.2, tool="run_gaql", status="ok")
+    registry.inc("upstream_errors_total", endpoint="googleAds:searchStream", code='queryError."BAD"')
+    with registry.in_flight("tool_in_flight", tool="run_gaql"):
+        assert registry.snapshot()["gauges"]["tool_in_flight"][0]["value"] == 1
+    assert registry.snapshot()["gauges"]["tool_in_flight"][0]["value"] == 0
+
+    snapshot = registry.snapshot()
+    assert snapshot["histograms"]["tool_seconds"][0]["labels"] == {"status": "ok", "tool": "run_gaql"}
+    assert snapshot["histograms"]["tool_seconds"][0]["count"] == 1
+
+    text = registry.prometheus_text()
+    assert "# HELP google_ads_tool_seconds Tool call duration" in text
+    assert "# TYPE google_ads_tool_seconds histogram" in text
+    assert 'google_ads_tool_seconds_bucket{status="ok",tool="run_gaql",le="0.25"} 1' in text
+    assert 'google_ads_tool_seconds_bucket{status="ok",tool="run_gaql",le="0.1"} 0' in text
+    assert 'google_ads_tool_seconds_count{status="ok",tool="run_gaql"} 1' in text
+    assert 'google_ads_upstream_errors_total{code="queryError.\\"BAD\\"",endpoint="googleAds:searchStream"} 1' in text
+
+
+def test_spans_of_concurrent_tasks_join_the_calling_trace():
+    tracer = Tracer(max_traces=2)
+
+    async def request(index: int) -> None:
+        with tracer.span("POST googleAds:searchStream", attempt=index):
+            await asyncio.sleep(0)
+
+    async def tool() -> None:
+        with tracer.span("tool run_gaql_across_clients"):
+            await asyncio.gather(*[request(index) for index in range(3)])
+
+    asyncio.run(tool())
+    with pytest.raises(RuntimeError):
+        with tracer.span("tool run_gaql"):
+            raise RuntimeError("boom")
+
+    latest, first = tracer.recent()
+    assert latest["error"] == "RuntimeError: boom"
+    assert [child["attributes"]["attempt"] for child in first["children"]] == [0, 1, 2]
+    assert {child["trace_id"] for child in first["children"]} == {first["trace_id"]}
+
+
+def test_prometheus_endpoint():
+    registry = MetricsRegistry()
+    registry.inc("upstream_rows_total", 5, endpoint="googleAds:searchStream")
+    server = serve_prometheus(registry, 0)
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+        with urllib.request.urlopen(url) as response:
+            assert 'google_ads_upstream_rows_total{endpoint="googleAds:searchStream"} 5' in response.read().decode()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_opentelemetry_spans_are_children_of_their_tool_call():
+    pytest.importorskip("opentelemetry.sdk")
+    from opentelemetry import trace as otel_trace
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+    from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+    exporter = InMemorySpanExporter()
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    tracer = Tracer()
+    tracer._otel = (otel_trace, provider.get_tracer("test"))
+
+    async def request(index: int) -> None:
+        with tracer.span("POST googleAds:searchStream", attempt=index):
+            await asyncio.sleep(0)
+
+    async def tool() -> None:
+        with tracer.span("tool run_gaql_across_clients"):
+            await asyncio.gather(*[request(index) for index in range(2)])
+
+    asyncio.run(tool())
+    asyncio.run(tool())
+    spans = exporter.get_finished_spans()
+    tools = [span for span in spans if span.parent is None]
+    assert [span.name for span in tools] == ["tool run_gaql_across_clients"] * 2
+    for tool_span in tools:
+        requests = [span for span in spans if span.parent and span.parent.span_id == tool_span.context.span_id]
+        assert [span.attributes["attempt"] for span in requests] == [0, 1]
+        assert {span.context.trace_id for span in requests} == {tool_span.context.trace_id}
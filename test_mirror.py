@@ -0,0 +1,102 @@
+import datetime
+
+import pytest
+
+import mirror
+from mirror import ENTITIES, Mirror
+
+AD_GROUP = ENTITIES["ad_group"]
+CAMPAIGN = ENTITIES["campaign"]
+
+
+def ad_group(id, name, status="ENABLED", campaign_id="1"):
+    return {"adGroup": {"resourceName": f"customers/1/adGroups/{id}", "id": str(id), "name": name, "status": status},
+            "campaign": {"id": campaign_id}}
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = Mirror(str(tmp_path / "mirror.sqlite3"))
+    yield store
+    store.close()
+
+
+def test_query_filters_and_pages(store):
+    store.replace("1", AD_GROUP, [ad_group(3, "Shoes 100%"), ad_group(1, "Shoes"), ad_group(2, "Hats", "PAUSED", "2")])
+
+    rows, total = store.query("1", AD_GROUP)
+    assert [row["adGroup"]["id"] for row in rows] == ["1", "2", "3"] and total == 3
+    rows, total = store.query("1", AD_GROUP, limit=1, offset=1)
+    assert [row["adGroup"]["id"] for row in rows] == ["2"] and total == 3
+    assert store.query("1", AD_GROUP, parent_id="2")[1] == 1
+    assert store.query("1", AD_GROUP, status="enabled")[1] == 2
+    assert store.query("1", AD_GROUP, name_contains="shoes")[1] == 2
+    assert store.query("1", AD_GROUP, name_contains="0%")[1] == 1
+    assert store.query("2", AD_GROUP)[1] == 0
+
+
+def test_upsert_deletes_expected_rows_that_are_gone(store):
+    store.replace("1", AD_GROUP, [ad_group(1, "a"), ad_group(2, "b")])
+    store.upsert("1", AD_GROUP, [ad_group(1, "renamed"), ad_group(5, "new")],
+                 expected=["customers/1/adGroups/1", "customers/1/adGroups/2"])
+    rows, _ = store.query("1", AD_GROUP)
+    assert [(row["adGroup"]["id"], row["adGroup"]["name"]) for row in rows] == [("1", "renamed"), ("5", "new")]
+
+
+def test_campaigns_are_ordered_newest_first(store):
+    campaigns = [{"campaign": {"resourceName": f"customers/1/campaigns/{id}", "id": str(id), "startDate": date}}
+                 for id, date in [(1, "2026-01-01"), (2, "2026-03-01"), (3, "2026-02-01")]]
+    store.replace("1", CAMPAIGN, campaigns)
+    assert [row["campaign"]["id"] for row in store.query("1", CAMPAIGN)[0]] == ["2", "3", "1"]
+
+
+def test_sync_state_and_pending(store):
+    assert store.state("1") is None
+    store.mark_synced("1", "2026-10-01 00:00:00.000000", full=True, synced_at=100)
+    store.add_pending("1", ["customers/1/adGroups/7", "customers/1/adGroups/7"])
+    assert store.state("1") == {"full_synced_at": 100, "synced_at": 100,
+                                "change_cursor": "2026-10-01 00:00:00.000000", "pending": 1}
+    store.mark_synced("1", "2026-10-02 00:00:00.000000", full=False, synced_at=200)
+    store.clear_pending("1", store.pending("1"))
+    assert store.state("1")["full_synced_at"] == 100
+    assert store.state("1")["pending"] == 0
+    assert store.stats()["1"]["synced_at"] == 200
+
+
+def test_plan_refetch_includes_dependent_rows():
+    plan = mirror.plan_refetch([
+        "customers/1/adGroups/2", "customers/1/campaignBudgets/3", "customers/1/ads/4", "customers/1/adGroups/2", "junk",
+    ])
+    assert [(entity.resource, field, names, delete) for entity, field, names, delete in plan] == [
+        ("campaign", "campaign.campaign_budget", ["customers/1/campaignBudgets/3"], False),
+        ("ad_group", "ad_group.resource_name", ["customers/1/adGroups/2"], True),
+        ("ad_group_ad", "ad_group_ad.ad.resource_name", ["customers/1/ads/4"], False),
+        ("campaign_budget", "campaign_budget.resource_name", ["customers/1/campaignBudgets/3"], True),
+    ]
+    queries = mirror.refetch_queries(AD_GROUP, "ad_group.resource_name", ["a", "b", "c"], chunk_size=2)
+    assert [names for _, names in queries] == [["a", "b"], ["c"]]
+    assert "WHERE ad_group.resource_name IN ('a', 'b')" in queries[0][0]
+
+
+def test_queries_and_filters():
+    conditions = mirror.filter_conditions(AD_GROUP, parent_id="5", status="paused", name_contains="it's 50%")
+    assert conditions == ["campaign.id = '5'", "ad_group.status = 'PAUSED'", "ad_group.name LIKE '%it\\'s 50[%]%'"]
+    assert mirror.entity_query(CAMPAIGN, limit=10).endswith(
+        "FROM campaign ORDER BY campaign.start_date DESC, campaign.id ASC LIMIT 10")
+    with pytest.raises(ValueError):
+        mirror.filter_conditions(CAMPAIGN, parent_id="1")
+
+
+def test_change_cursor_reads_back_the_change_lag():
+    now = datetime.datetime(2026, 10, 17, 12, 0, tzinfo=datetime.timezone.utc)
+    assert mirror.initial_cursor(now) == "2026-10-16 12:00:00.000000"
+    assert mirror.next_cursor("2026-10-16 12:00:00.000000", ["2026-10-17 09:00:00.5"], now) == "2026-10-17 08:45:00.500000"
+    assert mirror.next_cursor("2026-10-16 12:00:00.000000", [], now) == "2026-10-16 12:00:00.000000"
+    assert "change_event.change_date_time <= '2026-10-19'" in mirror.change_event_query("2026-10-16 12:00:00", now)
+
+
+def test_mutated_resource_names():
+    assert mirror.mutated_resource_names({"results": [{"resourceName": "customers/1/adGroups/2"}, {}]}) == [
+        "customers/1/adGroups/2"]
+    assert mirror.mutated_resource_names({"mutateOperationResponses": [
+        {"campaignResult": {"resourceName": "customers/1/campaigns/3"}}]}) == ["customers/1/campaigns/3"]
@@ -0,0 +1,84 @@
+import pytest
+
+from result_format import ColumnarResult, field_name, field_path, format_results, row_fields
+
+ROWS = [
+    {
+        "campaign": {"resourceName": "customers/1/campaigns/11", "id": "11", "name": "Brand | EU"},
+        "metrics": {"clicks": "12", "costMicros": "2500000", "ctr": 0.1},
+    },
+    {
+        "campaign": {"resourceName": "customers/1/campaigns/22", "id": "22", "name": "Generic"},
+        "metrics": {"costMicros": "750000", "ctr": 0.05},
+    },
+]
+FIELDS = ["campaign.id", "campaign.name", "metrics.clicks", "metrics.cost_micros", "metrics.ctr"]
+TYPES = {"campaign.id": "INT64", "campaign.name": "STRING", "metrics.clicks": "INT64",
+         "metrics.cost_micros": "INT64", "metrics.ctr": "DOUBLE"}
+
+
+def test_field_names_map_to_rest_keys():
+    assert field_path("ad_group_ad.ad.final_urls") == ["adGroupAd", "ad", "finalUrls"]
+    assert field_name(["metrics", "videoQuartileP25Rate"]) == "metrics.video_quartile_p25_rate"
+    assert row_fields(ROWS[:1]) == ["campaign.resource_name", "campaign.id", "campaign.name",
+                                    "metrics.clicks", "metrics.cost_micros", "metrics.ctr"]
+
+
+def test_columns_are_typed():
+    result = format_results(ROWS, "columns", FIELDS, TYPES)
+    assert result == {
+        "columns": FIELDS,
+        "types": ["INT64", "STRING", "INT64", "INT64", "DOUBLE"],
+        "data": [[11, 22], ["Brand | EU", "Generic"], [12, None], [2500000, 750000], [0.1, 0.05]],
+        "row_count": 2,
+    }
+
+
+def test_values_stay_in_typed_arrays_unless_missing():
+    result = ColumnarResult(FIELDS, TYPES)
+    result.extend(ROWS)
+    columns = dict(zip(result.columns, result._columns))
+    assert columns["campaign.id"].values.typecode == "q"
+    assert columns["metrics.ctr"].values.typecode == "d"
+    assert isinstance(columns["metrics.clicks"].values, list)
+
+
+def test_micros_are_converted_to_currency_units():
+    result = format_results(ROWS, "columns", FIELDS, TYPES, micros_to_currency=True)
+    assert result["columns"][3] == "metrics.cost"
+    assert result["types"][3] == "DOUBLE"
+    assert result["data"][3] == [2.5, 0.75]
+
+
+def test_currency_metrics_without_the_suffix_are_converted():
+    rows = [{"metrics": {"costMicros": "2500000", "averageCpc": 1250000.0}}]
+    result = format_results(rows, "columns", ["metrics.cost_micros", "metrics.average_cpc"],
+                            {"metrics.cost_micros": "INT64", "metrics.average_cpc": "DOUBLE"}, micros_to_currency=True)
+    assert result["columns"] == ["metrics.cost", "metrics.average_cpc"]
+    assert result["data"] == [[2.5], [1.25]]
+
+
+def test_types_are_inferred_without_catalog():
+    result = format_results(ROWS, "columns", FIELDS)
+    assert result["data"][0] == [11, 22]
+    assert result["data"][2] == [12, None]
+
+
+def test_csv_and_table():
+    assert format_results(ROWS, "csv", FIELDS[:3], TYPES).splitlines() == [
+        "campaign.id,campaign.name,metrics.clicks",
+        "11,Brand | EU,12",
+        "22,Generic,",
+    ]
+    assert format_results(ROWS, "table", FIELDS[:2], TYPES).splitlines() == [
+        "| campaign.id | campaign.name |",
+        "| --- | --- |",
+        "| 11 | Brand \\| EU |",
+        "| 22 | Generic |",
+    ]
+
+
+def test_rows_are_returned_unchanged_and_unknown_formats_rejected():
+    assert format_results(ROWS, "rows") is ROWS
+    with pytest.raises(ValueError):
+        format_results(ROWS, "xml")
@@ -0,0 +1,53 @@
+import os
+
+import pytest
+
+from result_pages import ResultPages, make_cursor, parse_cursor
+
+
+def rows(count):
+    return [{"campaign": {"id": str(i), "name": f"Café {i}\nline"}} for i in range(count)]
+
+
+def test_pages_read_back_in_order(tmp_path):
+    pages = ResultPages(str(tmp_path))
+    handle = pages.create(rows(25), page_size=10, meta={"format": "rows"})
+
+    first, info = pages.page(handle, 0)
+    assert first == rows(25)[:10]
+    assert info == {"row_count": 25, "page_size": 10, "pages": 3, "created_at": info["created_at"],
+                    "meta": {"format": "rows"}}
+    assert pages.page(handle, 2)[0] == rows(25)[20:]
+    with pytest.raises(IndexError):
+        pages.page(handle, 3)
+    with pytest.raises(KeyError):
+        pages.page("missing", 0)
+    assert pages.stats()["pages_read"] == 2
+
+
+def test_empty_result_has_no_pages(tmp_path):
+    pages = ResultPages(str(tmp_path))
+    handle = pages.create([], page_size=10)
+    with pytest.raises(IndexError):
+        pages.page(handle, 0)
+
+
+def test_sweep_evicts_idle_and_oldest_results(tmp_path):
+    pages = ResultPages(str(tmp_path), idle_ttl=60, max_results=3)
+    old, recent, newest = (pages.create(rows(1), page_size=1) for _ in range(3))
+    for handle, mtime in ((old, 1000), (recent, 1120), (newest, 1150)):
+        for suffix in (".json", ".jsonl"):
+            os.utime(tmp_path / (handle + suffix), (mtime, mtime))
+
+    pages.max_results = 2
+    # old is idle, then recent, the oldest of the others, goes to leave room for one more
+    assert pages.sweep(now=1170) == 2
+    assert pages.delete(newest) and not pages.delete(old)
+    assert os.listdir(tmp_path) == []
+
+
+def test_cursors():
+    assert parse_cursor(make_cursor("a-b_C1", 4)) == ("a-b_C1", 4)
+    for cursor in ("abc", "abc:", ":1", "abc:-1", "../x:1"):
+        with pytest.raises(ValueError):
+            parse_cursor(cursor)
@@ -0,0 +1,72 @@
+import asyncio
+import time
+
+import scheduler
+from scheduler import RequestScheduler
+
+
+def test_requests_are_paced_per_customer():
+    request_scheduler = RequestScheduler(developer_rate=0, customer_rate=20, customer_burst=1)
+
+    async def run():
+        started = time.monotonic()
+        await asyncio.gather(*[request_scheduler.acquire("1") for _ in range(3)])
+        # another customer has its own bucket
+        await request_scheduler.acquire("2")
+        return time.monotonic() - started
+
+    elapsed = asyncio.run(run())
+    assert 0.09 <= elapsed < 1.0
+
+
+def test_interactive_requests_go_ahead_of_bulk_requests():
+    request_scheduler = RequestScheduler(developer_rate=20, developer_burst=1, customer_rate=0)
+    order = []
+
+    async def request(name, priority):
+        await request_scheduler.acquire("1", priority)
+        order.append(name)
+
+    async def run():
+        await request_scheduler.acquire("1")
+        with scheduler.lane(scheduler.BULK):
+            bulk = [asyncio.create_task(request(f"bulk-{i}", None)) for i in range(2)]
+        await asyncio.sleep(0)
+        interactive = asyncio.create_task(request("interactive", scheduler.INTERACTIVE))
+        await asyncio.gather(*bulk, interactive)
+
+    asyncio.run(run())
+    assert order == ["interactive", "bulk-0", "bulk-1"]
+    assert request_scheduler.stats()["lanes"]["bulk"]["granted"] == 2
+
+
+def test_quota_error_pauses_the_affected_bucket():
+    request_scheduler = RequestScheduler(developer_rate=0, customer_rate=0)
+
+    async def run():
+        assert request_scheduler.handle_quota_error("1", "ACCOUNT", 0.1) == 0.1
+        other_customer = await request_scheduler.acquire("2")
+        return other_customer, await request_scheduler.acquire("1")
+
+    other_customer, paused_customer = asyncio.run(run())
+    assert other_customer < 0.05
+    assert paused_customer >= 0.09
+
+
+def test_full_customer_buckets_are_dropped(monkeypatch):
+    monkeypatch.setattr(RequestScheduler, "min_sweep_size", 10)
+    clock = [0.0]
+    request_scheduler = RequestScheduler(developer_rate=0, customer_rate=1, customer_burst=2, clock=lambda: clock[0])
+
+    async def run(customer_ids):
+        for customer_id in customer_ids:
+            await request_scheduler.acquire(customer_id)
+
+    asyncio.run(run([str(i) for i in range(9)]))
+    request_scheduler.pause("paused", 60)
+    # every bucket filled up again but the paused one
+    clock[0] = 1.0
+    asyncio.run(run(["new"]))
+    stats = request_scheduler.stats()
+    assert (stats["customer_buckets"], stats["evicted_buckets"]) == (2, 9)
+    assert stats["paused_customers"] == {"paused": 59.0}
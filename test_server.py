@@ -10,6 +10,9 @@ from server import (
     create_ad_group,
     create_ad,
     create_image_asset,
+    run_gaql_across_clients,
+    create_campaign_budgets,
+    create_campaign_tree,
 )
 import json
 import logging
@@ -53,6 +56,20 @@ def test_list_campaigns():
         logger.info(json.dumps(result, indent=2))
 
 
+def test_run_gaql_across_clients():
+    # run the same query against all the test client accounts under the test manager account
+    manager_customer_id = "2857151978"
+    query = """
+    SELECT
+        campaign.id,
+        campaign.name,
+        campaign.status
+    FROM campaign
+    """
+    result = asyncio.run(run_gaql_across_clients(manager_customer_id, query, include_inactive=True))
+    logger.info(json.dumps(result, indent=2))
+
+
 def test_create_campaign_bucket():
     client_customer_id = "9711179739"
     campaign_budget = {
@@ -64,6 +81,20 @@ def test_create_campaign_bucket():
     logger.info(json.dumps(result, indent=2))
 
 
+def test_create_campaign_budgets():
+    client_customer_id = "9711179739"
+    campaign_budgets = [
+        {
+            "name": f"Test Campaign Budget {i}: " + str(datetime.datetime.now()),
+            "amountMicros": 100000,
+            "deliveryMethod": "STANDARD"
+        }
+        for i in range(3)
+    ]
+    result = asyncio.run(create_campaign_budgets(client_customer_id, campaign_budgets))
+    logger.info(json.dumps(result, indent=2))
+
+
 def test_create_display_campaign():
     client_customer_id = "9711179739"
 
@@ -86,6 +117,34 @@ def test_create_display_campaign():
     logger.info(json.dumps(result, indent=2))
 
 
+def test_create_campaign_tree():
+    client_customer_id = "9711179739"
+    campaign = {
+        "name": "Test Campaign: " + datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "startDate": "2025-10-05",
+        "endDate": "2025-12-05",
+        "status": "PAUSED",
+        "advertisingChannelType": "DISPLAY",
+        "manualCpc": {},
+        "contains_eu_political_advertising": "DOES_NOT_CONTAIN_EU_POLITICAL_ADVERTISING"
+    }
+    campaign_budget = {
+        "name": "Test Campaign Budget: " + str(datetime.datetime.now()),
+        "amountMicros": 100000,
+        "deliveryMethod": "STANDARD"
+    }
+    ad_groups = [
+        {
+            "name": "Test Ad Group: " + datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "status": "ENABLED",
+            "type": "DISPLAY_STANDARD",
+            "cpcBidMicros": 100000
+        }
+    ]
+    result = asyncio.run(create_campaign_tree(client_customer_id, campaign, campaign_budget, ad_groups))
+    logger.info(json.dumps(result, indent=2))
+
+
 def test_list_ad_groups():
     client_customer_id = "9711179739"
     result = asyncio.run(list_ad_groups(client_customer_id))
@@ -164,8 +223,11 @@ if __name__ == "__main__":
         "test_is_manager_account": test_is_manager_account,
         "test_list_client_accounts": test_list_client_accounts,
         "test_list_campaigns": test_list_campaigns,
+        "test_run_gaql_across_clients": test_run_gaql_across_clients,
         "test_create_campaign_bucket": test_create_campaign_bucket,
+        "test_create_campaign_budgets": test_create_campaign_budgets,
         "test_create_display_campaign": test_create_display_campaign,
+        "test_create_campaign_tree": test_create_campaign_tree,
         "test_list_ad_groups": test_list_ad_groups,
         "test_list_ads": test_list_ads,
         "test_create_ad_group": test_create_ad_group,
@@ -0,0 +1,42 @@
+import pytest
+from sse_starlette.sse import AppStatus
+from starlette.testclient import TestClient
+
+import server
+
+HEADERS = {"Accept": "application/json, text/event-stream", "Content-Type": "application/json"}
+# fails locally on the cursor, without an API call
+CALL = {"jsonrpc": "2.0", "id": 1, "method": "tools/call",
+        "params": {"name": "fetch_result_page", "arguments": {"cursor": "invalid"}}}
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(server.mcp.settings, "json_response", True)
+    monkeypatch.setattr(server, "_draining", False)
+    try:
+        with TestClient(server.create_app("streamable-http", stateless=True)) as client:
+            yield client
+    finally:
+        AppStatus.should_exit = False
+        AppStatus.enable_automatic_graceful_drain_mode()
+
+
+def tool_error(response):
+    result = response.json()["result"]
+    assert result["isError"]
+    return result["content"][0]["text"]
+
+
+def test_draining_refuses_new_tool_calls(client):
+    # streams are ended by drain_tool_calls, not as soon as the server is told to stop
+    assert not AppStatus.enable_automatic_graceful_drain
+    health = client.get("/healthz")
+    assert (health.status_code, health.json()) == (200, {"status": "ok", "running_tool_calls": 0})
+    assert "Invalid cursor" in tool_error(client.post("/mcp", headers=HEADERS, json=CALL))
+
+    client.portal.call(server.drain_tool_calls, 0)
+    assert AppStatus.should_exit
+    health = client.get("/healthz")
+    assert (health.status_code, health.json()) == (503, {"status": "draining", "running_tool_calls": 0})
+    assert "shutting down" in tool_error(client.post("/mcp", headers=HEADERS, json=CALL))
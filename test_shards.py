@@ -0,0 +1,76 @@
+import datetime
+
+import pytest
+
+from gaql import parse
+from shards import date_window, merge_shards, plan_shards, split_window
+
+D = datetime.date
+
+
+@pytest.mark.parametrize("where, window", [
+    ("segments.date BETWEEN '2024-01-15' AND '2024-03-10'", (D(2024, 1, 15), D(2024, 3, 10))),
+    ("segments.date >= '2024-01-01' AND segments.date < '2024-02-01'", (D(2024, 1, 1), D(2024, 1, 31))),
+    ("segments.date > '2024-01-01' AND segments.date <= '2024-02-01' AND campaign.status = 'ENABLED'",
+     (D(2024, 1, 2), D(2024, 2, 1))),
+    ("segments.date DURING LAST_30_DAYS", None),
+    ("segments.date >= '2024-01-01'", None),
+    ("segments.date = '2024-01-01'", None),
+])
+def test_date_window(where, window):
+    assert date_window(parse(f"SELECT campaign.id, segments.date FROM campaign WHERE {where}")) == window
+
+
+def test_split_window():
+    assert split_window(D(2024, 1, 15), D(2024, 3, 10), "month") == [
+        (D(2024, 1, 15), D(2024, 1, 31)), (D(2024, 2, 1), D(2024, 2, 29)), (D(2024, 3, 1), D(2024, 3, 10))]
+    # 2024-01-03 is a Wednesday
+    assert split_window(D(2024, 1, 3), D(2024, 1, 16), "week") == [
+        (D(2024, 1, 3), D(2024, 1, 7)), (D(2024, 1, 8), D(2024, 1, 14)), (D(2024, 1, 15), D(2024, 1, 16))]
+    assert len(split_window(D(2024, 1, 1), D(2024, 12, 31), "day")) == 366
+    with pytest.raises(ValueError):
+        split_window(D(2024, 1, 1), D(2024, 1, 2), "year")
+
+
+def test_plan_shards_rewrites_the_date_condition():
+    plan = plan_shards("SELECT campaign.id, segments.date, metrics.clicks FROM campaign "
+                       "WHERE segments.date >= '2024-01-20' AND campaign.status = 'ENABLED' AND segments.date <= '2024-02-05' "
+                       "ORDER BY metrics.clicks DESC LIMIT 3")
+    assert [shard.query for shard in plan] == [
+        "SELECT campaign.id, segments.date, metrics.clicks FROM campaign "
+        "WHERE segments.date BETWEEN '2024-01-20' AND '2024-01-31' "
+        "AND campaign.status = 'ENABLED' ORDER BY metrics.clicks DESC LIMIT 3",
+        "SELECT campaign.id, segments.date, metrics.clicks FROM campaign "
+        "WHERE segments.date BETWEEN '2024-02-01' AND '2024-02-05' "
+        "AND campaign.status = 'ENABLED' ORDER BY metrics.clicks DESC LIMIT 3",
+    ]
+
+
+@pytest.mark.parametrize("gaql", [
+    "SELECT campaign.id FROM campaign WHERE segments.date DURING LAST_7_DAYS",
+    # totals per campaign over the window, one row each, which shards would split into partial rows
+    "SELECT campaign.id, metrics.clicks FROM campaign WHERE segments.date BETWEEN '2024-01-01' AND '2024-03-31' "
+    "ORDER BY metrics.clicks DESC LIMIT 5",
+    "SELECT campaign.id, segments.week, metrics.clicks FROM campaign "
+    "WHERE segments.date BETWEEN '2024-01-01' AND '2024-03-31'",
+])
+def test_plan_shards_runs_other_queries_as_one_shard(gaql):
+    assert [shard.query for shard in plan_shards(gaql)] == [gaql]
+
+
+def row(date, clicks):
+    return {"segments": {"date": date}, "metrics": {"clicks": clicks}}
+
+
+def test_merge_keeps_date_order_or_sorts_again():
+    january = [row("2024-01-01", "5"), row("2024-01-02", "30")]
+    february = [row("2024-02-01", "100"), row("2024-02-02", None)]
+
+    by_date = "SELECT segments.date, metrics.clicks FROM campaign WHERE segments.date BETWEEN '2024-01-01' AND '2024-02-28'"
+    assert merge_shards(by_date, [january, february]) == january + february
+    assert merge_shards(by_date + " ORDER BY segments.date DESC", [january[::-1], february[::-1]]) == (january + february)[::-1]
+
+    top = merge_shards(by_date + " ORDER BY metrics.clicks DESC LIMIT 3", [january, february])
+    assert [r["metrics"]["clicks"] for r in top] == ["100", "30", "5"]
+    ascending = merge_shards(by_date + " ORDER BY metrics.clicks", [january, february])
+    assert [r["metrics"]["clicks"] for r in ascending] == ["5", "30", "100", None]
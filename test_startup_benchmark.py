@@ -0,0 +1,19 @@
+from startup_benchmark import eager_deferred_modules, parse_importtime
+
+IMPORTTIME = """import time: self [us] | cumulative | imported package
+import time:       120 |        120 |   _io
+import time:      1500 |       1500 |     mcp.types
+import time:       300 |       1800 |   mcp
+import time:       200 |       2000 | mcp.server
+import time:       700 |        700 | utils
+"""
+
+
+def test_parse_importtime():
+    profile = parse_importtime(IMPORTTIME)
+    assert profile["total_us"] == 2700
+    assert profile["packages"] == {"mcp": 2000, "utils": 700, "_io": 120}
+
+
+def test_server_import_defers_google_auth_and_friends():
+    assert eager_deferred_modules() == []
@@ -0,0 +1,46 @@
+import json
+
+import pytest
+
+from stream_parser import JsonArrayStreamParser
+
+
+def feed_in_chunks(text, chunk_size):
+    parser = JsonArrayStreamParser()
+    elements = []
+    for i in range(0, len(text), chunk_size):
+        elements.extend(parser.feed(text[i:i + chunk_size]))
+    parser.close()
+    return elements
+
+
+def test_batches_are_decoded_across_chunk_boundaries():
+    batches = [
+        {
+            "results": [{"campaign": {"id": str(i), "name": f'quote " brace {{ bracket ] backslash \\ {i}'}}],
+            "fieldMask": "campaign.id,campaign.name",
+        }
+        for i in range(20)
+    ]
+    text = json.dumps(batches, indent=2)
+    for chunk_size in (1, 3, 7, 64, len(text)):
+        assert feed_in_chunks(text, chunk_size) == batches
+
+
+def test_elements_are_returned_as_soon_as_they_are_complete():
+    parser = JsonArrayStreamParser()
+    assert parser.feed('[{"results": [1]}, {"res') == [{"results": [1]}]
+    assert parser.feed('ults": [2]}]') == [{"results": [2]}]
+    parser.close()
+
+
+def test_truncated_stream_is_rejected():
+    parser = JsonArrayStreamParser()
+    parser.feed('[{"results": [1]}, {"results"')
+    with pytest.raises(ValueError):
+        parser.close()
+    # ends inside a string, right after a backslash
+    parser = JsonArrayStreamParser()
+    parser.feed('[{"results": [1]}, {"results": "a \\')
+    with pytest.raises(ValueError):
+        parser.close()
@@ -1,9 +1,11 @@
 import os
-from google.oauth2 import service_account
-from google.oauth2.credentials import Credentials
-import google.auth.transport.requests
 from pydantic import Field
-from typing import Dict, List
+from typing import Dict, List, TYPE_CHECKING
+
+# google-auth pulls in requests, urllib3 and cryptography, which are only needed for the first token refresh,
+# so they are imported there and not when the server starts
+if TYPE_CHECKING:
+    from google.oauth2.credentials import Credentials
 
 def format_customer_id(
     customer_id: str = Field(description="Customer ID")
@@ -25,7 +27,7 @@ def format_customer_id(
 def get_service_account_credentials(
     credentials_path: str = Field(description="Path to service account credentials file"),
     scopes: List[str] = Field(description="Scopes for service account credentials")
-    ) -> Credentials:
+    ) -> "Credentials":
     """
     Load service account credentials from a file.
 
@@ -41,6 +43,8 @@ def get_service_account_credentials(
     if not os.path.exists(credentials_path):
         raise ValueError(f"credentials_path does not exist: {credentials_path}")
     
+    from google.oauth2 import service_account
+
     try:
         credentials = service_account.Credentials.from_service_account_file(credentials_path, scopes=scopes)
     except ValueError as e:
@@ -52,7 +56,7 @@ def get_service_account_credentials(
 def generated_request_headers(
     developer_token: str = Field(description="Developer token"), 
     login_customer_id: str = Field(description="Login customer ID"), 
-    credentials: Credentials = Field(description="Service account credentials")) -> Dict[str, str]:
+    credentials: "Credentials" = Field(description="Service account credentials")) -> Dict[str, str]:
     """
     Generate request headers for Google Ads API.
     For more information, see: https://developers.google.com/google-ads/api/rest/auth
@@ -74,9 +78,45 @@ def generated_request_headers(
     if not credentials:
         raise ValueError("credentials is required")
     
+    refresh_credentials(credentials)
+    return build_request_headers(developer_token, login_customer_id, credentials.token)
+
+
+def refresh_credentials(
+    credentials: "Credentials" = Field(description="Service account credentials")
+    ) -> None:
+    """
+    Fetch a new access token for the credentials. This makes a blocking OAuth round trip.
+
+    Args:
+        credentials: Service account credentials
+    """
+    import google.auth.transport.requests
+
     auth_request = google.auth.transport.requests.Request()
     credentials.refresh(auth_request)
-    token = credentials.token
+
+
+def build_request_headers(
+    developer_token: str = Field(description="Developer token"),
+    login_customer_id: str = Field(description="Login customer ID"),
+    token: str = Field(description="OAuth access token")) -> Dict[str, str]:
+    """
+    Build request headers for Google Ads API from an already fetched access token.
+
+    Args:
+        developer_token: Developer token
+        login_customer_id: Login customer ID
+        token: OAuth access token
+
+    Returns:
+        Dict[str, str]: Request headers
+    """
+    if not developer_token:
+        raise ValueError("developer_token is required")
+
+    if not login_customer_id:
+        raise ValueError("login_customer_id is required")
 
     headers = {
         'Authorization': f'Bearer {token}',
@@ -86,4 +126,3 @@ def generated_request_headers(
     }
 
     return headers
-